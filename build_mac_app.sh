@@ -1,5 +1,7 @@
 #!/bin/bash
 # 将 Streamlit 应用打包为 Mac .app 应用程序
+# 打包后预编译字节码，并把产物体积追加到 goal_planner_builds.jsonl；
+# 以 GOAL_PLANNER_PROFILE=1 启动应用时记录启动到服务器就绪、首次渲染的耗时
 
 APP_NAME="智能目标管理"
 SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
@@ -60,14 +62,27 @@ fi
 # 启动应用
 osascript -e 'display notification "应用正在启动..." with title "智能目标管理"'
 
+LAUNCHED=$(.venv/bin/python -c 'import time; print(repr(time.time()))')
+if [ -n "$GOAL_PLANNER_PROFILE" ]; then
+    export GOAL_PLANNER_PROFILE_FILE="$RESOURCES/goal_planner_startup.jsonl"
+    export GOAL_PLANNER_LAUNCH_TIME="$LAUNCHED"
+fi
+
 # 在后台启动 Streamlit
 .venv/bin/python -m streamlit run goal-planner-python.py \
     --server.headless true \
     --server.port 8501 \
     --browser.gatherUsageStats false &
 
-# 等待服务器启动
-sleep 3
+# 等待服务器就绪（最多 60 秒）
+for _ in $(seq 1 600); do
+    curl -sf http://127.0.0.1:8501/_stcore/health > /dev/null && break
+    sleep 0.1
+done
+
+if [ -n "$GOAL_PLANNER_PROFILE" ]; then
+    .venv/bin/python -c "import json, sys, time; print(json.dumps({'t': int(time.time()), 'kind': 'server_ready', 'launch': float(sys.argv[1]), 'ready_ms': round((time.time() - float(sys.argv[1])) * 1000, 1)}))" "$LAUNCHED" >> "$GOAL_PLANNER_PROFILE_FILE"
+fi
 
 # 打开浏览器
 open "http://localhost:8501"
@@ -78,11 +93,18 @@ EOF
 
 # 复制应用文件到 Resources
 cp goal-planner-python.py "$APP_PATH/Contents/Resources/"
+cp -R goal_planner "$APP_PATH/Contents/Resources/"
 cp requirements.txt "$APP_PATH/Contents/Resources/"
 
+# 预编译字节码，首次启动时不必再编译
+python3 -m compileall -q "$APP_PATH/Contents/Resources/goal_planner"
+
 # 给启动脚本执行权限
 chmod +x "$APP_PATH/Contents/MacOS/launcher"
 
+# 记录产物体积并与上次构建比较
+python3 -m goal_planner.profiling build-report "$APP_PATH" --target macos
+
 echo "✅ 打包完成！"
 echo "📱 应用位置: $APP_PATH"
 echo ""
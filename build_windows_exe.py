@@ -1,12 +1,32 @@
 """
 Windows 打包脚本 - 创建独立可执行文件
 使用 PyInstaller 将应用打包为 .exe 文件
+
+    python build_windows_exe.py [--yes] [--optimize 1] [--measure-startup]
+
+每次构建后把产物体积（以及可选的启动耗时）追加到 goal_planner_builds.jsonl，并与上次构建比较。
 """
 
+import argparse
+import compileall
 import os
 import sys
 import subprocess
 
+from goal_planner.profiling import (
+    BUILD_REPORTS_FILE, build_report, load_metrics, print_build_report, record_metric, wait_for_health
+)
+
+APP_NAME = "智能目标管理"
+DIST_DIR = os.path.join("dist", APP_NAME)
+SERVER_PORT = 8501
+# 应用用不到、但会被依赖分析带入的模块
+EXCLUDED_MODULES = [
+    'tkinter', '_tkinter', 'turtle', 'turtledemo', 'idlelib', 'lib2to3', 'pydoc_data',
+    'test', 'pytest', '_pytest', 'IPython', 'ipykernel', 'jupyter_client', 'notebook',
+    'matplotlib', 'scipy', 'sklearn', 'PyQt5', 'PyQt6', 'PySide2', 'PySide6', 'sphinx',
+]
+
 def check_pyinstaller():
     """检查并安装 PyInstaller"""
     try:
@@ -26,9 +46,30 @@ import os
 import subprocess
 import webbrowser
 import time
+import json
+import urllib.request
 from pathlib import Path
 
+PORT = 8501
+
+def wait_for_server(timeout=60):
+    """轮询健康检查直到服务器就绪，返回是否就绪"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.1)
+    return False
+
 def main():
+    launched = time.time()
+    profile = "--profile" in sys.argv        # 记录启动到服务器就绪、首次渲染的耗时
+    open_browser = "--no-browser" not in sys.argv
+    
     # 获取可执行文件所在目录
     if getattr(sys, 'frozen', False):
         app_dir = Path(sys._MEIPASS)
@@ -48,23 +89,42 @@ def main():
         sys.executable, "-m", "streamlit", "run",
         str(streamlit_script),
         "--server.headless", "true",
-        "--server.port", "8501",
+        "--server.port", str(PORT),
         "--browser.gatherUsageStats", "false"
     ]
     
-    # 启动服务器
-    proc = subprocess.Popen(cmd, 
-                           stdout=subprocess.PIPE, 
-                           stderr=subprocess.PIPE,
+    env = dict(os.environ)
+    metrics_file = base_dir / "goal_planner_startup.jsonl"
+    if profile:
+        # 应用在首次渲染完成时把耗时写入同一文件
+        env["GOAL_PLANNER_PROFILE_FILE"] = str(metrics_file)
+        env["GOAL_PLANNER_LAUNCH_TIME"] = repr(launched)
+    
+    # 启动服务器（输出不读取，直接丢弃，避免管道写满后阻塞）
+    proc = subprocess.Popen(cmd,
+                           stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL,
+                           env=env,
                            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0)
     
-    # 等待服务器启动
-    time.sleep(5)
+    # 等待服务器就绪
+    if not wait_for_server():
+        print("❌ 服务器启动超时")
+        proc.terminate()
+        return
     
-    # 打开浏览器
-    webbrowser.open("http://localhost:8501")
+    if profile:
+        ready_ms = round((time.time() - launched) * 1000, 1)
+        with open(metrics_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"t": int(time.time()), "kind": "server_ready", "launch": launched, "ready_ms": ready_ms}) + "\\n")
+        print(f"⏱️ 启动到服务器就绪 {ready_ms} ms")
     
-    print("✅ 应用已在浏览器中打开")
+    # 打开浏览器
+    if open_browser:
+        webbrowser.open(f"http://localhost:{PORT}")
+        print("✅ 应用已在浏览器中打开")
+    else:
+        print(f"✅ 应用已启动: http://localhost:{PORT}")
     print("💡 关闭此窗口将停止应用")
     
     # 等待进程结束
@@ -79,8 +139,8 @@ if __name__ == "__main__":
     
     print("✅ 启动器脚本已创建")
 
-def create_spec_file():
-    """创建 PyInstaller spec 文件"""
+def create_spec_file(optimize: int = 0):
+    """创建 PyInstaller spec 文件；optimize 为字节码优化级别（需要 PyInstaller 6.6 及以上）"""
     spec_content = '''
 # -*- mode: python ; coding: utf-8 -*-
 
@@ -92,18 +152,20 @@ a = Analysis(
     binaries=[],
     datas=[
         ('goal-planner-python.py', '.'),
+        ('goal_planner', 'goal_planner'),
         ('requirements.txt', '.'),
     ],
     hiddenimports=[
         'streamlit',
+        'numpy',
         'anthropic',
         'openai',
-        'requests',
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=%(excludes)r,
+    optimize=%(optimize)d,
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -142,17 +204,43 @@ coll = COLLECT(
 )
 '''
     
+    spec_content = spec_content % {'excludes': EXCLUDED_MODULES, 'optimize': optimize}
     with open("app.spec", "w", encoding="utf-8") as f:
         f.write(spec_content)
     
     print("✅ Spec 文件已创建")
 
+def precompile(optimize: int = 0):
+    """预先编译 goal_planner 的字节码，随数据文件一起打包，首次启动时不必再编译"""
+    compileall.compile_dir("goal_planner", quiet=1, optimize=optimize)
+    print("✅ 字节码已预编译")
+
+def measure_startup() -> float:
+    """以性能记录模式运行打包后的程序，返回启动到服务器就绪的毫秒数"""
+    exe = os.path.join(DIST_DIR, f"{APP_NAME}.exe")
+    proc = subprocess.Popen([exe, "--profile", "--no-browser"], stdout=subprocess.DEVNULL)
+    try:
+        ready = wait_for_health(SERVER_PORT, timeout=120)
+    finally:
+        if sys.platform == 'win32':
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)], capture_output=True)
+        else:
+            proc.terminate()
+    return round(ready * 1000, 1) if ready is not None else None
+
+def report_build(optimize: int, ready_ms=None):
+    """记录产物体积和启动耗时，并与上次构建比较"""
+    previous = next((r for r in reversed(load_metrics(BUILD_REPORTS_FILE, 'build')) if r['target'] == 'windows'), None)
+    report = build_report(DIST_DIR, 'windows', optimize=optimize, excludes=len(EXCLUDED_MODULES), ready_ms=ready_ms)
+    print_build_report(report, previous)
+    record_metric(report, BUILD_REPORTS_FILE)
+
 def build_exe():
     """构建可执行文件"""
     print("\n🔨 开始构建 Windows 可执行文件...")
     print("⏳ 这可能需要几分钟时间...\n")
     
-    cmd = ["pyinstaller", "--clean", "app.spec"]
+    cmd = ["pyinstaller", "--clean", "--noconfirm", "app.spec"]
     subprocess.run(cmd, check=True)
     
     print("\n✅ 构建完成！")
@@ -163,6 +251,14 @@ def build_exe():
     print("   3. 应用会在浏览器中自动打开")
 
 def main():
+    parser = argparse.ArgumentParser(description="Windows 打包工具")
+    parser.add_argument("--yes", action="store_true", help="不询问，直接构建")
+    parser.add_argument("--optimize", type=int, choices=[0, 1, 2], default=0,
+                        help="字节码优化级别；2 会去掉文档字符串，可能影响依赖文档字符串的库")
+    parser.add_argument("--no-precompile", action="store_true", help="不预编译 goal_planner 字节码")
+    parser.add_argument("--measure-startup", action="store_true", help="构建后运行程序，记录启动到服务器就绪的耗时")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("  🎯 智能目标管理系统 - Windows 打包工具")
     print("=" * 60)
@@ -175,13 +271,16 @@ def main():
     
     # 创建必要文件
     create_launcher_script()
-    create_spec_file()
+    create_spec_file(args.optimize)
     
-    # 询问是否开始构建
-    response = input("\n📦 是否开始构建可执行文件? (y/n): ")
+    # 询问是否开始构建；确认后才预编译，取消时不留下编译产物
+    response = 'y' if args.yes else input("\n📦 是否开始构建可执行文件? (y/n): ")
     if response.lower() == 'y':
         try:
+            if not args.no_precompile:
+                precompile(args.optimize)
             build_exe()
+            report_build(args.optimize, measure_startup() if args.measure_startup else None)
         except Exception as e:
             print(f"\n❌ 构建失败: {e}")
     else:
@@ -13,13 +13,15 @@ DIST_DIR="发布包"
 mkdir -p "$DIST_DIR"
 
 echo "1️⃣  创建简易跨平台版本..."
-zip -q "$DIST_DIR/智能目标管理-v${VERSION}-全平台.zip" \
+zip -q -r "$DIST_DIR/智能目标管理-v${VERSION}-全平台.zip" \
     goal-planner-python.py \
+    goal_planner \
     requirements.txt \
     启动应用.command \
     启动应用.bat \
     快速使用指南.md \
-    README.md
+    README.md \
+    -x "*.pyc" -x "*__pycache__*"
 
 SIZE=$(ls -lh "$DIST_DIR/智能目标管理-v${VERSION}-全平台.zip" | awk '{print $5}')
 echo "   ✅ 完成 (大小: $SIZE)"
@@ -28,6 +30,7 @@ echo ""
 echo "2️⃣  创建完整开发者版本..."
 zip -q -r "$DIST_DIR/智能目标管理-v${VERSION}-开发者版.zip" \
     goal-planner-python.py \
+    goal_planner \
     requirements.txt \
     setup.py \
     启动应用.command \
@@ -38,7 +41,7 @@ zip -q -r "$DIST_DIR/智能目标管理-v${VERSION}-开发者版.zip" \
     README-PACKAGING.md \
     快速使用指南.md \
     分发清单.md \
-    -x "*.pyc" -x "__pycache__/*" -x ".venv/*" -x "*.json"
+    -x "*.pyc" -x "*__pycache__*" -x ".venv/*" -x "*.json"
 
 SIZE=$(ls -lh "$DIST_DIR/智能目标管理-v${VERSION}-开发者版.zip" | awk '{print $5}')
 echo "   ✅ 完成 (大小: $SIZE)"
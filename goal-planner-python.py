@@ -1,11 +1,35 @@
 import streamlit as st
 import json
-import os
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional
-import anthropic
-import openai
-import requests
+from goal_planner.prompts import (
+    DEFAULT_INSIGHT_TOKEN_BUDGET, INSIGHTS_DELTA_MAX_RATIO, INSIGHTS_SYSTEM_PROMPT, BREAKDOWN_SYSTEM_PROMPT,
+    build_insights_prompt, build_insights_delta_prompt, build_breakdown_prompt,
+    snapshot_items, diff_snapshot, parse_ai_json,
+)
+from goal_planner.models import breakdown_to_records
+from goal_planner.dedup import DuplicateIndex
+from goal_planner.insight_rules import run_insight_rules
+from goal_planner.goal_tree import GoalTree, tree_signature
+from goal_planner.search import SearchIndex
+from goal_planner.profiling import record_first_render
+from goal_planner.render import format_time, schedule_html, insights_html
+from goal_planner.state import init_state, insights_data, refresh_task_indexes, add_task, update_task, writable
+from goal_planner.storage import (
+    SharedStore, save_state, load_state, list_profiles, profile_path, switch_profile,
+)
+from goal_planner.scheduler import (
+    generate_schedule, generate_weekly_schedule, get_weekly_tasks_for_next_7_days, export_to_icalendar,
+)
+from goal_planner.ai_client import (
+    AIClient, AIConfigError, AIJobRunner, load_ai_metrics, estimate_ai_cost, percentile,
+)
+from goal_planner.archive import ARCHIVE_AFTER_DAYS, archive_completed, partitions_signature, summarize_archive
+from goal_planner.batch import (
+    BATCH_FILE, BATCH_PROVIDERS, load_queue, locked_queue, enqueue_breakdowns, enqueue_insights,
+    submit_pending, poll_batches, queue_summary, provider_config,
+)
 
 # 页面配置
 st.set_page_config(
@@ -63,539 +87,367 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 数据文件路径
-DATA_FILE = "goal_planner_data.json"
+# AI 调用统计的时间窗口
+METRICS_WINDOWS = {
+    '1h': ('最近 1 小时', 3600),
+    '24h': ('最近 24 小时', 86400),
+    '7d': ('最近 7 天', 7 * 86400),
+    '30d': ('最近 30 天', 30 * 86400)
+}
+
+# AI 调用策略
+ROUTING_MODES = {
+    'fixed': '📌 固定使用选定提供商',
+    'fastest': '⚡ 自动选择最快的健康提供商',
+    'hedged': '🛡️ 对冲请求（超过 p95 延迟时并发备用提供商）'
+}
+AI_JOB_POLL_INTERVAL = 2         # 后台任务面板轮询间隔（秒）
+AI_FEATURE_LABELS = {
+    'breakdown': '🧠 目标分解',
+    'insights': '💡 效率洞察',
+    'test': '🔍 连接测试',
+    'general': '📦 其它'
+}
+
+# 列表显示
+DEFAULT_PAGE_SIZE = 20           # 目标等长列表每页显示的条目数
+PAGE_SIZE_OPTIONS = [10, 20, 50, 100]
+DESCRIPTION_PREVIEW_CHARS = 80   # 目标描述折叠时显示的字数
 
 # 数据结构初始化
 def init_session_state():
     """初始化 session state"""
-    if 'goals' not in st.session_state:
-        st.session_state.goals = []
-    if 'tasks' not in st.session_state:
-        st.session_state.tasks = []
-    if 'weekly_tasks' not in st.session_state:
-        st.session_state.weekly_tasks = []  # 新增周任务列表
-    if 'activities' not in st.session_state:
-        st.session_state.activities = []
-    if 'insights' not in st.session_state:
-        st.session_state.insights = []
-    if 'schedule' not in st.session_state:
-        st.session_state.schedule = []
-    if 'weekly_schedule' not in st.session_state:
-        st.session_state.weekly_schedule = {}  # 新增七日日程字典
-    if 'api_enabled' not in st.session_state:
-        st.session_state.api_enabled = False
-    if 'ai_provider' not in st.session_state:
-        st.session_state.ai_provider = "claude"
-    if 'api_configs' not in st.session_state:
-        st.session_state.api_configs = {
-            'claude': {'api_key': '', 'model': 'claude-3-5-sonnet-20241022'},
-            'openai': {'api_key': '', 'model': 'gpt-4o'},
-            'qwen': {'api_key': '', 'model': 'qwen-max', 'base_url': 'https://dashscope.aliyuncs.com/compatible-mode/v1'},
-            'deepseek': {'api_key': '', 'model': 'deepseek-chat', 'base_url': 'https://api.deepseek.com/v1'}
-        }
+    init_state(st.session_state)  # 数据、AI 设置和任务索引
+    if 'insight_token_budget' not in st.session_state:
+        st.session_state.insight_token_budget = DEFAULT_INSIGHT_TOKEN_BUDGET
+    if 'ai_jobs' not in st.session_state:
+        st.session_state.ai_jobs = {}  # 本会话提交的后台 AI 任务：任务 ID → 任务上下文
+    if 'duplicate_index' not in st.session_state:
+        st.session_state.duplicate_index = DuplicateIndex()  # 任务名近似重复索引，按需增量同步
+    if 'page_size' not in st.session_state:
+        st.session_state.page_size = DEFAULT_PAGE_SIZE
+    if 'compact_render' not in st.session_state:
+        st.session_state.compact_render = False  # 日程和洞察整段渲染为一个 HTML 块
+    if 'expanded_goals' not in st.session_state:
+        st.session_state.expanded_goals = set()  # 展开了子目标的目标 ID
+    if 'goal_tree' not in st.session_state:
+        st.session_state.goal_tree = GoalTree()  # 目标层级邻接表与子树汇总，目标变化时重建
+    if 'focus_goal' not in st.session_state:
+        st.session_state.focus_goal = None  # 最近一次跳转到的目标 ID
+    if 'expanded_descriptions' not in st.session_state:
+        st.session_state.expanded_descriptions = set()  # 展开了完整描述的目标 ID
+    if 'archive_after_days' not in st.session_state:
+        st.session_state.archive_after_days = ARCHIVE_AFTER_DAYS  # 完成超过该天数的任务自动归档
+    if 'archive_checked_on' not in st.session_state:
+        st.session_state.archive_checked_on = None  # 本会话上次检查归档的日期，每天检查一次
+    # 链接中的 ?profile= 指定档案，每个用户可以收藏自己的地址
+    requested = st.query_params.get('profile')
+    if requested and requested != st.session_state.profile:
+        select_profile(requested)
 
 # 数据持久化
+@st.cache_resource
+def get_shared_store() -> SharedStore:
+    """进程内所有会话共享的数据快照"""
+    return SharedStore()
+
+def data_file(filename: Optional[str] = None) -> str:
+    """当前档案的数据文件（或同目录下的批量队列等文件）"""
+    if filename is None:
+        return profile_path(st.session_state.profile)
+    return profile_path(st.session_state.profile, filename)
+
+def select_profile(profile: str) -> bool:
+    """切换档案并清空与数据相关的界面缓存，数据在下次 load_data() 时加载"""
+    try:
+        switch_profile(st.session_state, profile)
+    except ValueError as e:
+        st.error(str(e))
+        return False
+    st.session_state.duplicate_index = DuplicateIndex()
+    st.session_state.expanded_goals = set()
+    st.session_state.expanded_descriptions = set()
+    st.session_state.focus_goal = None
+    st.session_state.archive_checked_on = None
+    st.query_params['profile'] = profile
+    return True
+
+def create_profile():
+    """新建档案：切换过去并写入空的数据分片"""
+    if select_profile(st.session_state.new_profile_name.strip()):
+        save_data()
+        st.session_state.new_profile_name = ''
+
 def save_data():
-    """保存数据到文件"""
-    data = {
-        'goals': st.session_state.goals,
-        'tasks': st.session_state.tasks,
-        'weekly_tasks': st.session_state.get('weekly_tasks', []),
-        'activities': st.session_state.activities,
-        'insights': st.session_state.insights,
-        'schedule': st.session_state.schedule,
-        'weekly_schedule': st.session_state.get('weekly_schedule', {}),
-        'saved_at': datetime.now().isoformat()
-    }
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """保存数据到文件；其他会话同时修改过的记录已合并，同一字段的冲突以当前页面为准"""
+    conflicts = save_state(st.session_state, data_file(), get_shared_store())
+    if conflicts:
+        names = '、'.join(str(c['name'] or c['id']) for c in conflicts[:3])
+        st.toast(f"⚠️ 已合并其他会话的修改，{len(conflicts)} 处冲突以当前页面为准：{names}")
 
 def load_data():
-    """从文件加载数据"""
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                st.session_state.goals = data.get('goals', [])
-                st.session_state.tasks = data.get('tasks', [])
-                st.session_state.weekly_tasks = data.get('weekly_tasks', [])
-                st.session_state.activities = data.get('activities', [])
-                st.session_state.insights = data.get('insights', [])
-                st.session_state.schedule = data.get('schedule', [])
-                st.session_state.weekly_schedule = data.get('weekly_schedule', {})
-        except Exception as e:
-            st.error(f"加载数据失败: {str(e)}")
+    """从文件加载数据；文件自上次读写以来没有变化时沿用 session state"""
+    try:
+        load_state(st.session_state, data_file(), get_shared_store())
+    except Exception as e:
+        st.error(f"加载数据失败: {str(e)}")
 
-# AI API 调用类
-class AIClient:
-    """统一的AI客户端类，支持多个提供商"""
-    
-    @staticmethod
-    def call_ai_api(prompt: str, max_tokens: int = 2000) -> Optional[str]:
-        """调用选定的AI API"""
-        if not st.session_state.api_enabled:
-            st.warning("请先在设置中启用AI API")
-            return None
-            
-        provider = st.session_state.ai_provider
-        config = st.session_state.api_configs.get(provider, {})
-        api_key = config.get('api_key', '')
-        
-        if not api_key:
-            st.warning(f"请先在设置中配置 {provider.upper()} API Key")
-            return None
-        
-        try:
-            if provider == 'claude':
-                return AIClient._call_claude(prompt, max_tokens, config)
-            elif provider == 'openai':
-                return AIClient._call_openai(prompt, max_tokens, config)
-            elif provider == 'qwen':
-                return AIClient._call_qwen(prompt, max_tokens, config)
-            elif provider == 'deepseek':
-                return AIClient._call_deepseek(prompt, max_tokens, config)
-            else:
-                st.error(f"不支持的AI提供商: {provider}")
-                return None
-        except Exception as e:
-            st.error(f"{provider.upper()} API 调用失败: {str(e)}")
-            return None
-    
-    @staticmethod
-    def _call_claude(prompt: str, max_tokens: int, config: Dict) -> str:
-        """调用Claude API"""
-        client = anthropic.Anthropic(api_key=config['api_key'])
-        message = client.messages.create(
-            model=config['model'],
-            max_tokens=max_tokens,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return message.content[0].text
-    
-    @staticmethod
-    def _call_openai(prompt: str, max_tokens: int, config: Dict) -> str:
-        """调用OpenAI API"""
-        client = openai.OpenAI(api_key=config['api_key'])
-        response = client.chat.completions.create(
-            model=config['model'],
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content
-    
-    @staticmethod
-    def _call_qwen(prompt: str, max_tokens: int, config: Dict) -> str:
-        """调用通义千问API"""
-        client = openai.OpenAI(
-            api_key=config['api_key'],
-            base_url=config['base_url']
-        )
-        response = client.chat.completions.create(
-            model=config['model'],
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content
-    
-    @staticmethod
-    def _call_deepseek(prompt: str, max_tokens: int, config: Dict) -> str:
-        """调用DeepSeek API"""
-        client = openai.OpenAI(
-            api_key=config['api_key'],
-            base_url=config['base_url']
-        )
-        response = client.chat.completions.create(
-            model=config['model'],
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content
+def auto_archive():
+    """每个会话每天检查一次，把完成较久的任务移入归档"""
+    today = date.today().isoformat()
+    if st.session_state.archive_checked_on == today:
+        return
+    st.session_state.archive_checked_on = today
+    try:
+        archived = archive_completed(st.session_state, data_file(), st.session_state.archive_after_days)
+    except Exception as e:
+        st.error(f"归档失败: {str(e)}")
+        return
+    if archived:
+        save_data()
+        st.toast(f"🗄️ 已归档 {archived} 条完成超过 {st.session_state.archive_after_days} 天的任务")
 
-# 生成智能日程
-def generate_schedule():
-    """生成智能日程"""
-    schedule = []
-    activities = sorted(st.session_state.activities, key=lambda x: x['startTime'])
-    tasks = sorted(
-        [t for t in st.session_state.tasks if not t['completed']], 
-        key=lambda x: x['priority'], 
-        reverse=True
-    )
-    
-    current_time = 480  # 8:00 AM in minutes
-    
-    for activity in activities:
-        hours, minutes = map(int, activity['startTime'].split(':'))
-        activity_start = hours * 60 + minutes
-        
-        # 在活动之前安排任务
-        if activity_start > current_time and tasks:
-            available_time = activity_start - current_time
-            if available_time >= 30:
-                task = tasks.pop(0)
-                schedule.append({
-                    'type': 'task',
-                    'item': task,
-                    'startTime': current_time,
-                    'duration': min(available_time, task['estimatedTime'])
-                })
-        
-        # 添加活动
-        schedule.append({
-            'type': 'activity',
-            'item': activity,
-            'startTime': activity_start,
-            'duration': activity['duration']
+# AI 调用遥测
+def summarize_ai_metrics(records: List[Dict], key: str, labels: Dict[str, str]) -> List[Dict]:
+    """按提供商（key='p'）或功能（key='f'）汇总调用次数、延迟分位数、Token 和费用"""
+    groups = {}
+    for record in records:
+        groups.setdefault(record[key], []).append(record)
+    
+    rows = []
+    for name, group in groups.items():
+        completed = [r for r in group if not r.get('x')]
+        latencies = sorted(r['ms'] for r in completed if r['ok'])
+        ttfts = sorted(r['ttft'] for r in completed if r['ok'] and r['ttft'] is not None)
+        input_tokens = sum(r['in'] for r in group)
+        cached_tokens = sum(r['cr'] for r in group)
+        rows.append({
+            '名称': labels.get(name, name),
+            '调用次数': len(completed),
+            '失败': len([r for r in completed if not r['ok']]),
+            '重试': sum(r['r'] for r in group),
+            'p50 延迟(秒)': _format_ms(percentile(latencies, 50)),
+            'p95 延迟(秒)': _format_ms(percentile(latencies, 95)),
+            'p50 首Token(秒)': _format_ms(percentile(ttfts, 50)),
+            '输入 Token': input_tokens,
+            '输出 Token': sum(r['out'] for r in group),
+            '缓存命中': f"{cached_tokens / input_tokens:.0%}" if input_tokens else '-',
+            '估算费用($)': f"{sum(estimate_ai_cost(r) for r in group):.4f}"
         })
-        
-        current_time = activity_start + activity['duration']
-    
-    st.session_state.schedule = schedule
-    generate_basic_insights()
+    return sorted(rows, key=lambda r: r['调用次数'], reverse=True)
+
+def _format_ms(value: Optional[float]) -> str:
+    """毫秒转为秒的显示文本"""
+    return f"{value / 1000:.2f}" if value is not None else '-'
 
 # 生成基础洞察
 def generate_basic_insights():
-    """生成基础效率洞察"""
-    insights = []
-    
-    # 检测重复任务
-    task_names = [t['name'].lower() for t in st.session_state.tasks]
-    duplicates = len(task_names) - len(set(task_names))
-    if duplicates > 0:
-        insights.append({
-            'type': 'automation',
-            'title': '发现重复任务',
-            'description': f'检测到 {duplicates} 个重复任务，建议创建模板或自动化流程',
-            'priority': 'high'
-        })
-    
-    # 检测时间超载
-    total_task_time = sum(t['estimatedTime'] for t in st.session_state.tasks)
-    total_activity_time = sum(a['duration'] for a in st.session_state.activities)
-    available_time = 960 - total_activity_time
-    
-    if total_task_time > available_time:
-        insights.append({
-            'type': 'warning',
-            'title': '任务时间超载',
-            'description': f'今日任务需要 {total_task_time//60} 小时，但只有 {available_time//60} 小时可用。建议重新评估优先级',
-            'priority': 'high'
-        })
-    
-    # 检测会议密集
-    meeting_count = len([t for t in st.session_state.tasks if t['category'] == '会议'])
-    if meeting_count > 3:
-        insights.append({
-            'type': 'efficiency',
-            'title': '会议密集',
-            'description': '今日会议较多，建议合并相关会议或改用异步沟通',
-            'priority': 'medium'
-        })
-    
-    st.session_state.insights = insights
-
-# 生成 AI 洞察
-def generate_ai_insights():
-    """使用 Claude AI 生成深度洞察"""
-    prompt = f"""作为一个专业的效率顾问，请分析以下用户的目标、任务和日程安排，提供深度洞察和建议：
-
-目标列表：
-{chr(10).join([f"- {g['name']} ({g['type']}, 进度: {g['progress']}%)" for g in st.session_state.goals])}
+    """生成基础效率洞察：所有规则共用一次数据遍历"""
+    st.session_state.insights = run_insight_rules(
+        insights_data(st.session_state), context={'duplicate_index': st.session_state.duplicate_index}
+    )
 
-日常活动：
-{chr(10).join([f"- {a['name']} at {a['startTime']}, {a['duration']}分钟" for a in st.session_state.activities])}
+# AI 调用：核心客户端的配置错误在界面上提示
+def prepare_ai_call(prompt: str, max_tokens: int = 2000, provider: Optional[str] = None,
+                    system: Optional[str] = None, feature: str = 'general') -> Optional[Dict]:
+    """按当前设置生成调用计划，未启用 AI 或缺少 API Key 时提示并返回 None"""
+    try:
+        return AIClient.prepare_call(st.session_state, prompt, max_tokens, provider, system, feature)
+    except AIConfigError as e:
+        st.warning(str(e))
+        return None
 
-待办任务：
-{chr(10).join([f"- {t['name']} (优先级: {t['priority']}, 预计: {t['estimatedTime']}分钟)" for t in st.session_state.tasks if not t['completed']])}
+# 生成 AI 洞察
+def generate_ai_insights(full: bool = False) -> Optional[str]:
+    """提交 AI 深度洞察后台任务并返回任务 ID；有上次快照时只发送变化部分，full=True 时强制完整分析"""
+    ranked = AIClient.rank_providers(st.session_state)
+    provider = ranked[0] if ranked else st.session_state.ai_provider
+    budget = st.session_state.get('insight_token_budget', DEFAULT_INSIGHT_TOKEN_BUDGET)
+    data = insights_data(st.session_state)
+    snapshot = st.session_state.get('insights_snapshot')
+    
+    prompt = None
+    if snapshot and not full:
+        changes = diff_snapshot(snapshot['items'], data)
+        total_items = sum(len(items) for items in data.values())
+        if not changes:
+            st.session_state.insights = snapshot['insights']
+            st.info('自上次分析以来数据没有变化，沿用上次的 AI 洞察')
+            return None
+        if len(changes) <= total_items * INSIGHTS_DELTA_MAX_RATIO:
+            totals = {
+                'goals': len(data['goals']),
+                'open_tasks': st.session_state.task_stats.open_count(),
+                'activities': len(data['activities'])
+            }
+            prompt = build_insights_delta_prompt(changes, snapshot['insights'], totals, provider, budget)
+    
+    if prompt is None:
+        stats = st.session_state.task_stats
+        open_tasks = stats.open_tasks('tasks') + stats.open_tasks('weekly_tasks')
+        prompt = build_insights_prompt(data['goals'], data['activities'], open_tasks, provider, budget)
+    
+    plan = prepare_ai_call(prompt, max_tokens=2000, system=INSIGHTS_SYSTEM_PROMPT, feature='insights')
+    if plan is None:
+        return None
+    # 快照取提交时的数据，后台运行期间的修改会在下次增量分析中发送
+    job_id = submit_ai_job('insights', '💡 AI 洞察', plan, {'snapshot_items': snapshot_items(data)})
+    st.info('AI 正在后台分析，完成后会自动更新洞察，可以继续其他操作')
+    return job_id
 
-请提供以下分析：
-1. 识别可以自动化或优化的重复性工作
-2. 时间管理建议
-3. 目标对齐度分析（任务是否支持目标）
-4. 效率提升的具体行动建议
-5. 潜在的时间陷阱或浪费
+def apply_insights_job(outcome: Dict, context: Dict):
+    """把后台洞察任务的结果写回 session state"""
+    if outcome['text'] is None:
+        return
+    try:
+        result = parse_ai_json(outcome['text'])
+    except Exception as e:
+        st.toast(f"❌ 解析 AI 响应失败: {str(e)}")
+        return
+    st.session_state.insights = result.get('insights', [])
+    st.session_state.insights_snapshot = {
+        'items': context['snapshot_items'],
+        'insights': st.session_state.insights,
+        'createdAt': datetime.now().isoformat()
+    }
+    save_data()
+    st.toast('✨ AI 洞察生成成功！')
 
-请以JSON格式返回，格式如下：
-{{
-  "insights": [
-    {{
-      "type": "automation/efficiency/warning/success",
-      "title": "标题",
-      "description": "详细描述",
-      "priority": "high/medium/low",
-      "actionable": "具体可执行的建议"
-    }}
-  ]
-}}
+# AI 目标分解
+def ai_goal_breakdown(goal: Dict) -> Optional[str]:
+    """提交 AI 目标分解后台任务并返回任务 ID"""
+    prompt = build_breakdown_prompt(goal)
+    plan = prepare_ai_call(prompt, max_tokens=2500, system=BREAKDOWN_SYSTEM_PROMPT, feature='breakdown')
+    if plan is None:
+        return None
+    return submit_ai_job('breakdown', f"🧠 分解「{goal['name']}」", plan, {'goal': goal})
 
-只返回JSON，不要其他内容。"""
-    
-    with st.spinner('AI 正在分析中...'):
-        response = AIClient.call_ai_api(prompt, max_tokens=2000)
-        if response:
-            try:
-                # 去除可能的 markdown 代码块标记
-                response = response.replace('```json', '').replace('```', '').strip()
-                result = json.loads(response)
-                st.session_state.insights = result.get('insights', [])
-                st.success('✨ AI 洞察生成成功！')
-            except Exception as e:
-                st.error(f"解析 AI 响应失败: {str(e)}")
+def apply_breakdown_job(outcome: Dict, context: Dict):
+    """把后台分解任务的结果放入分解模态框"""
+    if outcome['text'] is None:
+        return
+    try:
+        result = parse_ai_json(outcome['text'])
+    except Exception as e:
+        st.toast(f"❌ 解析 AI 响应失败: {str(e)}")
+        return
+    st.session_state.selected_goal = context['goal']
+    st.session_state.breakdown_result = result
+    st.session_state.show_breakdown_modal = True
+    st.toast(f"🧠 「{context['goal']['name']}」分解完成，请在目标页面查看")
 
-# AI 目标分解
-def ai_goal_breakdown(goal: Dict):
-    """使用 AI 分解目标"""
-    prompt = f"""作为一个目标管理专家，请帮我将以下大目标分解为更小、更可执行的子目标。
+def apply_connection_test_job(outcome: Dict, context: Dict):
+    """提示后台连接测试成功及耗时；失败已由任务面板统一提示"""
+    if outcome['text']:
+        latency = outcome['results'][-1]['latency']
+        st.toast(f"✅ {context['provider_label']} 连接成功（{latency:.2f} 秒）")
 
-目标信息：
-- 名称: {goal['name']}
-- 类型: {goal['type']}
-- 分类: {goal.get('category', '未分类')}
-- 描述: {goal.get('description', '无')}
-- 截止日期: {goal.get('deadline', '无')}
+# 后台 AI 任务
+@st.cache_resource
+def get_job_runner() -> AIJobRunner:
+    """获取进程内共享的后台任务执行器"""
+    return AIJobRunner()
 
-请将这个{goal['type']}分解为适当粒度的子目标，遵循以下原则：
-1. 如果是长期目标，分解为3-5个年度目标
-2. 如果是年度目标，分解为4-6个季度目标
-3. 如果是季度目标，分解为3-4个月度目标
-4. 如果是月度目标，分解为4-5个周任务
-5. 如果是周任务，分解为每天的具体行动（包括建议的执行日期和时间）
-6. 每个子目标应该是SMART原则的（具体、可衡量、可实现、相关、有时限）
-7. 子目标之间应有逻辑关系，形成实现主目标的路径
-8. 为每个子目标设定合理的截止日期和预计完成时间
+AI_JOB_APPLIERS = {
+    'insights': apply_insights_job,
+    'breakdown': apply_breakdown_job,
+    'test': apply_connection_test_job
+}
 
-请以JSON格式返回，格式如下：
-{{
-  "analysis": "对主目标的分析和分解思路",
-  "subGoals": [
-    {{
-      "name": "子目标名称",
-      "type": "年度/季度/月度/周",
-      "category": "分类",
-      "description": "详细描述",
-      "deadline": "YYYY-MM-DD",
-      "estimatedTime": 60,
-      "priority": 2,
-      "keyActions": ["关键行动1", "关键行动2"]
-    }}
-  ]
-}}
+def submit_ai_job(kind: str, label: str, plan: Dict, context: Dict) -> str:
+    """提交后台 AI 任务并记录在当前会话中，结果由 show_ai_jobs_panel 轮询取回"""
+    job_id = get_job_runner().submit(plan)
+    st.session_state.ai_jobs[job_id] = {'kind': kind, 'label': label, **context}
+    return job_id
 
-只返回JSON，不要其他内容。"""
-    
-    with st.spinner('AI 正在分析目标...'):
-        response = AIClient.call_ai_api(prompt, max_tokens=2500)
-        if response:
-            try:
-                response = response.replace('```json', '').replace('```', '').strip()
-                result = json.loads(response)
-                return result
-            except Exception as e:
-                st.error(f"解析 AI 响应失败: {str(e)}")
-                return None
-    return None
+def pending_ai_jobs(kind: str) -> List[str]:
+    """返回当前会话中某类未取回的任务 ID"""
+    return [job_id for job_id, context in st.session_state.ai_jobs.items() if context['kind'] == kind]
 
-# 获取近七日的周任务
-def get_weekly_tasks_for_next_7_days():
-    """获取未来7天内需要完成的周任务"""
-    today = datetime.now().date()
-    seven_days_later = today + timedelta(days=7)
+@st.fragment(run_every=AI_JOB_POLL_INTERVAL)
+def show_ai_jobs_panel():
+    """轮询后台 AI 任务，完成后应用结果并刷新页面"""
+    jobs = st.session_state.ai_jobs
+    if not jobs:
+        return
     
-    upcoming_tasks = []
-    for task in st.session_state.weekly_tasks:
-        if task.get('completed'):
+    runner = get_job_runner()
+    finished = False
+    st.subheader("🧵 后台任务")
+    for job_id, context in list(jobs.items()):
+        job = runner.get(job_id)
+        if job is None:
+            # 进程重启后任务丢失
+            del jobs[job_id]
+            finished = True
+            continue
+        if job['status'] == 'done':
+            outcome = job['outcome']
+            AIClient.record_outcome(st.session_state, outcome)
+            if outcome['text'] is None:
+                st.toast(f"❌ {context['label']} 失败: {outcome['error']}")
+            AI_JOB_APPLIERS[context['kind']](outcome, context)
+            del jobs[job_id]
+            runner.forget(job_id)
+            finished = True
             continue
         
-        # 检查任务是否在未来7天内
-        task_date = task.get('scheduledDate')
-        if task_date:
-            try:
-                task_datetime = datetime.fromisoformat(task_date).date()
-                if today <= task_datetime <= seven_days_later:
-                    upcoming_tasks.append(task)
-            except:
-                pass
+        elapsed = time.time() - job['submitted']
+        status = '⏳ 排队中' if job['status'] == 'queued' else '🔄 运行中'
+        st.caption(f"{status} {context['label']} · {elapsed:.0f} 秒")
     
-    return sorted(upcoming_tasks, key=lambda x: x.get('scheduledDate', ''))
+    if finished:
+        st.rerun()
 
-# 生成七日智能日程
-def generate_weekly_schedule():
-    """生成未来7天的智能日程安排"""
-    weekly_schedule = {}
-    
-    # 获取未来7天的日期
-    base_date = datetime.now().date()
-    
-    for day_offset in range(7):
-        current_date = base_date + timedelta(days=day_offset)
-        date_str = current_date.isoformat()
-        
-        # 获取这一天的周任务
-        day_weekly_tasks = [
-            t for t in st.session_state.weekly_tasks 
-            if t.get('scheduledDate') == date_str and not t.get('completed')
-        ]
-        
-        # 获取这一天的普通任务
-        day_tasks = [
-            t for t in st.session_state.tasks 
-            if t.get('scheduledDate') == date_str and not t.get('completed')
-        ]
-        
-        # 合并所有任务并排序
-        all_tasks = day_weekly_tasks + day_tasks
-        all_tasks = sorted(all_tasks, key=lambda x: x.get('priority', 1), reverse=True)
-        
-        # 生成这一天的时间表
-        schedule = []
-        activities = sorted(st.session_state.activities, key=lambda x: x['startTime'])
-        
-        current_time = 480  # 8:00 AM in minutes
-        
-        for activity in activities:
-            hours, minutes = map(int, activity['startTime'].split(':'))
-            activity_start = hours * 60 + minutes
-            
-            # 在活动之前安排任务
-            if activity_start > current_time and all_tasks:
-                available_time = activity_start - current_time
-                while available_time >= 30 and all_tasks:
-                    task = all_tasks.pop(0)
-                    task_duration = task.get('estimatedTime', 60)
-                    actual_duration = min(available_time, task_duration)
-                    
-                    schedule.append({
-                        'type': 'task',
-                        'item': task,
-                        'startTime': current_time,
-                        'duration': actual_duration
-                    })
-                    
-                    current_time += actual_duration
-                    available_time -= actual_duration
-            
-            # 添加活动
-            schedule.append({
-                'type': 'activity',
-                'item': activity,
-                'startTime': activity_start,
-                'duration': activity['duration']
-            })
-            
-            current_time = activity_start + activity['duration']
-        
-        # 安排剩余任务
-        while all_tasks and current_time < 1320:  # 22:00
-            task = all_tasks.pop(0)
-            task_duration = task.get('estimatedTime', 60)
-            
-            schedule.append({
-                'type': 'task',
-                'item': task,
-                'startTime': current_time,
-                'duration': task_duration
-            })
-            
-            current_time += task_duration
-        
-        weekly_schedule[date_str] = schedule
-    
-    st.session_state.weekly_schedule = weekly_schedule
-    return weekly_schedule
+# 分页显示
+def paginate(items: List, key: str, page_size: Optional[int] = None) -> List:
+    """返回当前页的条目；超过一页时显示翻页控件，页码保存在 session state 中"""
+    page_size = page_size or st.session_state.page_size
+    pages = max(1, -(-len(items) // page_size))
+    if pages == 1:
+        return items
+    state_key = f"page_{key}"
+    page = min(st.session_state.get(state_key, 0), pages - 1)
+    st.session_state[state_key] = page
 
-# 导出日程到iCalendar格式
-def export_to_icalendar(schedule_dict: Dict) -> str:
-    """将日程导出为iCalendar格式的字符串"""
-    
-    # iCalendar头部
-    ical_content = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//智能目标管理系统//Goal Planner v1.0//CN",
-        "CALSCALE:GREGORIAN",
-        "METHOD:PUBLISH",
-        "X-WR-CALNAME:智能目标管理日程",
-        "X-WR-TIMEZONE:Asia/Shanghai",
-    ]
-    
-    # 为每个日期的每个事项创建事件
-    for date_str, schedule in schedule_dict.items():
-        for item in schedule:
-            event_date = datetime.fromisoformat(date_str)
-            start_time = format_time(item['startTime'])
-            end_time = format_time(item['startTime'] + item['duration'])
-            
-            # 创建datetime对象
-            start_datetime = datetime.combine(
-                event_date.date(),
-                datetime.strptime(start_time, '%H:%M').time()
-            )
-            end_datetime = datetime.combine(
-                event_date.date(),
-                datetime.strptime(end_time, '%H:%M').time()
-            )
-            
-            # 转换为UTC时间字符串格式
-            dtstart = start_datetime.strftime('%Y%m%dT%H%M%S')
-            dtend = end_datetime.strftime('%Y%m%dT%H%M%S')
-            
-            # 创建唯一ID
-            uid = f"{dtstart}-{item['type']}-{hash(item['item']['name'])}@goalplanner"
-            
-            # 事件名称和描述
-            if item['type'] == 'task':
-                task_item = item['item']
-                summary = f"🎯 {task_item['name']}"
-                description = f"类型: 任务\\n"
-                description += f"优先级: {task_item.get('priority', 2)}\\n"
-                if task_item.get('preparation'):
-                    description += f"准备: {task_item['preparation']}\\n"
-                if task_item.get('guidance'):
-                    description += f"指导: {task_item['guidance']}\\n"
-            else:
-                activity_item = item['item']
-                summary = f"⏰ {activity_item['name']}"
-                description = "类型: 日常活动"
-            
-            # 添加事件
-            ical_content.extend([
-                "BEGIN:VEVENT",
-                f"UID:{uid}",
-                f"DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%SZ')}",
-                f"DTSTART:{dtstart}",
-                f"DTEND:{dtend}",
-                f"SUMMARY:{summary}",
-                f"DESCRIPTION:{description}",
-                "STATUS:CONFIRMED",
-                "TRANSP:OPAQUE",
-                "END:VEVENT",
-            ])
-    
-    # iCalendar结尾
-    ical_content.append("END:VCALENDAR")
-    
-    return "\n".join(ical_content)
+    def turn(step: int):
+        st.session_state[state_key] += step
 
-# 格式化时间
-def format_time(minutes: int) -> str:
-    """将分钟转换为时间格式"""
-    hours = minutes // 60
-    mins = minutes % 60
-    return f"{hours:02d}:{mins:02d}"
+    col1, col2, col3 = st.columns([0.2, 0.6, 0.2])
+    with col1:
+        st.button("◀ 上一页", key=f"{state_key}_prev", disabled=page == 0,
+                  on_click=turn, args=(-1,), use_container_width=True)
+    with col3:
+        st.button("下一页 ▶", key=f"{state_key}_next", disabled=page == pages - 1,
+                  on_click=turn, args=(1,), use_container_width=True)
+    with col2:
+        st.caption(f"第 {page + 1} / {pages} 页 · 共 {len(items)} 项")
+    return items[page * page_size:(page + 1) * page_size]
 
 # 主应用
 def main():
     init_session_state()
     load_data()
+    auto_archive()
     
     # 侧边栏
     with st.sidebar:
         st.title("🎯 智能目标管理")
         
+        # 档案：每个档案是独立的数据分片，只加载当前档案
+        profiles = list_profiles()
+        if st.session_state.profile not in profiles:
+            profiles.append(st.session_state.profile)
+        st.session_state.profile_selector = st.session_state.profile
+        st.selectbox("👤 档案", profiles, key='profile_selector',
+                     on_change=lambda: select_profile(st.session_state.profile_selector))
+        with st.expander("➕ 新建档案"):
+            st.text_input("档案名", key='new_profile_name', placeholder="字母、数字、汉字、下划线或连字符")
+            st.button("创建并切换", on_click=create_profile)
+        
         page = st.radio(
             "导航",
-            ["📊 仪表板", "🎯 目标", "📅 日程", "💡 洞察", "⚙️ 设置"],
+            ["📊 仪表板", "🎯 目标", "📅 日程", "💡 洞察", "🔍 搜索", "⚙️ 设置"],
             label_visibility="collapsed"
         )
         
@@ -608,11 +460,12 @@ def main():
         if st.button("📝 添加任务"):
             st.session_state.show_task_modal = True
         if st.button("🧠 生成今日日程"):
-            generate_schedule()
+            generate_schedule(st.session_state)
+            generate_basic_insights()
             save_data()
             st.success("今日日程已生成！")
         if st.button("📅 生成七日日程"):
-            generate_weekly_schedule()
+            generate_weekly_schedule(st.session_state)
             save_data()
             st.success("七日日程已生成！")
         if st.button("✨ AI洞察"):
@@ -631,14 +484,25 @@ def main():
         show_schedule()
     elif page == "💡 洞察":
         show_insights()
+    elif page == "🔍 搜索":
+        show_search()
     elif page == "⚙️ 设置":
         show_settings()
+    
+    # 后台任务面板放在最后渲染，本次运行中提交的任务也能立即显示
+    if st.session_state.ai_jobs:
+        with st.sidebar:
+            show_ai_jobs_panel()
+    
+    # 性能记录模式（由启动器设置环境变量）下记录启动到首次渲染的耗时
+    record_first_render()
 
 def show_dashboard():
     """显示仪表板"""
     st.title("📊 仪表板")
     
-    # 统计卡片
+    # 统计卡片：计数由 task_stats 增量维护，不随任务数量增长
+    stats = st.session_state.task_stats
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -647,18 +511,13 @@ def show_dashboard():
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
-        active_tasks = len([t for t in st.session_state.tasks if not t['completed']])
         st.markdown('<div class="stat-card">', unsafe_allow_html=True)
-        st.metric("今日任务", active_tasks)
+        st.metric("今日任务", stats.open_count('tasks'))
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col3:
-        if st.session_state.tasks:
-            completion_rate = len([t for t in st.session_state.tasks if t['completed']]) / len(st.session_state.tasks) * 100
-        else:
-            completion_rate = 0
         st.markdown('<div class="stat-card">', unsafe_allow_html=True)
-        st.metric("完成率", f"{completion_rate:.0f}%")
+        st.metric("完成率", f"{stats.completion_rate('tasks'):.0f}%")
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col4:
@@ -670,21 +529,15 @@ def show_dashboard():
     
     # 今日重点任务
     st.subheader("📋 今日重点任务")
-    active_tasks = [t for t in st.session_state.tasks if not t['completed']][:5]
+    today = datetime.now().date()
+    date_index = st.session_state.date_index
+    st.caption(f"📅 今天计划 {date_index.count_between(today, today)} 项 · "
+               f"未来 7 天 {date_index.count_between(today, today + timedelta(days=6))} 项")
+    active_tasks = stats.first_open('tasks', 5)
     
     if active_tasks:
         for task in active_tasks:
-            col1, col2 = st.columns([0.1, 0.9])
-            with col1:
-                if st.checkbox("", key=f"task_check_{task['id']}", value=task['completed']):
-                    task['completed'] = True
-                    save_data()
-                    st.rerun()
-            with col2:
-                priority_color = {1: "🟢", 2: "🟡", 3: "🔴"}
-                st.write(f"{priority_color[task['priority']]} **{task['name']}** ({task['estimatedTime']}分钟)")
-                if task.get('preparation'):
-                    st.caption(f"📋 {task['preparation']}")
+            show_task_row(task['id'])
     else:
         st.info("暂无待办任务，添加一些任务开始吧！")
     
@@ -693,8 +546,38 @@ def show_dashboard():
     # 最新洞察
     if st.session_state.insights:
         st.subheader("💡 效率洞察")
-        for insight in st.session_state.insights[:3]:
-            show_insight_card(insight)
+        if st.session_state.compact_render:
+            st.markdown(insights_html(st.session_state.insights[:3]), unsafe_allow_html=True)
+        else:
+            for insight in st.session_state.insights[:3]:
+                show_insight_card(insight)
+
+def current_task(task_id) -> Optional[Dict]:
+    """按 ID 取会话中当前的任务记录；写时复制后，之前拿到的记录可能已不是列表中的那一条"""
+    task = st.session_state.task_stats.open_task('tasks', task_id)
+    if task is None:
+        task = next((t for t in st.session_state.tasks if t['id'] == task_id), None)
+    return task
+
+@st.fragment
+def show_task_row(task_id):
+    """今日重点任务中的一行：勾选只重新运行本行，统计和列表在下次整页刷新时更新"""
+    # 片段重新运行时参数不变，每次都按 ID 取最新的记录
+    task = current_task(task_id)
+    if task is None:
+        return
+    col1, col2 = st.columns([0.1, 0.9])
+    with col1:
+        done = st.checkbox("", key=f"task_check_{task_id}", value=task['completed'])
+    if done != task['completed']:
+        task = update_task(st.session_state, task, completed=done)
+        save_data()
+    with col2:
+        priority_color = {1: "🟢", 2: "🟡", 3: "🔴"}
+        name = f"~~{task['name']}~~" if task['completed'] else f"**{task['name']}**"
+        st.write(f"{priority_color[task['priority']]} {name} ({task['estimatedTime']}分钟)")
+        if task.get('preparation') and not task['completed']:
+            st.caption(f"📋 {task['preparation']}")
 
 def show_goals():
     """显示目标页面"""
@@ -705,11 +588,32 @@ def show_goals():
         if st.button("➕ 新建目标", use_container_width=True):
             st.session_state.show_goal_modal = True
     
+    if st.session_state.goals:
+        tree = get_goal_tree()
+        col1, col2 = st.columns([0.3, 0.7])
+        with col1:
+            view = st.radio("视图", ["🗂️ 卡片", "🌳 目标树"], horizontal=True,
+                            label_visibility="collapsed", key="goal_view")
+        with col2:
+            st.selectbox(
+                "跳转到目标",
+                list(tree.by_id),
+                index=None,
+                format_func=lambda goal_id: f"{tree.by_id[goal_id]['name']}（{tree.by_id[goal_id]['type']}）",
+                placeholder="🔎 跳转到目标…",
+                label_visibility="collapsed",
+                key="goal_jump",
+                on_change=jump_to_goal
+            )
+    
     st.divider()
     
     if st.session_state.goals:
-        for goal in st.session_state.goals:
-            show_goal_card(goal)
+        for goal in paginate(tree.roots(), 'goals'):
+            if view == "🌳 目标树":
+                show_goal_tree_node(goal, tree)
+            else:
+                show_goal_card(goal, tree)
     else:
         st.info("还没有目标，开始设定你的第一个目标吧！")
     
@@ -721,8 +625,58 @@ def show_goals():
     if st.session_state.get('show_breakdown_modal', False):
         show_breakdown_modal()
 
-def show_goal_card(goal: Dict):
-    """显示目标卡片"""
+def get_goal_tree() -> GoalTree:
+    """目标层级树；目标的增删、父目标或进度变化、目标字典被替换后才重建"""
+    tree = st.session_state.goal_tree
+    if tree.signature != tree_signature(st.session_state.goals):
+        tree.rebuild(st.session_state.goals)
+    return tree
+
+def jump_to_goal():
+    """展开目标的所有祖先并翻到其所在的页"""
+    goal_id = st.session_state.goal_jump
+    if goal_id is None:
+        return
+    tree = get_goal_tree()
+    path = tree.path(goal_id)
+    st.session_state.expanded_goals.update(path[:-1])
+    page_keys = ['page_goals'] + [f"page_children_{ancestor}" for ancestor in path[:-1]]
+    for page_key, node in zip(page_keys, path):
+        st.session_state[page_key] = tree.position(node) // st.session_state.page_size
+    st.session_state.focus_goal = goal_id
+
+def show_goal_tree_node(goal: Dict, tree: GoalTree):
+    """目标树中的一行；只有展开的节点才渲染子节点"""
+    type_colors = {
+        '长期': '🟣', '年度': '🔵', '季度': '🟢', '月度': '🟡', '周': '🟠'
+    }
+    goal_id = goal['id']
+    depth = tree.depth.get(goal_id, 0)
+    child_count = tree.child_count(goal_id)
+    expanded = goal_id in st.session_state.expanded_goals
+    
+    indent = min(depth, 8) * 0.04
+    widths = ([indent] if indent else []) + [0.06, 0.94 - indent]
+    cols = st.columns(widths)
+    with cols[-2]:
+        if child_count and st.button("▾" if expanded else "▸", key=f"tree_toggle_{goal_id}"):
+            st.session_state.expanded_goals ^= {goal_id}
+            st.rerun()
+    with cols[-1]:
+        marker = "📍 " if goal_id == st.session_state.focus_goal else ""
+        summary = f"{goal.get('progress', 0)}%"
+        if child_count:
+            summary += f" · {tree.descendant_count(goal_id)} 个下级目标 · 整体进度 {tree.subtree_progress(goal_id):.0f}%"
+        st.markdown(f"{marker}{type_colors.get(goal['type'], '⚪')} **{goal['name']}** "
+                    f"<span style='color:#6b7280;font-size:0.875rem'>{goal['type']} · {summary}</span>",
+                    unsafe_allow_html=True)
+    
+    if child_count and expanded:
+        for child in paginate(tree.children(goal_id), f"children_{goal_id}"):
+            show_goal_tree_node(child, tree)
+
+def show_goal_card(goal: Dict, tree: GoalTree):
+    """显示目标卡片；子目标默认折叠，展开后分页显示在卡片下方"""
     st.markdown('<div class="goal-card">', unsafe_allow_html=True)
     
     col1, col2 = st.columns([0.85, 0.15])
@@ -733,19 +687,31 @@ def show_goal_card(goal: Dict):
             '长期': '🟣', '年度': '🔵', '季度': '🟢', '月度': '🟡', '周': '🟠'
         }
         st.write(f"{type_colors.get(goal['type'], '⚪')} **{goal['type']}** | {goal.get('category', '未分类')}")
-        if goal.get('parentGoalId'):
+        if goal['id'] == st.session_state.focus_goal:
+            st.caption("📍 跳转目标")
+        elif goal.get('parentGoalId'):
             st.caption("📌 子目标")
         
-        # 名称和描述
+        # 名称和描述（过长时只显示开头）
         st.subheader(goal['name'])
-        if goal.get('description'):
-            st.write(goal['description'])
+        description = goal.get('description', '')
+        if len(description) > DESCRIPTION_PREVIEW_CHARS and goal['id'] not in st.session_state.expanded_descriptions:
+            st.write(description[:DESCRIPTION_PREVIEW_CHARS] + "…")
+            if st.button("展开描述", key=f"desc_{goal['id']}"):
+                st.session_state.expanded_descriptions.add(goal['id'])
+                st.rerun()
+        elif description:
+            st.write(description)
         
         # 进度条
         st.progress(goal['progress'] / 100, text=f"进度: {goal['progress']}%")
         
         if goal.get('deadline'):
             st.caption(f"📅 截止日期: {goal['deadline']}")
+        
+        open_count, done_count = st.session_state.task_stats.goal_counts(goal['id'])
+        if open_count or done_count:
+            st.caption(f"📋 {open_count} 个待办任务 · {done_count} 个已完成")
     
     with col2:
         # 操作按钮
@@ -767,6 +733,19 @@ def show_goal_card(goal: Dict):
             st.rerun()
     
     st.markdown('</div>', unsafe_allow_html=True)
+    
+    child_count = tree.child_count(goal['id'])
+    if child_count:
+        expanded = goal['id'] in st.session_state.expanded_goals
+        label = (f"{'📂 收起' if expanded else '📁 展开'} {child_count} 个子目标"
+                 f"（共 {tree.descendant_count(goal['id'])} 个下级，整体进度 {tree.subtree_progress(goal['id']):.0f}%）")
+        if st.button(label, key=f"children_{goal['id']}"):
+            st.session_state.expanded_goals ^= {goal['id']}
+            st.rerun()
+        if expanded:
+            with st.container(border=True):
+                for sub_goal in paginate(tree.children(goal['id']), f"children_{goal['id']}"):
+                    show_goal_card(sub_goal, tree)
 
 def show_goal_modal():
     """显示目标创建/编辑模态框"""
@@ -813,7 +792,7 @@ def show_goal_modal():
                 del st.session_state.editing_goal
             else:
                 # 添加新目标
-                st.session_state.goals.append(goal_data)
+                writable(st.session_state, 'goals').append(goal_data)
             
             save_data()
             st.session_state.show_goal_modal = False
@@ -835,10 +814,11 @@ def show_breakdown_modal():
     st.subheader(f"🧠 AI 目标分解: {goal['name']}")
     
     if 'breakdown_result' not in st.session_state:
-        if st.button("开始分解", type="primary"):
-            result = ai_goal_breakdown(goal)
-            if result:
-                st.session_state.breakdown_result = result
+        running = pending_ai_jobs('breakdown')
+        if running:
+            st.info(f"⏳ {st.session_state.ai_jobs[running[0]]['label']} 正在后台进行，完成后会自动显示结果，可以继续其他操作")
+        elif st.button("开始分解", type="primary"):
+            if ai_goal_breakdown(goal):
                 st.rerun()
     else:
         result = st.session_state.breakdown_result
@@ -878,37 +858,11 @@ def show_breakdown_modal():
                 st.rerun()
         with col3:
             if st.button(f"添加 {len(selected_indices)} 个目标", type="primary", use_container_width=True):
-                for i in selected_indices:
-                    sub_goal = result['subGoals'][i]
-                    
-                    # 如果是周类型，添加到weekly_tasks，否则添加到goals
-                    if sub_goal['type'] == '周':
-                        new_task = {
-                            'id': datetime.now().timestamp() + i,
-                            'name': sub_goal['name'],
-                            'goalId': goal['id'],
-                            'category': sub_goal.get('category', ''),
-                            'description': sub_goal.get('description', ''),
-                            'priority': sub_goal.get('priority', 2),
-                            'estimatedTime': sub_goal.get('estimatedTime', 60),
-                            'scheduledDate': sub_goal.get('deadline', ''),
-                            'completed': False,
-                            'createdAt': datetime.now().isoformat()
-                        }
-                        st.session_state.weekly_tasks.append(new_task)
-                    else:
-                        new_goal = {
-                            'id': datetime.now().timestamp() + i,
-                            'name': sub_goal['name'],
-                            'type': sub_goal['type'],
-                            'category': sub_goal.get('category', ''),
-                            'description': sub_goal.get('description', ''),
-                            'deadline': sub_goal.get('deadline', ''),
-                            'progress': 0,
-                            'createdAt': datetime.now().isoformat(),
-                            'parentGoalId': goal['id']
-                        }
-                        st.session_state.goals.append(new_goal)
+                sub_goals = [result['subGoals'][i] for i in selected_indices]
+                new_goals, new_weekly_tasks = breakdown_to_records(goal, sub_goals)
+                writable(st.session_state, 'goals').extend(new_goals)
+                for task in new_weekly_tasks:
+                    add_task(st.session_state, task, 'weekly_tasks')
                 
                 save_data()
                 st.session_state.show_breakdown_modal = False
@@ -925,108 +879,10 @@ def show_schedule():
     tab1, tab2, tab3 = st.tabs(["📋 今日日程", "📅 七日日程", "⏰ 日常活动"])
     
     with tab1:
-        # 今日日程视图
-        col1, col2 = st.columns([0.6, 0.4])
-        with col1:
-            st.subheader("今日时间安排")
-        with col2:
-            if st.button("🧠 生成今日日程", use_container_width=True):
-                generate_schedule()
-                save_data()
-                st.success("今日日程已生成！")
-                st.rerun()
-        
-        if st.session_state.schedule:
-            for item in st.session_state.schedule:
-                start_time = format_time(item['startTime'])
-                end_time = format_time(item['startTime'] + item['duration'])
-                
-                if item['type'] == 'task':
-                    with st.container():
-                        st.markdown(
-                            f"""<div style='background:#e0e7ff;padding:1rem;border-radius:0.5rem;border-left:4px solid #4f46e5;margin-bottom:0.5rem'>
-                            <strong>🎯 {item['item']['name']}</strong><br>
-                            <span style='color:#6b7280;font-size:0.875rem'>{start_time} - {end_time}</span>
-                            </div>""",
-                            unsafe_allow_html=True
-                        )
-                else:
-                    st.write(f"⏰ **{item['item']['name']}** | {start_time} - {end_time}")
-        else:
-            st.info("点击'生成今日日程'按钮创建日程安排")
+        show_today_schedule()
     
     with tab2:
-        # 七日日程视图
-        col1, col2, col3 = st.columns([0.4, 0.3, 0.3])
-        with col1:
-            st.subheader("未来七日安排")
-        with col2:
-            if st.button("🧠 生成七日日程", use_container_width=True):
-                generate_weekly_schedule()
-                save_data()
-                st.success("七日日程已生成！")
-                st.rerun()
-        with col3:
-            if st.button("� 导出到日历", use_container_width=True):
-                if st.session_state.weekly_schedule:
-                    ical_content = export_to_icalendar(st.session_state.weekly_schedule)
-                    st.download_button(
-                        label="下载 .ics 文件",
-                        data=ical_content,
-                        file_name=f"goal_planner_schedule_{datetime.now().strftime('%Y%m%d')}.ics",
-                        mime="text/calendar",
-                        use_container_width=True
-                    )
-                else:
-                    st.warning("请先生成七日日程")
-        
-        st.divider()
-        
-        # 显示周任务摘要
-        upcoming_weekly_tasks = get_weekly_tasks_for_next_7_days()
-        if upcoming_weekly_tasks:
-            with st.expander(f"📌 本周待办任务 ({len(upcoming_weekly_tasks)})", expanded=True):
-                for task in upcoming_weekly_tasks:
-                    priority_color = {1: "🟢", 2: "🟡", 3: "🔴"}
-                    date_str = task.get('scheduledDate', '未设定')
-                    st.write(f"{priority_color.get(task.get('priority', 2), '⚪')} **{task['name']}** - {date_str}")
-        
-        st.divider()
-        
-        # 显示七日日程
-        if st.session_state.weekly_schedule:
-            base_date = datetime.now().date()
-            weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-            
-            for day_offset in range(7):
-                current_date = base_date + timedelta(days=day_offset)
-                date_str = current_date.isoformat()
-                weekday = weekdays[current_date.weekday()]
-                
-                schedule = st.session_state.weekly_schedule.get(date_str, [])
-                
-                with st.expander(f"{weekday} - {current_date.strftime('%Y年%m月%d日')} ({len(schedule)} 项)", expanded=(day_offset == 0)):
-                    if schedule:
-                        for item in schedule:
-                            start_time = format_time(item['startTime'])
-                            end_time = format_time(item['startTime'] + item['duration'])
-                            
-                            if item['type'] == 'task':
-                                task_item = item['item']
-                                priority_emoji = {1: "🟢", 2: "🟡", 3: "🔴"}
-                                st.markdown(
-                                    f"""<div style='background:#f0f9ff;padding:0.75rem;border-radius:0.375rem;border-left:3px solid #0ea5e9;margin-bottom:0.5rem'>
-                                    {priority_emoji.get(task_item.get('priority', 2), '⚪')} <strong>{task_item['name']}</strong><br>
-                                    <span style='color:#6b7280;font-size:0.875rem'>⏰ {start_time} - {end_time} ({item['duration']}分钟)</span>
-                                    </div>""",
-                                    unsafe_allow_html=True
-                                )
-                            else:
-                                st.write(f"⏰ **{item['item']['name']}** | {start_time} - {end_time}")
-                    else:
-                        st.info("该日暂无安排")
-        else:
-            st.info("点击'生成七日日程'按钮创建未来7天的日程安排")
+        show_weekly_schedule()
     
     with tab3:
         # 日常活动管理
@@ -1040,18 +896,7 @@ def show_schedule():
         if st.session_state.activities:
             activities = sorted(st.session_state.activities, key=lambda x: x['startTime'])
             for activity in activities:
-                col1, col2, col3 = st.columns([0.6, 0.3, 0.1])
-                with col1:
-                    st.write(f"🕐 **{activity['name']}**")
-                with col2:
-                    st.write(f"{activity['startTime']} ({activity['duration']}分钟)")
-                with col3:
-                    if st.button("🗑️", key=f"del_act_{activity['id']}"):
-                        st.session_state.activities = [
-                            a for a in st.session_state.activities if a['id'] != activity['id']
-                        ]
-                        save_data()
-                        st.rerun()
+                show_activity_row(activity)
         else:
             st.info("添加你的日常活动，如起床、吃饭、运动等")
     
@@ -1059,6 +904,149 @@ def show_schedule():
     if st.session_state.get('show_activity_modal', False):
         show_activity_modal()
 
+@st.fragment
+def show_today_schedule():
+    """今日日程面板：重新生成只刷新本面板"""
+    # 今日日程视图
+    col1, col2 = st.columns([0.6, 0.4])
+    with col1:
+        st.subheader("今日时间安排")
+    with col2:
+        if st.button("🧠 生成今日日程", use_container_width=True):
+            generate_schedule(st.session_state)
+            generate_basic_insights()
+            save_data()
+            st.success("今日日程已生成！")
+    
+    if st.session_state.schedule and st.session_state.compact_render:
+        st.markdown(schedule_html(st.session_state.schedule), unsafe_allow_html=True)
+    elif st.session_state.schedule:
+        for item in st.session_state.schedule:
+            start_time = format_time(item['startTime'])
+            end_time = format_time(item['startTime'] + item['duration'])
+    
+            if item['type'] == 'task':
+                with st.container():
+                    st.markdown(
+                        f"""<div style='background:#e0e7ff;padding:1rem;border-radius:0.5rem;border-left:4px solid #4f46e5;margin-bottom:0.5rem'>
+                        <strong>🎯 {item['item']['name']}</strong><br>
+                        <span style='color:#6b7280;font-size:0.875rem'>{start_time} - {end_time}</span>
+                        </div>""",
+                        unsafe_allow_html=True
+                    )
+            else:
+                st.write(f"⏰ **{item['item']['name']}** | {start_time} - {end_time}")
+    else:
+        st.info("点击'生成今日日程'按钮创建日程安排")
+
+@st.fragment
+def show_weekly_schedule():
+    """七日日程面板：重新生成和导出只刷新本面板"""
+    # 七日日程视图
+    col1, col2, col3 = st.columns([0.4, 0.3, 0.3])
+    with col1:
+        st.subheader("未来七日安排")
+    with col2:
+        if st.button("🧠 生成七日日程", use_container_width=True):
+            generate_weekly_schedule(st.session_state)
+            save_data()
+            st.success("七日日程已生成！")
+    with col3:
+        if st.button("� 导出到日历", use_container_width=True):
+            if st.session_state.weekly_schedule:
+                ical_content = export_to_icalendar(st.session_state.weekly_schedule)
+                st.download_button(
+                    label="下载 .ics 文件",
+                    data=ical_content,
+                    file_name=f"goal_planner_schedule_{datetime.now().strftime('%Y%m%d')}.ics",
+                    mime="text/calendar",
+                    use_container_width=True
+                )
+            else:
+                st.warning("请先生成七日日程")
+    
+    st.divider()
+    
+    # 显示周任务摘要
+    upcoming_weekly_tasks = get_weekly_tasks_for_next_7_days(st.session_state)
+    if upcoming_weekly_tasks:
+        with st.expander(f"📌 本周待办任务 ({len(upcoming_weekly_tasks)})", expanded=True):
+            for task in paginate(upcoming_weekly_tasks, 'weekly_tasks'):
+                priority_color = {1: "🟢", 2: "🟡", 3: "🔴"}
+                date_str = task.get('scheduledDate', '未设定')
+                st.write(f"{priority_color.get(task.get('priority', 2), '⚪')} **{task['name']}** - {date_str}")
+    
+    st.divider()
+    
+    # 显示七日日程：紧凑模式每天一个 HTML 块，否则只渲染选中的一天
+    if st.session_state.weekly_schedule and st.session_state.compact_render:
+        base_date = datetime.now().date()
+        weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+        for day_offset in range(7):
+            current_date = base_date + timedelta(days=day_offset)
+            schedule = st.session_state.weekly_schedule.get(current_date.isoformat(), [])
+            title = f"{weekdays[current_date.weekday()]} - {current_date.strftime('%Y年%m月%d日')} ({len(schedule)} 项)"
+            st.markdown(schedule_html(schedule, title), unsafe_allow_html=True)
+    elif st.session_state.weekly_schedule:
+        base_date = datetime.now().date()
+        weekdays = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+        days = [base_date + timedelta(days=day_offset) for day_offset in range(7)]
+        counts = {d: len(st.session_state.weekly_schedule.get(d.isoformat(), [])) for d in days}
+    
+        current_date = st.radio(
+            "选择日期",
+            days,
+            format_func=lambda d: f"{weekdays[d.weekday()]} {d.strftime('%m/%d')} ({counts[d]})",
+            horizontal=True,
+            label_visibility="collapsed",
+            key="weekly_schedule_day"
+        )
+        date_str = current_date.isoformat()
+        weekday = weekdays[current_date.weekday()]
+        schedule = st.session_state.weekly_schedule.get(date_str, [])
+    
+        with st.container(border=True):
+            st.markdown(f"**{weekday} - {current_date.strftime('%Y年%m月%d日')} ({len(schedule)} 项)**")
+            if schedule:
+                for item in paginate(schedule, f"day_{date_str}"):
+                    start_time = format_time(item['startTime'])
+                    end_time = format_time(item['startTime'] + item['duration'])
+
+                    if item['type'] == 'task':
+                        task_item = item['item']
+                        priority_emoji = {1: "🟢", 2: "🟡", 3: "🔴"}
+                        st.markdown(
+                            f"""<div style='background:#f0f9ff;padding:0.75rem;border-radius:0.375rem;border-left:3px solid #0ea5e9;margin-bottom:0.5rem'>
+                            {priority_emoji.get(task_item.get('priority', 2), '⚪')} <strong>{task_item['name']}</strong><br>
+                            <span style='color:#6b7280;font-size:0.875rem'>⏰ {start_time} - {end_time} ({item['duration']}分钟)</span>
+                            </div>""",
+                            unsafe_allow_html=True
+                        )
+                    else:
+                        st.write(f"⏰ **{item['item']['name']}** | {start_time} - {end_time}")
+            else:
+                st.info("该日暂无安排")
+    else:
+        st.info("点击'生成七日日程'按钮创建未来7天的日程安排")
+
+def remove_activity(activity_id: float):
+    """删除日常活动"""
+    st.session_state.activities = [a for a in st.session_state.activities if a['id'] != activity_id]
+    save_data()
+
+@st.fragment
+def show_activity_row(activity: Dict):
+    """日常活动列表中的一行：删除只重新运行本行"""
+    if not any(a['id'] == activity['id'] for a in st.session_state.activities):
+        return
+    col1, col2, col3 = st.columns([0.6, 0.3, 0.1])
+    with col1:
+        st.write(f"🕐 **{activity['name']}**")
+    with col2:
+        st.write(f"{activity['startTime']} ({activity['duration']}分钟)")
+    with col3:
+        st.button("🗑️", key=f"del_act_{activity['id']}", on_click=remove_activity, args=(activity['id'],))
+
 def show_activity_modal():
     """显示活动创建模态框"""
     st.subheader("新建日常活动")
@@ -1081,7 +1069,7 @@ def show_activity_modal():
                 'startTime': start_time.strftime('%H:%M'),
                 'duration': duration
             }
-            st.session_state.activities.append(activity_data)
+            writable(st.session_state, 'activities').append(activity_data)
             save_data()
             st.session_state.show_activity_modal = False
             st.success("活动已添加！")
@@ -1094,29 +1082,41 @@ def show_activity_modal():
 def show_insights():
     """显示洞察页面"""
     st.title("💡 效率洞察与建议")
-    
-    col1, col2 = st.columns([0.8, 0.2])
+    show_insights_panel()
+
+def request_ai_insights(full: bool = False):
+    """在洞察面板中提交 AI 洞察任务"""
+    if not st.session_state.api_enabled:
+        st.warning("请先在设置中启用AI API")
+        return
+    job_id = generate_ai_insights(full)
+    save_data()
+    if job_id:
+        # 片段内提交的任务需要整页重新运行，侧边栏的轮询面板才会出现
+        st.rerun(scope="app")
+
+@st.fragment
+def show_insights_panel():
+    """洞察列表与重新生成按钮：操作只刷新本面板"""
+    col1, col2, col3 = st.columns([0.6, 0.2, 0.2])
     with col2:
-        if st.button("🔄 重新生成", use_container_width=True):
-            if st.session_state.api_enabled:
-                generate_ai_insights()
-                save_data()
-            else:
-                st.warning("请先在设置中启用AI API")
+        if st.button("🔄 重新生成", use_container_width=True, help="只发送上次分析后的变化"):
+            request_ai_insights()
+    with col3:
+        if st.button("🧹 完整分析", use_container_width=True, help="忽略上次结果，重新发送全部数据"):
+            request_ai_insights(full=True)
     
     st.divider()
     
-    if st.session_state.insights:
+    if st.session_state.insights and st.session_state.compact_render:
+        st.markdown(insights_html(st.session_state.insights, detailed=True), unsafe_allow_html=True)
+    elif st.session_state.insights:
         for insight in st.session_state.insights:
             show_insight_card(insight, detailed=True)
     else:
         st.info("生成日程后将显示个性化效率建议")
         if st.button("使用 AI 生成深度洞察", type="primary"):
-            if st.session_state.api_enabled:
-                generate_ai_insights()
-                save_data()
-            else:
-                st.warning("请先在设置中启用AI API")
+            request_ai_insights()
 
 def show_insight_card(insight: Dict, detailed: bool = False):
     """显示洞察卡片"""
@@ -1139,6 +1139,191 @@ def show_insight_card(insight: Dict, detailed: bool = False):
     html += "</div>"
     st.markdown(html, unsafe_allow_html=True)
 
+def get_search_index() -> SearchIndex:
+    """全文搜索索引；任务随变更入口更新，目标按指纹同步改动的部分"""
+    if st.session_state.search_index is None:
+        st.session_state.search_index = SearchIndex({
+            'goals': st.session_state.goals,
+            'tasks': st.session_state.tasks,
+            'weekly_tasks': st.session_state.weekly_tasks
+        })
+    else:
+        st.session_state.search_index.sync({'goals': st.session_state.goals})
+    return st.session_state.search_index
+
+def show_search():
+    """显示搜索页面"""
+    st.title("🔍 搜索")
+    
+    kind_labels = {'goals': '🎯 目标', 'tasks': '📝 任务', 'weekly_tasks': '📌 周任务'}
+    with st.spinner("正在建立搜索索引..."):
+        index = get_search_index()
+    
+    query = st.text_input("搜索", placeholder="搜索目标、任务和周任务的名称、描述、准备事项和指导",
+                          label_visibility="collapsed", key="search_query")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        kinds = st.multiselect("类型", list(kind_labels), default=list(kind_labels),
+                               format_func=lambda k: kind_labels[k])
+    with col2:
+        category = st.selectbox("分类", ["全部"] + index.categories())
+    with col3:
+        status = st.selectbox("状态", ["全部", "未完成", "已完成"])
+    with col4:
+        date_range = st.date_input("日期（截止或计划日期）", value=(), format="YYYY-MM-DD")
+    
+    start = end = None
+    if len(date_range) == 2:
+        start, end = date_range
+    elif len(date_range) == 1:
+        start = end = date_range[0]
+    
+    started = time.perf_counter()
+    results = index.search(
+        query,
+        kinds=kinds,
+        category=None if category == "全部" else category,
+        start=start,
+        end=end,
+        completed={"全部": None, "未完成": False, "已完成": True}[status],
+        limit=500
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    
+    st.caption(f"找到 {len(results)} 条结果（{elapsed:.1f} 毫秒，共索引 {len(index)} 条记录）")
+    
+    for score, kind, record in paginate(results, 'search'):
+        done = record.get('progress', 0) >= 100 if kind == 'goals' else record.get('completed')
+        day = record.get('deadline') if kind == 'goals' else record.get('scheduledDate')
+        details = [kind_labels[kind], record.get('category') or '未分类']
+        if day:
+            details.append(f"📅 {day}")
+        if kind == 'goals':
+            details.append(f"进度 {record.get('progress', 0)}%")
+        st.markdown(f"{'✅' if done else '⬜'} **{record['name']}** · {' · '.join(details)}")
+        snippet = record.get('description') or record.get('preparation') or record.get('guidance')
+        if snippet:
+            st.caption(snippet if len(snippet) <= DESCRIPTION_PREVIEW_CHARS else snippet[:DESCRIPTION_PREVIEW_CHARS] + "…")
+
+def show_ai_metrics():
+    """显示 AI 调用遥测：按提供商和功能汇总延迟、Token 与费用"""
+    st.subheader("📈 AI 调用统计")
+    
+    window = st.selectbox(
+        "统计时间窗口",
+        list(METRICS_WINDOWS.keys()),
+        format_func=lambda x: METRICS_WINDOWS[x][0],
+        index=2
+    )
+    records = load_ai_metrics(time.time() - METRICS_WINDOWS[window][1])
+    if not records:
+        st.info("该时间窗口内没有 AI 调用记录")
+        return
+    
+    input_tokens = sum(r['in'] for r in records)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("调用次数", len([r for r in records if not r.get('x')]))
+    col2.metric("Token 总量", f"{input_tokens + sum(r['out'] for r in records):,}")
+    col3.metric("估算费用", f"${sum(estimate_ai_cost(r) for r in records):.4f}")
+    col4.metric("缓存命中", f"{sum(r['cr'] for r in records) / input_tokens:.0%}" if input_tokens else '-')
+    
+    provider_labels = {
+        'claude': '🔮 Claude',
+        'openai': '🧠 OpenAI',
+        'qwen': '🌟 通义千问',
+        'deepseek': '🚀 DeepSeek'
+    }
+    tab1, tab2 = st.tabs(["按提供商", "按功能"])
+    with tab1:
+        st.dataframe(summarize_ai_metrics(records, 'p', provider_labels), use_container_width=True, hide_index=True)
+    with tab2:
+        st.dataframe(summarize_ai_metrics(records, 'f', AI_FEATURE_LABELS), use_container_width=True, hide_index=True)
+    st.caption("费用按公开单价估算，仅供参考；首 Token 延迟通过流式响应测量，重试次数包含连接错误、限流和服务端错误。")
+
+def show_batch_queue():
+    """显示离线批量处理队列：排队、提交到批量接口、收取并合并结果"""
+    st.subheader("📦 批量处理")
+    st.caption("通过提供商的批量接口处理大量目标分解和洞察分析，费用约为实时调用的一半，通常在 24 小时内完成。"
+               "也可在命令行运行 `python -m goal_planner.batch` 完成同样的操作。")
+    
+    queue_file = data_file(BATCH_FILE)
+    queue = load_queue(queue_file)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if st.button("➕ 排入目标分解", use_container_width=True, help="为所有尚无子目标的目标排入分解请求"):
+            with locked_queue(queue_file) as queue:
+                added = enqueue_breakdowns(queue, insights_data(st.session_state))
+            st.toast(f"排入 {len(added)} 个目标分解请求")
+    with col2:
+        if st.button("➕ 排入洞察分析", use_container_width=True):
+            with locked_queue(queue_file) as queue:
+                enqueue_insights(queue, insights_data(st.session_state), st.session_state.ai_provider,
+                                 st.session_state.get('insight_token_budget', DEFAULT_INSIGHT_TOKEN_BUDGET))
+            st.toast("排入洞察分析请求")
+    with col3:
+        provider = st.session_state.ai_provider
+        if st.button("🚀 提交批次", use_container_width=True, disabled=not queue['pending'] or provider not in BATCH_PROVIDERS,
+                     help="使用当前 AI 提供商提交；DeepSeek 暂不支持批量接口"):
+            config = st.session_state.api_configs[provider]
+            try:
+                with locked_queue(queue_file) as queue:
+                    batch = submit_pending(queue, provider, provider_config(provider, config['api_key'], config['model'],
+                                                                            config.get('base_url')))
+                st.toast(f"已提交批次 {batch['id']}")
+            except Exception as e:
+                st.error(f"提交失败: {str(e)}")
+    with col4:
+        if st.button("📥 收取结果", use_container_width=True, disabled=not queue['batches']):
+            api_keys = {name: config['api_key'] for name, config in st.session_state.api_configs.items()}
+            try:
+                with locked_queue(queue_file) as queue:
+                    log = poll_batches(queue, data_file(), api_keys)
+                load_data()
+                for line in log:
+                    st.write(f"• {line}")
+            except Exception as e:
+                st.error(f"收取失败: {str(e)}")
+    
+    rows = queue_summary(queue)
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_archive_summary(path: str, signature: tuple) -> List[Dict]:
+    """按月汇总归档；signature 只作缓存键，分区增加或被追加后才重新解压读取"""
+    return summarize_archive(path)
+
+def show_archive():
+    """显示完成任务归档：归档天数、立即归档和按月汇总的历史"""
+    st.subheader("🗄️ 完成任务归档")
+    st.caption("完成较久的任务移入按月压缩的归档文件，日常列表、统计和保存只处理未归档的数据。"
+               "也可在命令行运行 `python -m goal_planner.archive` 归档或查询历史。")
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.session_state.archive_after_days = st.number_input(
+            "完成超过多少天后归档", min_value=0, max_value=3650, value=st.session_state.archive_after_days,
+            help="每个会话每天打开时自动检查一次"
+        )
+    with col2:
+        if st.button("🗄️ 立即归档", use_container_width=True):
+            archived = archive_completed(st.session_state, data_file(), st.session_state.archive_after_days)
+            if archived:
+                save_data()
+            st.toast(f"归档 {archived} 条任务")
+    
+    rows = cached_archive_summary(data_file(), partitions_signature(data_file()))
+    if rows:
+        st.dataframe([{
+            '月份': row['month'],
+            '任务': row['tasks'],
+            '周任务': row['weekly_tasks'],
+            '预计用时（小时）': round(row['minutes'] / 60, 1)
+        } for row in rows], use_container_width=True, hide_index=True)
+    else:
+        st.info("还没有归档的任务")
+
 def show_settings():
     """显示设置页面"""
     st.title("⚙️ 系统设置")
@@ -1378,14 +1563,17 @@ def show_settings():
         with col1:
             if st.button("🔍 测试连接", use_container_width=True):
                 if api_key:
-                    with st.spinner(f"测试 {provider_options[selected_provider]} 连接..."):
-                        test_response = AIClient.call_ai_api("请回复'连接成功'", max_tokens=50)
-                        if test_response and "连接成功" in test_response:
-                            st.success(f"✅ {provider_options[selected_provider]} 连接成功！")
-                        elif test_response:
-                            st.success(f"✅ {provider_options[selected_provider]} 连接成功！")
-                        else:
-                            st.error(f"❌ {provider_options[selected_provider]} 连接失败")
+                    plan = prepare_ai_call(
+                        "请回复'连接成功'", max_tokens=50, provider=selected_provider, feature='test'
+                    )
+                    if plan:
+                        submit_ai_job(
+                            'test',
+                            f"🔍 测试 {provider_options[selected_provider]}",
+                            plan,
+                            {'provider_label': provider_options[selected_provider]}
+                        )
+                        st.info("连接测试正在后台运行，完成后会弹出通知")
                 else:
                     st.warning("请先输入 API Key")
         
@@ -1396,6 +1584,64 @@ def show_settings():
         
         st.divider()
         
+        # 多提供商调用策略
+        st.write("**⚡ 多提供商调用策略：**")
+        routing_keys = list(ROUTING_MODES.keys())
+        st.session_state.routing_mode = st.selectbox(
+            "调用策略",
+            routing_keys,
+            format_func=lambda x: ROUTING_MODES[x],
+            index=routing_keys.index(st.session_state.routing_mode),
+            help="自动选择和对冲模式会在所有已配置 API Key 的提供商之间按滚动延迟和错误率路由"
+        )
+        
+        st.session_state.insight_token_budget = st.number_input(
+            "洞察提示词 Token 预算",
+            min_value=1000,
+            max_value=100000,
+            step=500,
+            value=st.session_state.insight_token_budget,
+            help="数据较多时按优先级、截止日期和最近变更挑选条目，其余按分类汇总，确保提示词不超过该预算"
+        )
+        
+        if st.button("📡 并发测试全部提供商", use_container_width=True):
+            # 每个提供商一个后台任务，在任务线程池中并行探测，结果由后台任务面板取回并记入统计
+            providers = AIClient.configured_providers(st.session_state)
+            plans = {}
+            for name in providers:
+                plan = prepare_ai_call("请回复'连接成功'", max_tokens=50, provider=name, feature='test')
+                if plan is None:
+                    # 未启用 AI 时已提示，不再逐个重复
+                    break
+                plans[name] = plan
+            if not providers:
+                st.warning("尚未配置任何提供商的 API Key")
+            elif len(plans) == len(providers):
+                for name, plan in plans.items():
+                    submit_ai_job('test', f"📡 探测 {provider_options[name]}", plan,
+                                  {'provider_label': provider_options[name]})
+                st.info(f"正在后台并行探测 {len(providers)} 个提供商，完成后会逐个弹出通知")
+        
+        if st.session_state.provider_stats:
+            ranking = AIClient.rank_providers(st.session_state) if st.session_state.routing_mode != 'fixed' else []
+            rows = []
+            for name in provider_options:
+                if name not in st.session_state.provider_stats:
+                    continue
+                summary = AIClient.provider_summary(st.session_state, name)
+                rows.append({
+                    '提供商': provider_options[name],
+                    '调用次数': summary['calls'],
+                    '错误率': f"{summary['error_rate']:.0%}",
+                    'p50 延迟(秒)': f"{summary['p50']:.2f}" if summary['p50'] is not None else '-',
+                    'p95 延迟(秒)': f"{summary['p95']:.2f}" if summary['p95'] is not None else '-',
+                    '状态': '🟢 健康' if summary['healthy'] else '🔴 不健康',
+                    '路由顺序': ranking.index(name) + 1 if name in ranking else '-'
+                })
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+        
+        st.divider()
+        
         # 使用提示
         st.info(f"""
         🎯 **当前使用：{provider_options[selected_provider]}**
@@ -1458,6 +1704,34 @@ def show_settings():
     
     st.divider()
     
+    show_ai_metrics()
+    
+    st.divider()
+    
+    show_batch_queue()
+    
+    st.divider()
+    
+    show_archive()
+    
+    st.divider()
+    
+    # 显示设置
+    st.subheader("🖥️ 显示设置")
+    st.session_state.page_size = st.selectbox(
+        "每页显示条目数",
+        PAGE_SIZE_OPTIONS,
+        index=PAGE_SIZE_OPTIONS.index(st.session_state.page_size) if st.session_state.page_size in PAGE_SIZE_OPTIONS else 1,
+        help="目标列表、子目标和日程列表每页显示的条目数，数据较多时可减小以加快页面渲染"
+    )
+    st.session_state.compact_render = st.toggle(
+        "紧凑渲染日程和洞察",
+        value=st.session_state.compact_render,
+        help="每天的日程和整个洞察列表各合并为一个 HTML 块发送，按内容缓存，适合日程条目较多时使用"
+    )
+    
+    st.divider()
+    
     # 数据管理
     st.subheader("💾 数据管理")
     
@@ -1493,6 +1767,7 @@ def show_settings():
                 st.session_state.activities = data.get('activities', [])
                 st.session_state.insights = data.get('insights', [])
                 st.session_state.schedule = data.get('schedule', [])
+                refresh_task_indexes(st.session_state)
                 save_data()
                 st.success("✅ 数据导入成功！")
                 st.rerun()
@@ -1603,7 +1878,7 @@ def show_task_modal():
                 'completed': False,
                 'createdAt': datetime.now().isoformat()
             }
-            st.session_state.tasks.append(task_data)
+            add_task(st.session_state, task_data)
             save_data()
             st.session_state.show_task_modal = False
             st.success("任务已添加！")
@@ -0,0 +1,6 @@
+"""
+智能目标管理系统的可复用模块
+
+领域模型、状态与存储、日程安排、AI 客户端、提示词构建和离线批量处理，不依赖 Streamlit 界面；
+界面把 st.session_state 作为状态对象传给这些模块，脚本和工作进程使用 PlannerState。
+"""
@@ -0,0 +1,537 @@
+"""
+AI 客户端
+
+统一调用 Claude、OpenAI、通义千问和 DeepSeek：按调用策略（固定、最快、对冲）选择提供商，可重试的错误
+按指数退避重试，并记录各提供商的滚动延迟统计和本地遥测。读写设置与统计的方法接收显式的状态对象
+（st.session_state 或 PlannerState）；execute_plan 只依赖调用计划，可在工作线程或其他进程中执行。
+SDK 在第一次调用时才导入。
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional, Tuple
+
+from goal_planner.storage import file_lock
+
+METRICS_FILE = "goal_planner_metrics.jsonl"  # AI 调用遥测记录
+METRICS_RETENTION_DAYS = 90
+
+# 模型单价（美元 / 百万 Token，输入与输出），用于估算费用
+MODEL_PRICING = {
+    'claude-3-5-sonnet-20241022': (3.0, 15.0),
+    'claude-3-5-haiku-20241022': (0.8, 4.0),
+    'claude-3-sonnet-20240229': (3.0, 15.0),
+    'claude-3-haiku-20240307': (0.25, 1.25),
+    'claude-3-opus-20240229': (15.0, 75.0),
+    'gpt-4o': (2.5, 10.0),
+    'gpt-4o-mini': (0.15, 0.6),
+    'gpt-4-turbo': (10.0, 30.0),
+    'gpt-4': (30.0, 60.0),
+    'gpt-3.5-turbo': (0.5, 1.5),
+    'o1-preview': (15.0, 60.0),
+    'o1-mini': (3.0, 12.0),
+    'qwen-max': (0.33, 1.33),
+    'qwen-plus': (0.11, 0.28),
+    'qwen-turbo': (0.04, 0.08),
+    'qwen2.5-72b-instruct': (0.55, 1.65),
+    'qwen2.5-32b-instruct': (0.28, 0.83),
+    'qwen2.5-14b-instruct': (0.14, 0.42),
+    'qwen2.5-7b-instruct': (0.07, 0.14),
+    'deepseek-chat': (0.27, 1.1),
+    'deepseek-coder': (0.27, 1.1),
+    'deepseek-reasoner': (0.55, 2.19),
+    'deepseek-v2.5': (0.27, 1.1)
+}
+# 缓存读取、写入相对普通输入的价格比例
+CACHE_PRICE_RATIOS = {
+    'claude': (0.1, 1.25),
+    'openai': (0.5, 1.0),
+    'qwen': (0.4, 1.0),
+    'deepseek': (0.1, 1.0)
+}
+
+# AI 调用策略
+PROVIDER_STATS_WINDOW = 20       # 每个提供商保留的最近调用样本数
+PROVIDER_MAX_ERROR_RATE = 0.5    # 错误率超过该值视为不健康
+HEDGE_DEFAULT_DELAY = 8.0        # 样本不足时的对冲等待时间（秒）
+AI_MAX_RETRIES = 2               # 可重试错误的最大重试次数
+AI_RETRY_BACKOFF = 0.5           # 重试退避基数（秒）
+AI_JOB_WORKERS = 4               # 后台 AI 任务线程数
+AI_JOB_RESULT_TTL = 3600         # 无人取回的任务结果保留时间（秒）
+
+
+class AIConfigError(Exception):
+    """AI 未启用或缺少 API Key，无法生成调用计划"""
+
+
+# AI API 调用类
+class AIClient:
+    """统一的AI客户端类，支持多个提供商"""
+    
+    @staticmethod
+    def call_ai_api(state, prompt: str, max_tokens: int = 2000, provider: Optional[str] = None,
+                    system: Optional[str] = None, feature: str = 'general') -> Optional[str]:
+        """调用AI API，按调用策略选择提供商；指定 provider 时只调用该提供商
+        
+        system 为各次调用都相同的指令前缀，支持的提供商会将其标记为可缓存；
+        feature 用于区分调用来源（breakdown/insights/test），记录在缓存统计中。
+        """
+        plan = AIClient.prepare_call(state, prompt, max_tokens, provider, system, feature)
+        outcome = AIClient.execute_plan(plan)
+        AIClient.record_outcome(state, outcome)
+        return outcome['text']
+    
+    @staticmethod
+    def prepare_call(state, prompt: str, max_tokens: int = 2000, provider: Optional[str] = None,
+                     system: Optional[str] = None, feature: str = 'general') -> Dict:
+        """根据当前设置生成调用计划；计划包含所需的全部配置，可交给后台线程执行
+        
+        未启用 AI 或没有可用的 API Key 时抛出 AIConfigError。
+        """
+        if not state.api_enabled:
+            raise AIConfigError("请先在设置中启用AI API")
+        
+        if provider:
+            candidates = [provider]
+        else:
+            candidates = AIClient.rank_providers(state)
+        candidates = [p for p in candidates if state.api_configs.get(p, {}).get('api_key')]
+        
+        if not candidates:
+            target = provider or state.ai_provider
+            raise AIConfigError(f"请先在设置中配置 {target.upper()} API Key")
+        
+        mode = 'fixed' if provider else state.get('routing_mode', 'fixed')
+        if mode == 'fixed':
+            candidates = candidates[:1]
+        elif mode == 'hedged':
+            candidates = candidates[:2]
+        return {
+            'mode': mode,
+            'candidates': candidates,
+            'configs': {name: dict(state.api_configs[name]) for name in candidates},
+            'hedge_delay': AIClient.provider_summary(state, candidates[0])['p95'] or HEDGE_DEFAULT_DELAY,
+            'request': {'prompt': prompt, 'system': system, 'max_tokens': max_tokens, 'feature': feature}
+        }
+    
+    @staticmethod
+    def execute_plan(plan: Dict) -> Dict:
+        """执行调用计划；不访问状态对象，可在工作线程中执行
+        
+        返回 {'text', 'provider', 'error', 'results'}，results 为每次尝试的结果，
+        需在脚本线程中通过 record_outcome 记入统计。
+        """
+        candidates = plan['candidates']
+        if plan['mode'] == 'hedged' and len(candidates) > 1:
+            results = AIClient._call_hedged(candidates[0], candidates[1], plan['request'], plan['configs'], plan['hedge_delay'])
+        else:
+            # fastest 模式失败时依次切换到下一个健康的提供商
+            results = []
+            for name in candidates:
+                results.append(AIClient._timed_call(name, plan['request'], plan['configs'][name]))
+                if results[-1]['error'] is None:
+                    break
+        
+        winner = next((r for r in results if r['error'] is None and not r['cancelled']), None)
+        return {
+            'text': winner['text'] if winner else None,
+            'provider': winner['provider'] if winner else None,
+            'error': None if winner else results[-1]['error'],
+            'results': results
+        }
+    
+    @staticmethod
+    def record_outcome(state, outcome: Dict) -> List[Dict]:
+        """把调用结果记入提供商统计，返回失败的尝试"""
+        for result in outcome['results']:
+            AIClient._record_result(state, result)
+        return [result for result in outcome['results'] if result['error'] is not None]
+    
+    @staticmethod
+    def configured_providers(state) -> List[str]:
+        """返回已配置 API Key 的提供商"""
+        return [name for name, config in state.api_configs.items() if config.get('api_key')]
+    
+    @staticmethod
+    def rank_providers(state) -> List[str]:
+        """按调用策略排序提供商：fixed 模式仅返回选定提供商，其它模式按健康度和延迟排序"""
+        selected = state.ai_provider
+        if state.get('routing_mode', 'fixed') == 'fixed':
+            return [selected]
+        
+        def sort_key(name: str):
+            stats = AIClient.provider_summary(state, name)
+            latency = stats['p50'] if stats['p50'] is not None else float('inf')
+            return (not stats['healthy'], latency, name != selected)
+        
+        return sorted(AIClient.configured_providers(state), key=sort_key)
+    
+    @staticmethod
+    def provider_summary(state, name: str) -> Dict:
+        """汇总提供商的滚动统计：调用次数、错误率、p50/p95 延迟、健康状态"""
+        samples = state.provider_stats.get(name, [])
+        latencies = sorted(s['latency'] for s in samples if s['ok'])
+        errors = len([s for s in samples if not s['ok']])
+        error_rate = errors / len(samples) if samples else 0.0
+        return {
+            'calls': len(samples),
+            'error_rate': error_rate,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            # 样本过少时不判定为不健康，避免一次偶发失败就被永久排除
+            'healthy': len(samples) < 3 or error_rate <= PROVIDER_MAX_ERROR_RATE
+        }
+    
+    @staticmethod
+    def _call_hedged(primary: str, secondary: str, request: Dict, configs: Dict, delay: float) -> List[Dict]:
+        """对冲调用：主提供商超过 delay（其 p95 延迟）仍未返回时并发调用备用提供商，取先成功者并取消另一个"""
+        clients = {name: AIClient._create_client(name, configs[name]) for name in (primary, secondary)}
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        started = {primary: time.perf_counter()}
+        first = executor.submit(AIClient._timed_call, primary, request, configs[primary], clients[primary])
+        futures = {first: primary}
+        done, _ = wait([first], timeout=delay)
+        
+        # 主提供商超时或直接失败时启动备用提供商
+        if not done or first.result()['error'] is not None:
+            started[secondary] = time.perf_counter()
+            futures[executor.submit(
+                AIClient._timed_call, secondary, request, configs[secondary], clients[secondary]
+            )] = secondary
+        
+        results = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            results.extend(future.result() for future in done)
+            if any(r['error'] is None for r in results):
+                break
+        
+        # 取消落后的请求：关闭其 HTTP 客户端以中断连接；结果标记为 cancelled，不计入提供商的延迟和健康度
+        for future in pending:
+            loser = futures[future]
+            future.cancel()
+            clients[loser].close()
+            results.append({
+                'provider': loser,
+                'model': configs[loser].get('model'),
+                'feature': request['feature'],
+                'text': None,
+                'usage': None,
+                'ttft': None,
+                'latency': time.perf_counter() - started[loser],
+                'retries': 0,
+                'error': None,
+                'cancelled': True
+            })
+        executor.shutdown(wait=False)
+        return results
+    
+    @staticmethod
+    def _timed_call(provider: str, request: Dict, config: Dict, client=None) -> Dict:
+        """调用提供商并计时，可重试的错误按指数退避重试；不访问状态对象，可在工作线程中执行"""
+        start = time.perf_counter()
+        client = client or AIClient._create_client(provider, config)
+        retries = 0
+        ttft = None
+        while True:
+            attempt_start = time.perf_counter()
+            try:
+                text, usage = AIClient._call_provider(provider, request, config, client)
+                ttft = attempt_start - start + usage.pop('ttft') if usage.get('ttft') is not None else None
+                error = None
+                break
+            except Exception as e:
+                text, usage = None, None
+                error = str(e)
+                # 对冲调用中被取消的请求客户端已关闭，不再重试
+                if retries >= AI_MAX_RETRIES or not AIClient._is_retryable(e) or client.is_closed():
+                    break
+                time.sleep(AI_RETRY_BACKOFF * 2 ** retries)
+                retries += 1
+        return {
+            'provider': provider,
+            'model': config.get('model'),
+            'feature': request['feature'],
+            'text': text,
+            'usage': usage,
+            'ttft': ttft,
+            'latency': time.perf_counter() - start,
+            'retries': retries,
+            'error': error,
+            'cancelled': False
+        }
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """连接错误、超时、限流和服务端错误可以重试；SDK 未加载时不可能抛出它的异常"""
+        retryable = []
+        for name in ('anthropic', 'openai'):
+            sdk = sys.modules.get(name)
+            if sdk is not None:
+                retryable += [sdk.APIConnectionError, sdk.RateLimitError, sdk.InternalServerError]
+        return isinstance(error, tuple(retryable))
+    
+    @staticmethod
+    def _record_result(state, result: Dict):
+        """把一次调用结果写入提供商的滚动统计窗口和本地遥测文件
+
+        对冲中被取消的请求没有完成，耗时只是取消前等待的时间，不进入滚动统计，否则被截断的备用提供商会显得又快又健康。
+        """
+        if not result.get('cancelled'):
+            samples = state.provider_stats.setdefault(result['provider'], [])
+            samples.append({'latency': result['latency'], 'ok': result['error'] is None})
+            del samples[:-PROVIDER_STATS_WINDOW]
+        record_ai_metrics(result)
+    
+    @staticmethod
+    def _create_client(provider: str, config: Dict):
+        """创建提供商的 SDK 客户端；重试由 _timed_call 负责，以便统计重试次数"""
+        if provider == 'claude':
+            import anthropic
+            return anthropic.Anthropic(api_key=config['api_key'], max_retries=0)
+        import openai
+        return openai.OpenAI(api_key=config['api_key'], base_url=config.get('base_url'), max_retries=0)
+    
+    @staticmethod
+    def _call_provider(provider: str, request: Dict, config: Dict, client=None) -> Tuple[str, Dict]:
+        """按提供商分发调用，返回回复文本和统一格式的用量（ttft 为本次请求的首 Token 延迟）"""
+        args = (request['prompt'], request['max_tokens'], config, client, request.get('system'))
+        if provider == 'claude':
+            return AIClient._call_claude(*args)
+        elif provider == 'openai':
+            return AIClient._call_openai(*args)
+        elif provider == 'qwen':
+            return AIClient._call_qwen(*args)
+        elif provider == 'deepseek':
+            return AIClient._call_deepseek(*args)
+        raise ValueError(f"不支持的AI提供商: {provider}")
+    
+    @staticmethod
+    def _chat_messages(prompt: str, system: Optional[str]) -> List[Dict]:
+        """构建 OpenAI 兼容接口的消息列表，固定前缀放在 system 消息中以便提供商自动缓存"""
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        return messages
+    
+    @staticmethod
+    def _stream_chat(client, prompt: str, max_tokens: int, config: Dict, system: Optional[str]) -> Tuple[str, Dict]:
+        """以流式方式调用 OpenAI 兼容接口，记录首 Token 延迟并在最后一个分块中取得用量"""
+        start = time.perf_counter()
+        stream = client.chat.completions.create(
+            model=config['model'],
+            messages=AIClient._chat_messages(prompt, system),
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        parts = []
+        ttft = None
+        usage = None
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(chunk.choices[0].delta.content)
+            if chunk.usage:
+                usage = chunk.usage
+        
+        # DeepSeek 用 prompt_cache_hit_tokens 报告缓存命中，其它提供商用 prompt_tokens_details.cached_tokens
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) if details else None
+        if cached is None:
+            cached = getattr(usage, 'prompt_cache_hit_tokens', None)
+        return "".join(parts), {
+            'input_tokens': usage.prompt_tokens if usage else 0,
+            'output_tokens': usage.completion_tokens if usage else 0,
+            'cache_read_tokens': cached or 0,
+            'cache_write_tokens': 0,
+            'ttft': ttft
+        }
+    
+    @staticmethod
+    def _call_claude(prompt: str, max_tokens: int, config: Dict, client=None,
+                     system: Optional[str] = None) -> Tuple[str, Dict]:
+        """调用Claude API，system 前缀通过 cache_control 标记为可缓存"""
+        if client is None:
+            import anthropic
+            client = anthropic.Anthropic(api_key=config['api_key'])
+        kwargs = {}
+        if system:
+            kwargs['system'] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        start = time.perf_counter()
+        ttft = None
+        with client.messages.stream(
+            model=config['model'],
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs
+        ) as stream:
+            for _ in stream.text_stream:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+            message = stream.get_final_message()
+        usage = message.usage
+        cache_read = getattr(usage, 'cache_read_input_tokens', None) or 0
+        cache_write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+        return message.content[0].text, {
+            # Anthropic 的 input_tokens 不含缓存部分，这里统一为提示词总 Token 数
+            'input_tokens': usage.input_tokens + cache_read + cache_write,
+            'output_tokens': usage.output_tokens,
+            'cache_read_tokens': cache_read,
+            'cache_write_tokens': cache_write,
+            'ttft': ttft
+        }
+    
+    @staticmethod
+    def _call_openai(prompt: str, max_tokens: int, config: Dict, client=None,
+                     system: Optional[str] = None) -> Tuple[str, Dict]:
+        """调用OpenAI API"""
+        if client is None:
+            import openai
+            client = openai.OpenAI(api_key=config['api_key'])
+        return AIClient._stream_chat(client, prompt, max_tokens, config, system)
+    
+    @staticmethod
+    def _call_qwen(prompt: str, max_tokens: int, config: Dict, client=None,
+                   system: Optional[str] = None) -> Tuple[str, Dict]:
+        """调用通义千问API"""
+        if client is None:
+            import openai
+            client = openai.OpenAI(api_key=config['api_key'], base_url=config['base_url'])
+        return AIClient._stream_chat(client, prompt, max_tokens, config, system)
+    
+    @staticmethod
+    def _call_deepseek(prompt: str, max_tokens: int, config: Dict, client=None,
+                       system: Optional[str] = None) -> Tuple[str, Dict]:
+        """调用DeepSeek API"""
+        if client is None:
+            import openai
+            client = openai.OpenAI(api_key=config['api_key'], base_url=config['base_url'])
+        return AIClient._stream_chat(client, prompt, max_tokens, config, system)
+
+
+# AI 调用遥测
+def record_ai_metrics(result: Dict, path: str = METRICS_FILE):
+    """把一次调用以紧凑的 JSON Lines 追加到本地指标文件"""
+    usage = result.get('usage') or {}
+    record = {
+        't': int(time.time()),
+        'p': result['provider'],
+        'm': result.get('model'),
+        'f': result['feature'],
+        'in': usage.get('input_tokens', 0),
+        'out': usage.get('output_tokens', 0),
+        'cr': usage.get('cache_read_tokens', 0),
+        'cw': usage.get('cache_write_tokens', 0),
+        'ttft': round(result['ttft'] * 1000) if result.get('ttft') is not None else None,
+        'ms': round(result['latency'] * 1000),
+        'r': result.get('retries', 0),
+        'ok': 1 if result['error'] is None and not result.get('cancelled') else 0
+    }
+    if result.get('cancelled'):
+        record['x'] = 1
+    try:
+        # 与保留期清理共用文件锁，避免追加的记录在清理改写时丢失
+        with file_lock(path), open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+    except OSError:
+        # 遥测写入失败（包括等锁超时）不影响 AI 功能
+        pass
+
+
+def _read_metrics(path: str) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_ai_metrics(since: float, path: str = METRICS_FILE) -> List[Dict]:
+    """读取指定时间之后的调用记录，并顺带清理超过保留期的旧记录"""
+    if not os.path.exists(path):
+        return []
+    records = _read_metrics(path)
+    
+    cutoff = time.time() - METRICS_RETENTION_DAYS * 86400
+    if records and records[0]['t'] < cutoff:
+        # 持锁重新读取再改写：写临时文件后替换，期间其他线程或进程的追加会等待而不会丢失
+        with file_lock(path):
+            records = [r for r in _read_metrics(path) if r['t'] >= cutoff]
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + "\n" for r in records)
+            os.replace(tmp_path, path)
+    return [r for r in records if r['t'] >= since]
+
+
+def estimate_ai_cost(record: Dict) -> float:
+    """按模型单价估算一次调用的费用（美元），缓存读取和写入按提供商的折扣计费"""
+    price_in, price_out = MODEL_PRICING.get(record.get('m'), (0.0, 0.0))
+    read_ratio, write_ratio = CACHE_PRICE_RATIOS.get(record['p'], (1.0, 1.0))
+    uncached = record['in'] - record['cr'] - record['cw']
+    input_cost = (uncached + record['cr'] * read_ratio + record['cw'] * write_ratio) * price_in
+    return (input_cost + record['out'] * price_out) / 1_000_000
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """计算已排序序列的百分位数（最近秩法），空序列返回 None"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+# 后台 AI 任务
+class AIJobRunner:
+    """在线程池中执行 AI 调用计划；界面通过 st.cache_resource 让它跨 rerun 和会话保留"""
+    
+    def __init__(self, max_workers: int = AI_JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, plan: Dict) -> str:
+        """提交调用计划，返回任务 ID"""
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {'status': 'queued', 'submitted': time.time(), 'finished': None, 'outcome': None}
+        self._executor.submit(self._run, job_id, plan)
+        return job_id
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态：queued / running / done"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def forget(self, job_id: str):
+        """移除已经取回结果的任务"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+    
+    def _run(self, job_id: str, plan: Dict):
+        with self._lock:
+            self._jobs[job_id]['status'] = 'running'
+        try:
+            outcome = AIClient.execute_plan(plan)
+        except Exception as e:
+            outcome = {'text': None, 'provider': None, 'error': str(e), 'results': []}
+        with self._lock:
+            self._jobs[job_id].update(status='done', finished=time.time(), outcome=outcome)
+    
+    def _prune(self):
+        # 会话关闭后无人取回的结果保留一段时间后丢弃
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished'] and time.time() - job['finished'] > AI_JOB_RESULT_TTL
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,314 @@
+"""
+本地 HTTP/JSON 接口
+
+供脚本和其他工具直接操作规划数据，不经过 Streamlit 页面，一次请求即可处理成批记录：
+    POST /tasks               批量新增任务：JSON 数组、{"kind": ..., "tasks": [...]} 或 NDJSON（每行一条）
+    GET  /schedule            按日期范围（start、end 或 days）计算日程，不写回数据文件
+    POST /schedule/generate   生成今日日程和 N 日日程并保存，界面下次刷新时可见
+    GET  /schedule.ics        导出日期范围内的日程为 iCalendar
+    GET  /health
+
+GET /schedule 在 Accept 为 application/x-ndjson 或带 stream=1 时逐日流式返回，iCalendar 总是流式返回；
+连接使用 HTTP/1.1 keep-alive，批量脚本不必为每个请求重新建立连接。
+
+命令行用法：
+    python -m goal_planner.api [--data goal_planner_data.json | --profile NAME] [--port 8780]
+
+数据文件与界面共用：每次请求前按文件签名重新加载（未变化时跳过），写操作整批完成后保存一次。
+"""
+
+import argparse
+import json
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from goal_planner.date_index import parse_date
+from goal_planner.models import task_record
+from goal_planner.scheduler import day_inputs, generate_schedule, generate_weekly_schedule, iter_icalendar, layout_days
+from goal_planner.state import PlannerState, add_task
+from goal_planner.stats import TASK_KINDS
+from goal_planner.storage import DATA_FILE, load_state, profile_path, save_state
+
+API_PORT = 8780                     # 批量接口模拟服务默认使用 8765
+MAX_BODY_BYTES = 32 * 1024 * 1024   # 单个请求体上限
+MAX_SCHEDULE_DAYS = 366             # 一次查询或生成的最多天数
+STREAM_CHUNK_BYTES = 64 * 1024      # 流式响应攒够该大小再发送一个分块
+NDJSON = 'application/x-ndjson'
+
+
+class APIError(Exception):
+    """请求无效，按 status 返回给客户端"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class PlannerService:
+    """接口背后的规划数据：所有请求共用一个状态对象，读写都在锁内进行"""
+
+    def __init__(self, data_file: str = DATA_FILE):
+        self.data_file = data_file
+        self.state = PlannerState()
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        # 界面或批量任务改过数据文件时重新加载
+        load_state(self.state, self.data_file)
+
+    def create_tasks(self, records: List[Dict], kind: str = 'tasks') -> Dict:
+        """批量新增任务，无效的记录跳过并报告位置和原因，有效记录整批保存一次"""
+        if kind not in TASK_KINDS:
+            raise APIError(f"kind 应为 {' / '.join(TASK_KINDS)}: {kind}")
+        now = datetime.now()
+        created, errors = [], []
+        with self.lock:
+            self._refresh()
+            existing = {task['id'] for task in self.state[kind]}
+            for i, fields in enumerate(records):
+                try:
+                    if not isinstance(fields, dict):
+                        raise ValueError("每条任务应为 JSON 对象")
+                    task = task_record(fields, now, offset=i)
+                    if task['id'] in existing:
+                        raise ValueError(f"任务 ID 已存在: {task['id']}")
+                except ValueError as e:
+                    errors.append({'index': i, 'error': str(e)})
+                    continue
+                existing.add(task['id'])
+                add_task(self.state, task, kind)
+                created.append(task['id'])
+            if created:
+                save_state(self.state, self.data_file)
+        return {'kind': kind, 'created': len(created), 'ids': created, 'errors': errors}
+
+    def plan(self, start: date, days: int) -> Iterator[Tuple[str, List[Dict]]]:
+        """逐日计算日期范围内的日程，不写回状态
+
+        锁内只取出每天的任务和日常活动，排日程在锁外边迭代边进行：流式响应尽早发出第一天，
+        长日期范围也不会阻塞其他请求。
+        """
+        with self.lock:
+            self._refresh()
+            inputs = day_inputs(self.state, start, days)
+        return layout_days(*inputs)
+
+    def generate(self, start: date, days: int, today: bool = True) -> Dict:
+        """生成并保存 N 日日程；today=True 时同时生成今日日程"""
+        with self.lock:
+            self._refresh()
+            if today:
+                generate_schedule(self.state)
+            weekly_schedule = generate_weekly_schedule(self.state, start, days)
+            save_state(self.state, self.data_file)
+            return {
+                'schedule': self.state.schedule if today else None,
+                'weekly_schedule': weekly_schedule
+            }
+
+
+def date_range(params: Dict[str, List[str]], default_days: int = 7) -> Tuple[date, int]:
+    """从查询参数取日期范围：start 默认今天；end（含）优先于 days"""
+    def get(name: str) -> Optional[str]:
+        values = params.get(name)
+        return values[-1] if values else None
+
+    start = date.today()
+    if get('start'):
+        start = parse_date(get('start'))
+        if start is None:
+            raise APIError(f"start 应为 YYYY-MM-DD: {get('start')}")
+    if get('end'):
+        end = parse_date(get('end'))
+        if end is None:
+            raise APIError(f"end 应为 YYYY-MM-DD: {get('end')}")
+        days = (end - start).days + 1
+    else:
+        try:
+            days = int(get('days') or default_days)
+        except ValueError:
+            raise APIError(f"days 应为整数: {get('days')}") from None
+    if not 1 <= days <= MAX_SCHEDULE_DAYS:
+        raise APIError(f"日期范围应为 1 到 {MAX_SCHEDULE_DAYS} 天")
+    return start, days
+
+
+def parse_task_payload(body: bytes, content_type: str, kind: Optional[str]) -> Tuple[List, str]:
+    """解析批量任务请求体，返回 (任务列表, 类型)"""
+    try:
+        if content_type.startswith(NDJSON):
+            records = [json.loads(line) for line in body.decode('utf-8').splitlines() if line.strip()]
+        else:
+            payload = json.loads(body.decode('utf-8') or 'null')
+            if isinstance(payload, dict) and 'tasks' in payload:
+                kind = kind or payload.get('kind')
+                records = payload['tasks']
+            elif isinstance(payload, dict):
+                records = [payload]
+            else:
+                records = payload
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise APIError(f"请求体不是有效的 JSON: {e}") from None
+    if not isinstance(records, list):
+        raise APIError("请求体应为任务对象、任务数组或 {\"tasks\": [...]}")
+    return records, kind or 'tasks'
+
+
+def _json_lines(day_schedules: Iterable[Tuple[str, List[Dict]]]) -> Iterator[str]:
+    for day, items in day_schedules:
+        yield json.dumps({'date': day, 'items': items}, ensure_ascii=False) + "\n"
+
+
+def make_handler(service: PlannerService):
+    """创建绑定到给定规划数据的请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True   # 响应头和响应体分开写出，keep-alive 下避免 Nagle 与延迟确认叠加的等待
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload, content_type: str = 'application/json'):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_stream(self, parts: Iterable[str], content_type: str, filename: Optional[str] = None):
+            """分块传输：边生成边发送，小片段攒够 STREAM_CHUNK_BYTES 再写出"""
+            self.send_response(200)
+            self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+            self.send_header('Transfer-Encoding', 'chunked')
+            if filename:
+                self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+            self.end_headers()
+            buffer, size = [], 0
+            for part in parts:
+                data = part.encode('utf-8')
+                buffer.append(data)
+                size += len(data)
+                if size >= STREAM_CHUNK_BYTES:
+                    self._write_chunk(b"".join(buffer))
+                    buffer, size = [], 0
+            if buffer:
+                self._write_chunk(b"".join(buffer))
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+        def _read_body(self) -> bytes:
+            header = self.headers.get('Content-Length') or '0'
+            if not header.strip().isdigit():
+                raise APIError(f"Content-Length 无效: {header}")
+            length = int(header)
+            if length > MAX_BODY_BYTES:
+                raise APIError(f"请求体超过 {MAX_BODY_BYTES // (1024 * 1024)} MB", 413)
+            return self.rfile.read(length)
+
+        def _dispatch(self, routes: Dict):
+            url = urlsplit(self.path)
+            handler = routes.get(url.path.rstrip('/') or '/')
+            try:
+                if handler is None:
+                    raise APIError(f"未知的接口: {url.path}", 404)
+                handler(parse_qs(url.query))
+            except APIError as e:
+                # 出错时请求体可能没有读完，关闭连接以免残留数据被当作下一个请求
+                self.close_connection = True
+                self._send(e.status, {'error': str(e)})
+            except Exception as e:
+                # 数据文件损坏或无法写入等
+                self.close_connection = True
+                self._send(500, {'error': str(e)})
+
+        def do_GET(self):
+            self._dispatch({
+                '/health': lambda params: self._send(200, {'status': 'ok'}),
+                '/schedule': self._get_schedule,
+                '/schedule.ics': self._get_icalendar,
+            })
+
+        def do_POST(self):
+            self._dispatch({
+                '/tasks': self._post_tasks,
+                '/schedule/generate': self._post_generate,
+            })
+
+        def _get_schedule(self, params: Dict[str, List[str]]):
+            start, days = date_range(params)
+            day_schedules = service.plan(start, days)
+            if params.get('stream', ['0'])[-1] == '1' or NDJSON in self.headers.get('Accept', ''):
+                return self._send_stream(_json_lines(day_schedules), NDJSON)
+            self._send(200, {
+                'start': start.isoformat(),
+                'end': (start + timedelta(days=days - 1)).isoformat(),
+                'schedule': dict(day_schedules)
+            })
+
+        def _get_icalendar(self, params: Dict[str, List[str]]):
+            start, days = date_range(params)
+            lines = iter_icalendar(service.plan(start, days))
+            self._send_stream((line + "\n" for line in lines), 'text/calendar',
+                              f"goal_planner_schedule_{start.strftime('%Y%m%d')}.ics")
+
+        def _post_tasks(self, params: Dict[str, List[str]]):
+            kind = params['kind'][-1] if params.get('kind') else None
+            records, kind = parse_task_payload(self._read_body(), self.headers.get('Content-Type', ''), kind)
+            self._send(200, service.create_tasks(records, kind))
+
+        def _post_generate(self, params: Dict[str, List[str]]):
+            body = self._read_body()
+            try:
+                options = json.loads(body.decode('utf-8')) if body.strip() else {}
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise APIError(f"请求体不是有效的 JSON: {e}") from None
+            if not isinstance(options, dict):
+                raise APIError("请求体应为 JSON 对象")
+            query = {key: [str(value)] for key, value in options.items() if key in ('start', 'end', 'days')}
+            start, days = date_range({**params, **query})
+            self._send(200, service.generate(start, days, today=bool(options.get('today', True))))
+
+    return Handler
+
+
+def start_server(data_file: str = DATA_FILE, port: int = 0, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """在后台线程启动接口服务并返回服务器对象，port=0 时自动选择端口"""
+    server = ThreadingHTTPServer((host, port), make_handler(PlannerService(data_file)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m goal_planner.api', description='智能目标管理系统本地 HTTP/JSON 接口')
+    parser.add_argument('--data', default=DATA_FILE, help='数据文件')
+    parser.add_argument('--profile', help='档案名，使用该档案的数据分片（替代 --data）')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认只允许本机访问）')
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args(argv)
+    if args.profile:
+        try:
+            args.data = profile_path(args.profile)
+        except ValueError as e:
+            parser.error(str(e))
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(PlannerService(args.data)))
+    print(f"本地接口: http://{args.host}:{args.port}（数据文件 {args.data}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+完成任务归档
+
+完成时间早于 N 天的任务和周任务移出数据文件，按完成月份追加到压缩归档 goal_planner_archive/YYYY-MM.jsonl.gz
+（与数据文件同目录，每个档案各有一份）。归档只追加不改写：每次追加一个新的 gzip 成员，读取时依次解压。
+日常的扫描、统计和保存只涉及未归档的数据，历史记录和分析通过 query_archive / summarize_archive 按月份读取。
+
+先写归档再保存数据文件：两步之间中断时记录会同时出现在两边，下次归档时再次写入，查询按记录 ID 去重。
+
+命令行用法：
+    python -m goal_planner.archive run [--days 30] [--data FILE | --profile NAME]
+    python -m goal_planner.archive query [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--kind tasks]
+    python -m goal_planner.archive summary [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from goal_planner.date_index import parse_date
+from goal_planner.state import PlannerState, refresh_task_indexes
+from goal_planner.stats import TASK_KINDS
+from goal_planner.storage import DATA_FILE, file_lock, load_state, profile_path, save_state
+
+ARCHIVE_DIRNAME = "goal_planner_archive"
+ARCHIVE_AFTER_DAYS = 30           # 完成超过该天数的任务归档
+
+
+def archive_dir(data_file: str = DATA_FILE) -> str:
+    """数据文件对应的归档目录"""
+    return os.path.join(os.path.dirname(data_file), ARCHIVE_DIRNAME)
+
+
+def completed_on(task: Dict) -> Optional[date]:
+    """任务的完成日期；早期数据没有 completedAt 时依次用计划日期和创建时间代替"""
+    for field in ('completedAt', 'scheduledDate', 'createdAt'):
+        day = parse_date(task.get(field))
+        if day is not None:
+            return day
+    return None
+
+
+def list_partitions(data_file: str = DATA_FILE) -> List[Tuple[str, str]]:
+    """已有的归档分区 [(YYYY-MM, 路径)]，按月份排序"""
+    directory = archive_dir(data_file)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted((name[:-len('.jsonl.gz')], os.path.join(directory, name))
+                  for name in names if name.endswith('.jsonl.gz'))
+
+
+def partitions_signature(data_file: str = DATA_FILE) -> Tuple[Tuple[str, int, float], ...]:
+    """各归档分区的 (月份, 大小, 修改时间)，归档追加后随之变化，可作汇总结果的缓存键"""
+    signature = []
+    for month, path in list_partitions(data_file):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((month, stat.st_size, stat.st_mtime))
+    return tuple(signature)
+
+
+def archive_completed(state, data_file: str = DATA_FILE, older_than_days: int = ARCHIVE_AFTER_DAYS,
+                      today: Optional[date] = None) -> int:
+    """把完成超过 older_than_days 天的任务写入归档并移出状态，返回归档条数；调用方随后保存数据"""
+    cutoff = (today or date.today()) - timedelta(days=older_than_days)
+    partitions: Dict[str, List[str]] = {}
+    archived_at = datetime.now().isoformat()
+    remaining = {}
+    for kind in TASK_KINDS:
+        kept = []
+        for task in state[kind]:
+            day = completed_on(task) if task.get('completed') else None
+            if day is None or day >= cutoff:
+                kept.append(task)
+                continue
+            line = json.dumps({'kind': kind, 'archivedAt': archived_at, 'record': task}, ensure_ascii=False)
+            partitions.setdefault(day.strftime('%Y-%m'), []).append(line)
+        remaining[kind] = kept
+    if not partitions:
+        return 0
+
+    directory = archive_dir(data_file)
+    os.makedirs(directory, exist_ok=True)
+    for month, lines in sorted(partitions.items()):
+        path = os.path.join(directory, f"{month}.jsonl.gz")
+        with file_lock(path), gzip.open(path, 'at', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+    # 重新赋值而不是原地删除，列表可能与其他会话共享
+    for kind in TASK_KINDS:
+        state[kind] = remaining[kind]
+    refresh_task_indexes(state)
+    return sum(len(lines) for lines in partitions.values())
+
+
+def query_archive(data_file: str = DATA_FILE, start: Optional[date] = None, end: Optional[date] = None,
+                  kinds: Sequence[str] = TASK_KINDS) -> Iterator[Dict]:
+    """按完成日期范围（含两端）读取归档，产出 {'kind', 'archivedAt', 'record'}；只打开范围内的月份分区"""
+    first = start.strftime('%Y-%m') if start else None
+    last = end.strftime('%Y-%m') if end else None
+    for month, path in list_partitions(data_file):
+        if (first and month < first) or (last and month > last):
+            continue
+        entries = {}
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                # 同一记录重复归档时保留最后一次
+                entries[(entry['kind'], entry['record']['id'])] = entry
+        for entry in entries.values():
+            day = completed_on(entry['record'])
+            if entry['kind'] not in kinds or (start and day < start) or (end and day > end):
+                continue
+            yield entry
+
+
+def summarize_archive(data_file: str = DATA_FILE, start: Optional[date] = None,
+                      end: Optional[date] = None) -> List[Dict]:
+    """按月份汇总归档的任务数和预计用时（分钟）"""
+    months: Dict[str, Dict] = {}
+    for entry in query_archive(data_file, start, end):
+        month = completed_on(entry['record']).strftime('%Y-%m')
+        row = months.setdefault(month, {'month': month, 'tasks': 0, 'weekly_tasks': 0, 'minutes': 0})
+        row[entry['kind']] += 1
+        row['minutes'] += entry['record'].get('estimatedTime') or 0
+    return [months[month] for month in sorted(months)]
+
+
+# 命令行
+def _parse_day(parser: argparse.ArgumentParser, value: Optional[str], name: str) -> Optional[date]:
+    if value is None:
+        return None
+    day = parse_date(value)
+    if day is None:
+        parser.error(f"{name} 应为 YYYY-MM-DD: {value}")
+    return day
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m goal_planner.archive', description='完成任务归档与历史查询')
+    parser.add_argument('--data', default=DATA_FILE, help='数据文件')
+    parser.add_argument('--profile', help='档案名，使用该档案的数据分片（替代 --data）')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='归档完成较久的任务')
+    run.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS, help='完成超过该天数的任务归档')
+
+    for name, help_text in (('query', '按完成日期查询归档，每行输出一条 JSON'), ('summary', '按月份汇总归档')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--start', help='起始日期 YYYY-MM-DD（含）')
+        command.add_argument('--end', help='结束日期 YYYY-MM-DD（含）')
+        if name == 'query':
+            command.add_argument('--kind', choices=TASK_KINDS, help='只查询任务或周任务')
+
+    args = parser.parse_args(argv)
+    if args.profile:
+        try:
+            args.data = profile_path(args.profile)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.command == 'run':
+        if args.days < 0:
+            parser.error("--days 不能为负数")
+        state = PlannerState()
+        if not load_state(state, args.data):
+            print(f"数据文件不存在: {args.data}", file=sys.stderr)
+            return 1
+        archived = archive_completed(state, args.data, args.days)
+        if archived:
+            save_state(state, args.data)
+        print(f"归档 {archived} 条任务到 {archive_dir(args.data)}")
+        return 0
+
+    start, end = _parse_day(parser, args.start, '--start'), _parse_day(parser, args.end, '--end')
+    if args.command == 'query':
+        kinds = [args.kind] if args.kind else TASK_KINDS
+        for entry in query_archive(args.data, start, end, kinds):
+            print(json.dumps(entry, ensure_ascii=False))
+    else:
+        for row in summarize_archive(args.data, start, end):
+            print(f"{row['month']}  任务 {row['tasks']}  周任务 {row['weekly_tasks']}  预计 {row['minutes']} 分钟")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""
+离线批量 AI 处理
+
+把大量目标分解与洞察分析请求排入队列，通过提供商的批量接口（Anthropic Message Batches、
+OpenAI / 通义千问 Batch API）一次性提交，费用更低、吞吐更高；结果完成后由轮询合并回数据文件。
+
+命令行用法：
+    python -m goal_planner.batch enqueue breakdown [--goal ID ...]
+    python -m goal_planner.batch enqueue insights
+    python -m goal_planner.batch submit --provider claude
+    python -m goal_planner.batch poll [--watch]
+    python -m goal_planner.batch status
+    python -m goal_planner.batch stub-server
+
+--profile 指定档案时使用该档案目录下的数据文件和队列文件。
+
+API Key 从环境变量 ANTHROPIC_API_KEY / OPENAI_API_KEY / DASHSCOPE_API_KEY 读取。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from goal_planner.models import breakdown_to_records
+from goal_planner.prompts import (
+    DEFAULT_INSIGHT_TOKEN_BUDGET, INSIGHTS_SYSTEM_PROMPT, BREAKDOWN_SYSTEM_PROMPT,
+    build_insights_prompt, build_breakdown_prompt, snapshot_items, parse_ai_json,
+)
+from goal_planner.storage import DATA_FILE, file_lock, profile_path, write_json_atomic
+
+BATCH_FILE = "goal_planner_batches.json"   # 批量请求队列与已提交批次
+BATCH_POLL_INTERVAL = 60                     # poll --watch 的轮询间隔（秒）
+BATCH_MAX_TOKENS = {'breakdown': 2500, 'insights': 2000}
+# 支持批量接口的提供商：默认模型、默认地址与 API Key 环境变量；DeepSeek 暂无批量接口
+BATCH_PROVIDERS = {
+    'claude': {'model': 'claude-3-5-sonnet-20241022', 'base_url': None, 'env': 'ANTHROPIC_API_KEY'},
+    'openai': {'model': 'gpt-4o', 'base_url': None, 'env': 'OPENAI_API_KEY'},
+    'qwen': {'model': 'qwen-max', 'base_url': 'https://dashscope.aliyuncs.com/compatible-mode/v1',
+             'env': 'DASHSCOPE_API_KEY'},
+}
+BATCH_FINISHED_STATUSES = {'ended', 'completed', 'failed', 'expired', 'cancelled'}
+
+
+# 数据与队列文件
+def load_json_file(path: str, default: Dict) -> Dict:
+    """读取 JSON 文件，不存在时返回默认值"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_queue(path: str = BATCH_FILE) -> Dict:
+    """读取批量队列：pending 为待提交请求，batches 为已提交批次"""
+    return load_json_file(path, {'pending': [], 'batches': []})
+
+
+def save_queue(queue: Dict, path: str = BATCH_FILE):
+    """原子写入批量队列；需要先读后改时用 locked_queue"""
+    write_json_atomic(path, queue, indent=2)
+
+
+@contextmanager
+def locked_queue(path: str = BATCH_FILE) -> Iterator[Dict]:
+    """持有队列文件锁读取队列，正常退出时写回；界面和命令行同时排队、提交或收取时不会互相覆盖"""
+    with file_lock(path):
+        queue = load_queue(path)
+        yield queue
+        save_queue(queue, path)
+
+
+def _queued_goal_ids(queue: Dict) -> set:
+    """已在队列中或尚未合并的分解请求对应的目标"""
+    requests = list(queue['pending'])
+    for batch in queue['batches']:
+        if not batch.get('mergedAt'):
+            requests.extend(batch['requests'])
+    return {r['goalId'] for r in requests if r['kind'] == 'breakdown'}
+
+
+# 排队
+def enqueue_breakdowns(queue: Dict, data: Dict, goal_ids: Optional[List] = None) -> List[Dict]:
+    """为指定目标（默认为所有尚无子目标的目标）排入分解请求，返回新排入的请求"""
+    goals = data.get('goals', [])
+    if goal_ids:
+        wanted = {str(goal_id) for goal_id in goal_ids}
+        targets = [g for g in goals if str(g['id']) in wanted]
+    else:
+        parent_ids = {g.get('parentGoalId') for g in goals} | {t.get('goalId') for t in data.get('weekly_tasks', [])}
+        targets = [g for g in goals if g['id'] not in parent_ids]
+
+    queued = _queued_goal_ids(queue)
+    added = []
+    for goal in targets:
+        if goal['id'] in queued:
+            continue
+        added.append({
+            'custom_id': f"breakdown-{uuid.uuid4().hex[:12]}",
+            'kind': 'breakdown',
+            'goalId': goal['id'],
+            'label': goal['name'],
+            'system': BREAKDOWN_SYSTEM_PROMPT,
+            'prompt': build_breakdown_prompt(goal),
+            'max_tokens': BATCH_MAX_TOKENS['breakdown'],
+            'createdAt': datetime.now().isoformat()
+        })
+    queue['pending'].extend(added)
+    return added
+
+
+def enqueue_insights(queue: Dict, data: Dict, provider: str = 'claude',
+                     budget: int = DEFAULT_INSIGHT_TOKEN_BUDGET) -> Dict:
+    """排入一次完整的洞察分析请求，替换队列中尚未提交的洞察请求"""
+    items = {
+        'goals': data.get('goals', []),
+        'tasks': data.get('tasks', []),
+        'weekly_tasks': data.get('weekly_tasks', []),
+        'activities': data.get('activities', [])
+    }
+    open_tasks = [t for t in items['tasks'] + items['weekly_tasks'] if not t.get('completed')]
+    request = {
+        'custom_id': f"insights-{uuid.uuid4().hex[:12]}",
+        'kind': 'insights',
+        'label': '效率洞察',
+        'system': INSIGHTS_SYSTEM_PROMPT,
+        'prompt': build_insights_prompt(items['goals'], items['activities'], open_tasks, provider, budget),
+        'max_tokens': BATCH_MAX_TOKENS['insights'],
+        # 快照取排队时的数据，之后的修改会在下次增量分析中发送
+        'snapshot_items': snapshot_items(items),
+        'createdAt': datetime.now().isoformat()
+    }
+    queue['pending'] = [r for r in queue['pending'] if r['kind'] != 'insights'] + [request]
+    return request
+
+
+# 提交与收取
+def provider_config(provider: str, api_key: Optional[str] = None, model: Optional[str] = None,
+                    base_url: Optional[str] = None) -> Dict:
+    """合并默认配置、环境变量和显式参数"""
+    if provider not in BATCH_PROVIDERS:
+        raise ValueError(f"{provider} 不支持批量接口，可选: {', '.join(BATCH_PROVIDERS)}")
+    defaults = BATCH_PROVIDERS[provider]
+    return {
+        'api_key': api_key or os.environ.get(defaults['env'], ''),
+        'model': model or defaults['model'],
+        'base_url': base_url or defaults['base_url']
+    }
+
+
+def _create_client(provider: str, config: Dict):
+    """创建提供商 SDK 客户端"""
+    if provider == 'claude':
+        import anthropic
+        return anthropic.Anthropic(api_key=config['api_key'], base_url=config.get('base_url'))
+    import openai
+    return openai.OpenAI(api_key=config['api_key'], base_url=config.get('base_url'))
+
+
+def _anthropic_requests(requests: List[Dict], model: str) -> List[Dict]:
+    """构建 Message Batches 请求，固定的 system 前缀标记为可缓存"""
+    return [{
+        'custom_id': r['custom_id'],
+        'params': {
+            'model': model,
+            'max_tokens': r['max_tokens'],
+            'system': [{'type': 'text', 'text': r['system'], 'cache_control': {'type': 'ephemeral'}}],
+            'messages': [{'role': 'user', 'content': r['prompt']}]
+        }
+    } for r in requests]
+
+
+def _openai_jsonl(requests: List[Dict], model: str) -> bytes:
+    """构建 Batch API 的 JSONL 输入文件"""
+    lines = [json.dumps({
+        'custom_id': r['custom_id'],
+        'method': 'POST',
+        'url': '/v1/chat/completions',
+        'body': {
+            'model': model,
+            'max_tokens': r['max_tokens'],
+            'messages': [
+                {'role': 'system', 'content': r['system']},
+                {'role': 'user', 'content': r['prompt']}
+            ]
+        }
+    }, ensure_ascii=False) for r in requests]
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def submit_pending(queue: Dict, provider: str, config: Dict) -> Optional[Dict]:
+    """把队列中的待提交请求作为一个批次提交，返回批次记录；队列为空时返回 None"""
+    requests = queue['pending']
+    if not requests:
+        return None
+    client = _create_client(provider, config)
+    if provider == 'claude':
+        remote = client.messages.batches.create(requests=_anthropic_requests(requests, config['model']))
+        status = remote.processing_status
+    else:
+        input_file = client.files.create(file=('batch_input.jsonl', _openai_jsonl(requests, config['model'])),
+                                         purpose='batch')
+        remote = client.batches.create(input_file_id=input_file.id, endpoint='/v1/chat/completions',
+                                       completion_window='24h')
+        status = remote.status
+
+    batch = {
+        'id': remote.id,
+        'provider': provider,
+        'model': config['model'],
+        'base_url': config.get('base_url'),   # API Key 不写入文件
+        'status': status,
+        'requests': requests,
+        'submittedAt': datetime.now().isoformat()
+    }
+    queue['batches'].append(batch)
+    queue['pending'] = []
+    return batch
+
+
+def _collect_results(client, batch: Dict) -> Optional[Dict[str, Dict]]:
+    """查询批次状态，完成时返回 custom_id → {'text', 'error'}，未完成返回 None"""
+    results = {}
+    if batch['provider'] == 'claude':
+        remote = client.messages.batches.retrieve(batch['id'])
+        batch['status'] = remote.processing_status
+        if remote.processing_status != 'ended':
+            return None
+        for item in client.messages.batches.results(batch['id']):
+            if item.result.type == 'succeeded':
+                text = "".join(block.text for block in item.result.message.content if block.type == 'text')
+                results[item.custom_id] = {'text': text, 'error': None}
+            else:
+                results[item.custom_id] = {'text': None, 'error': item.result.type}
+        return results
+
+    remote = client.batches.retrieve(batch['id'])
+    batch['status'] = remote.status
+    if remote.status not in BATCH_FINISHED_STATUSES:
+        return None
+    for file_id in (remote.output_file_id, remote.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get('response') or {}
+            if response.get('status_code') == 200:
+                text = response['body']['choices'][0]['message']['content']
+                results[item['custom_id']] = {'text': text, 'error': None}
+            else:
+                error = item.get('error') or {}
+                results[item['custom_id']] = {'text': None, 'error': error.get('message') or f"HTTP {response.get('status_code')}"}
+    return results
+
+
+def merge_result(data: Dict, request: Dict, text: str) -> str:
+    """把一个请求的结果合并进数据，返回结果摘要"""
+    result = parse_ai_json(text)
+    if request['kind'] == 'breakdown':
+        goal = next((g for g in data.get('goals', []) if g['id'] == request['goalId']), None)
+        if goal is None:
+            return f"目标「{request['label']}」已被删除，跳过"
+        new_goals, new_weekly_tasks = breakdown_to_records(goal, result.get('subGoals', []))
+        data.setdefault('goals', []).extend(new_goals)
+        data.setdefault('weekly_tasks', []).extend(new_weekly_tasks)
+        return f"「{goal['name']}」新增 {len(new_goals)} 个子目标、{len(new_weekly_tasks)} 个周任务"
+
+    data['insights'] = result.get('insights', [])
+    data['insights_snapshot'] = {
+        'items': request['snapshot_items'],
+        'insights': data['insights'],
+        'createdAt': datetime.now().isoformat()
+    }
+    return f"更新 {len(data['insights'])} 条效率洞察"
+
+
+def poll_batches(queue: Dict, data_file: str = DATA_FILE, api_keys: Optional[Dict[str, str]] = None) -> List[str]:
+    """检查所有未合并的批次，把已完成批次的结果合并进数据文件，返回处理日志"""
+    log = []
+    completed = []
+    for batch in queue['batches']:
+        if batch.get('mergedAt'):
+            continue
+        config = provider_config(batch['provider'], (api_keys or {}).get(batch['provider']),
+                                 batch['model'], batch.get('base_url'))
+        results = _collect_results(_create_client(batch['provider'], config), batch)
+        if results is None:
+            log.append(f"{batch['id']}: {batch['status']}")
+            continue
+        completed.append((batch, results))
+    if not completed:
+        return log
+
+    # 结果全部取回后再持锁读取、合并和写回数据文件，保留界面期间的其它修改
+    with file_lock(data_file):
+        data = load_json_file(data_file, {})
+        for batch, results in completed:
+            for request in batch['requests']:
+                outcome = results.get(request['custom_id'], {'text': None, 'error': '无结果'})
+                if outcome['text'] is None:
+                    log.append(f"{batch['id']} / {request['label']}: 失败 ({outcome['error']})")
+                    continue
+                try:
+                    log.append(f"{batch['id']} / {merge_result(data, request, outcome['text'])}")
+                except Exception as e:
+                    log.append(f"{batch['id']} / {request['label']}: 解析失败 ({str(e)})")
+            batch['mergedAt'] = datetime.now().isoformat()
+        data['saved_at'] = datetime.now().isoformat()
+        write_json_atomic(data_file, data, indent=2)
+    return log
+
+
+def queue_summary(queue: Dict) -> List[Dict]:
+    """队列与批次的状态概览"""
+    rows = []
+    if queue['pending']:
+        rows.append({'批次': '（待提交）', '提供商': '-', '请求数': len(queue['pending']), '状态': 'pending', '提交时间': '-'})
+    for batch in queue['batches']:
+        rows.append({
+            '批次': batch['id'],
+            '提供商': batch['provider'],
+            '请求数': len(batch['requests']),
+            '状态': 'merged' if batch.get('mergedAt') else batch['status'],
+            '提交时间': batch['submittedAt'][:16].replace('T', ' ')
+        })
+    return rows
+
+
+# 命令行
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m goal_planner.batch', description='离线批量 AI 处理')
+    parser.add_argument('--data', default=DATA_FILE, help='数据文件')
+    parser.add_argument('--queue', default=BATCH_FILE, help='批量队列文件')
+    parser.add_argument('--profile', help='档案名，替代 --data 和 --queue')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='排入请求')
+    enqueue.add_argument('kind', choices=['breakdown', 'insights'])
+    enqueue.add_argument('--goal', action='append', help='要分解的目标 ID，可重复；默认为所有尚无子目标的目标')
+    enqueue.add_argument('--provider', default='claude', help='洞察提示词按该提供商估算 Token')
+    enqueue.add_argument('--budget', type=int, default=DEFAULT_INSIGHT_TOKEN_BUDGET, help='洞察提示词 Token 预算')
+
+    submit = commands.add_parser('submit', help='提交待处理请求')
+    submit.add_argument('--provider', default='claude', choices=list(BATCH_PROVIDERS))
+    submit.add_argument('--model')
+    submit.add_argument('--base-url')
+
+    poll = commands.add_parser('poll', help='收取已完成批次并合并结果')
+    poll.add_argument('--watch', action='store_true', help='持续轮询直到所有批次合并')
+    poll.add_argument('--interval', type=float, default=BATCH_POLL_INTERVAL)
+
+    commands.add_parser('status', help='查看队列状态')
+
+    stub = commands.add_parser('stub-server', help='启动本地批量接口模拟服务')
+    stub.add_argument('--port', type=int, default=8765)
+    stub.add_argument('--delay', type=float, default=2.0, help='批次完成所需秒数')
+
+    args = parser.parse_args(argv)
+    if args.profile:
+        try:
+            args.data, args.queue = profile_path(args.profile), profile_path(args.profile, BATCH_FILE)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.command == 'stub-server':
+        from goal_planner.batch_stub import serve
+        serve(args.port, args.delay)
+        return 0
+
+    if args.command == 'status':
+        for row in queue_summary(load_queue(args.queue)):
+            print("  ".join(str(value) for value in row.values()))
+    elif args.command == 'enqueue':
+        data = load_json_file(args.data, {})
+        with locked_queue(args.queue) as queue:
+            if args.kind == 'breakdown':
+                added = enqueue_breakdowns(queue, data, args.goal)
+                print(f"排入 {len(added)} 个目标分解请求")
+            else:
+                enqueue_insights(queue, data, args.provider, args.budget)
+                print("排入洞察分析请求")
+    elif args.command == 'submit':
+        config = provider_config(args.provider, model=args.model, base_url=args.base_url)
+        if not config['api_key']:
+            print(f"缺少环境变量 {BATCH_PROVIDERS[args.provider]['env']}", file=sys.stderr)
+            return 1
+        with locked_queue(args.queue) as queue:
+            batch = submit_pending(queue, args.provider, config)
+        if batch is None:
+            print("没有待提交的请求")
+            return 0
+        print(f"已提交批次 {batch['id']}（{len(batch['requests'])} 个请求）")
+    else:
+        while True:
+            with locked_queue(args.queue) as queue:
+                for line in poll_batches(queue, args.data):
+                    print(line)
+            if not args.watch or all(b.get('mergedAt') for b in queue['batches']):
+                break
+            time.sleep(args.interval)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+批量接口本地模拟服务
+
+模拟 Anthropic Message Batches 与 OpenAI Batch / Files 接口，按请求的 system 提示词返回固定的
+分解或洞察结果，用于在没有 API Key 的情况下测试批量流程：
+    python -m goal_planner.batch stub-server --port 8765
+    python -m goal_planner.batch submit --provider claude --base-url http://127.0.0.1:8765
+"""
+
+import email
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+from goal_planner.prompts import BREAKDOWN_SYSTEM_PROMPT
+
+BREAKDOWN_RESPONSE = {
+    'analysis': '先打基础，再按周推进',
+    'subGoals': [
+        {'name': '完成基础阶段', 'type': '月度', 'category': '学习', 'description': '掌握核心概念',
+         'deadline': '2030-01-31', 'priority': 1, 'estimatedTime': 600, 'keyActions': ['制定计划']},
+        {'name': '本周入门练习', 'type': '周', 'category': '学习', 'description': '每天练习一小时',
+         'deadline': '2030-01-07', 'priority': 2, 'estimatedTime': 60, 'keyActions': ['完成练习']}
+    ]
+}
+INSIGHTS_RESPONSE = {
+    'insights': [
+        {'type': 'efficiency', 'title': '集中处理同类任务', 'description': '同类任务分散在多天',
+         'priority': 'medium', 'actionable': '把同类任务安排在同一时间段'}
+    ]
+}
+
+
+def canned_response(system: str) -> str:
+    """按 system 提示词返回固定的 JSON 结果"""
+    payload = BREAKDOWN_RESPONSE if system == BREAKDOWN_SYSTEM_PROMPT else INSIGHTS_RESPONSE
+    return json.dumps(payload, ensure_ascii=False)
+
+
+class BatchStubState:
+    """模拟服务的内存状态"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.files: Dict[str, bytes] = {}
+        self.batches: Dict[str, Dict] = {}
+
+    def is_done(self, batch: Dict) -> bool:
+        return time.time() - batch['created'] >= self.delay
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def _anthropic_batch(batch: Dict, done: bool, base_url: str) -> Dict:
+    count = len(batch['requests'])
+    return {
+        'id': batch['id'],
+        'type': 'message_batch',
+        'processing_status': 'ended' if done else 'in_progress',
+        'request_counts': {'processing': 0 if done else count, 'succeeded': count if done else 0,
+                           'errored': 0, 'canceled': 0, 'expired': 0},
+        'created_at': _iso(batch['created']),
+        'expires_at': _iso(batch['created'] + 86400),
+        'ended_at': _iso(time.time()) if done else None,
+        'archived_at': None,
+        'cancel_initiated_at': None,
+        'results_url': f"{base_url}/v1/messages/batches/{batch['id']}/results" if done else None
+    }
+
+
+def _anthropic_results(batch: Dict) -> bytes:
+    lines = []
+    for request in batch['requests']:
+        params = request['params']
+        system = "".join(block['text'] for block in params['system']) if isinstance(params['system'], list) else params['system']
+        lines.append(json.dumps({
+            'custom_id': request['custom_id'],
+            'result': {'type': 'succeeded', 'message': {
+                'id': f"msg_{uuid.uuid4().hex[:12]}", 'type': 'message', 'role': 'assistant',
+                'model': params['model'], 'stop_reason': 'end_turn', 'stop_sequence': None,
+                'content': [{'type': 'text', 'text': canned_response(system)}],
+                'usage': {'input_tokens': 100, 'output_tokens': 50}
+            }}
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def _openai_batch(batch: Dict, done: bool) -> Dict:
+    count = len(batch['lines'])
+    return {
+        'id': batch['id'],
+        'object': 'batch',
+        'endpoint': batch['endpoint'],
+        'input_file_id': batch['input_file_id'],
+        'completion_window': '24h',
+        'status': 'completed' if done else 'in_progress',
+        'output_file_id': batch.get('output_file_id') if done else None,
+        'error_file_id': None,
+        'created_at': int(batch['created']),
+        'request_counts': {'total': count, 'completed': count if done else 0, 'failed': 0}
+    }
+
+
+def _openai_output(batch: Dict) -> bytes:
+    lines = []
+    for request in batch['lines']:
+        body = request['body']
+        system = next((m['content'] for m in body['messages'] if m['role'] == 'system'), '')
+        lines.append(json.dumps({
+            'id': f"batch_req_{uuid.uuid4().hex[:12]}",
+            'custom_id': request['custom_id'],
+            'response': {'status_code': 200, 'request_id': uuid.uuid4().hex, 'body': {
+                'id': f"chatcmpl-{uuid.uuid4().hex[:12]}", 'object': 'chat.completion',
+                'created': int(time.time()), 'model': body['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': canned_response(system)}}],
+                'usage': {'prompt_tokens': 100, 'completion_tokens': 50, 'total_tokens': 150}
+            }},
+            'error': None
+        }, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def _parse_multipart(content_type: str, body: bytes) -> Tuple[Dict[str, str], bytes]:
+    """解析文件上传表单，返回 (普通字段, 文件内容)"""
+    message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    fields, content = {}, b''
+    for part in message.get_payload():
+        name = part.get_param('name', header='content-disposition')
+        if part.get_param('filename', header='content-disposition'):
+            content = part.get_payload(decode=True)
+        else:
+            fields[name] = part.get_payload(decode=True).decode('utf-8')
+    return fields, content
+
+
+def make_handler(state: BatchStubState):
+    """创建绑定到给定状态的请求处理类"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _base_url(self) -> str:
+            return f"http://{self.headers.get('Host')}"
+
+        def _send(self, status: int, payload, content_type: str = 'application/json'):
+            body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _not_found(self):
+            self._send(404, {'error': {'type': 'not_found_error', 'message': self.path}})
+
+        def _read_body(self) -> bytes:
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        def do_POST(self):
+            path = self.path.split('?')[0]
+            body = self._read_body()
+            with state.lock:
+                if path == '/v1/messages/batches':
+                    batch = {'id': f"msgbatch_{uuid.uuid4().hex[:16]}", 'created': time.time(),
+                             'requests': json.loads(body)['requests']}
+                    state.batches[batch['id']] = batch
+                    self._send(200, _anthropic_batch(batch, False, self._base_url()))
+                elif path == '/v1/files':
+                    fields, content = _parse_multipart(self.headers.get('Content-Type', ''), body)
+                    file_id = f"file-{uuid.uuid4().hex[:16]}"
+                    state.files[file_id] = content
+                    self._send(200, {'id': file_id, 'object': 'file', 'bytes': len(content),
+                                     'created_at': int(time.time()), 'filename': 'batch_input.jsonl',
+                                     'purpose': fields.get('purpose', 'batch'), 'status': 'processed'})
+                elif path == '/v1/batches':
+                    params = json.loads(body)
+                    content = state.files.get(params['input_file_id'])
+                    if content is None:
+                        return self._not_found()
+                    batch = {'id': f"batch_{uuid.uuid4().hex[:16]}", 'created': time.time(),
+                             'endpoint': params['endpoint'], 'input_file_id': params['input_file_id'],
+                             'lines': [json.loads(line) for line in content.decode('utf-8').splitlines() if line.strip()]}
+                    state.batches[batch['id']] = batch
+                    self._send(200, _openai_batch(batch, False))
+                else:
+                    self._not_found()
+
+        def do_GET(self):
+            parts = self.path.split('?')[0].strip('/').split('/')
+            with state.lock:
+                if parts[:3] == ['v1', 'messages', 'batches'] and len(parts) in (4, 5):
+                    batch = state.batches.get(parts[3])
+                    if batch is None:
+                        return self._not_found()
+                    done = state.is_done(batch)
+                    if len(parts) == 4:
+                        self._send(200, _anthropic_batch(batch, done, self._base_url()))
+                    elif done and parts[4] == 'results':
+                        self._send(200, _anthropic_results(batch), 'application/binary')
+                    else:
+                        self._not_found()
+                elif parts[:2] == ['v1', 'batches'] and len(parts) == 3:
+                    batch = state.batches.get(parts[2])
+                    if batch is None:
+                        return self._not_found()
+                    done = state.is_done(batch)
+                    if done and 'output_file_id' not in batch:
+                        batch['output_file_id'] = f"file-{uuid.uuid4().hex[:16]}"
+                        state.files[batch['output_file_id']] = _openai_output(batch)
+                    self._send(200, _openai_batch(batch, done))
+                elif parts[:2] == ['v1', 'files'] and len(parts) == 4 and parts[3] == 'content':
+                    content = state.files.get(parts[2])
+                    if content is None:
+                        return self._not_found()
+                    self._send(200, content, 'application/octet-stream')
+                else:
+                    self._not_found()
+
+    return Handler
+
+
+def start_server(port: int = 0, delay: float = 0.0) -> ThreadingHTTPServer:
+    """在后台线程启动模拟服务并返回服务器对象，port=0 时自动选择端口"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(BatchStubState(delay)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(port: int, delay: float):
+    """前台运行模拟服务，直到 Ctrl+C"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(BatchStubState(delay)))
+    print(f"批量接口模拟服务: http://127.0.0.1:{port}（批次 {delay:g} 秒后完成）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,156 @@
+"""
+批量日程导出
+
+为多个数据文件（每人一个 goal_planner_data.json）生成 N 日日程并导出 .ics，不启动 Streamlit。
+文件分发到进程池并行处理，每完成一个文件输出一行进度和耗时，最后汇总最慢的文件。
+
+命令行用法：
+    python -m goal_planner.bulk_export team/ alice.json [--days 7] [--start YYYY-MM-DD]
+                                      [--out DIR] [--workers N] [--save]
+
+目录按 --pattern（默认 goal_planner_data.json，不会误选同目录的批量任务队列等其他 JSON 文件）递归查找；
+.ics 默认写在数据文件旁边，指定 --out 时按相对目录结构写入该目录。
+--save 会把生成的日程写回数据文件，界面下次刷新时可见。
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from goal_planner.date_index import parse_date
+from goal_planner.scheduler import generate_weekly_schedule, iter_icalendar
+from goal_planner.state import PlannerState
+from goal_planner.storage import DATA_FILE, load_state, save_state
+
+SLOWEST_SHOWN = 5                 # 汇总中列出的最慢文件数
+
+
+def find_data_files(paths: List[str], pattern: str = DATA_FILE) -> Iterator[Dict[str, str]]:
+    """展开文件和目录参数，返回 {'path', 'relative'}；relative 用于在输出目录中保留目录结构"""
+    seen = set()
+    for arg in paths:
+        root = Path(arg)
+        if root.is_dir():
+            files = sorted(p for p in root.rglob(pattern) if p.is_file())
+            base = root
+        else:
+            files = [root]
+            base = root.parent
+        for path in files:
+            resolved = path.resolve()
+            if resolved in seen:
+                continue
+            seen.add(resolved)
+            yield {'path': str(path), 'relative': str(path.relative_to(base))}
+
+
+def ics_path(job: Dict[str, str], out_dir: Optional[str]) -> str:
+    """数据文件对应的 .ics 路径"""
+    if out_dir is None:
+        return str(Path(job['path']).with_suffix('.ics'))
+    return str(Path(out_dir, job['relative']).with_suffix('.ics'))
+
+
+def export_file(job: Dict) -> Dict:
+    """处理单个数据文件：加载、生成日程、写出 .ics，可选写回数据文件；在工作进程中执行"""
+    result = {'path': job['path'], 'ics': job['ics'], 'error': None}
+    timings = {}
+    try:
+        started = time.perf_counter()
+        state = PlannerState()
+        if not load_state(state, job['path']):
+            raise ValueError("文件不存在")
+        timings['load'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        start = date.fromisoformat(job['start']) if job['start'] else None
+        schedule = generate_weekly_schedule(state, start, job['days'])
+        timings['schedule'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        os.makedirs(os.path.dirname(job['ics']) or '.', exist_ok=True)
+        with open(job['ics'], 'w', encoding='utf-8') as f:
+            f.writelines(line + "\n" for line in iter_icalendar(schedule.items()))
+        if job['save']:
+            save_state(state, job['path'])
+        timings['export'] = time.perf_counter() - started
+
+        result['tasks'] = len(state.tasks) + len(state.weekly_tasks)
+        result['events'] = sum(len(items) for items in schedule.values())
+    except Exception as e:
+        result['error'] = str(e)
+    result['ms'] = {name: round(seconds * 1000, 1) for name, seconds in timings.items()}
+    result['total_ms'] = round(sum(timings.values()) * 1000, 1)
+    return result
+
+
+def run_exports(jobs: List[Dict], workers: int = 0) -> Iterator[Dict]:
+    """按完成顺序产出各文件的结果；workers 为 1 时在当前进程中依次处理"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        for job in jobs:
+            yield export_file(job)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = [executor.submit(export_file, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _format_result(index: int, total: int, result: Dict) -> str:
+    if result['error']:
+        return f"[{index}/{total}] ❌ {result['path']}: {result['error']}"
+    stages = ' · '.join(f"{name} {ms:g}" for name, ms in result['ms'].items())
+    return (f"[{index}/{total}] ✅ {result['path']} → {result['ics']}  "
+            f"{result['tasks']} 个任务 · {result['events']} 个事件 · {result['total_ms']:g} ms（{stages}）")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m goal_planner.bulk_export',
+                                     description='为多个数据文件批量生成日程并导出 iCalendar')
+    parser.add_argument('paths', nargs='+', help='数据文件或目录')
+    parser.add_argument('--pattern', default=DATA_FILE, help='在目录中查找数据文件的模式，如 *.json')
+    parser.add_argument('--days', type=int, default=7, help='生成的天数')
+    parser.add_argument('--start', help='起始日期 YYYY-MM-DD，默认今天')
+    parser.add_argument('--out', help='.ics 输出目录，默认写在数据文件旁边')
+    parser.add_argument('--workers', type=int, default=0, help='进程数，默认 CPU 核数；1 表示不使用进程池')
+    parser.add_argument('--save', action='store_true', help='把生成的日程写回数据文件')
+    args = parser.parse_args(argv)
+
+    if args.start and parse_date(args.start) is None:
+        parser.error(f"--start 应为 YYYY-MM-DD: {args.start}")
+    if args.days < 1:
+        parser.error("--days 应为正整数")
+
+    jobs = [
+        {**job, 'ics': ics_path(job, args.out), 'start': args.start, 'days': args.days, 'save': args.save}
+        for job in find_data_files(args.paths, args.pattern)
+    ]
+    if not jobs:
+        print("没有找到数据文件", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    results = []
+    for index, result in enumerate(run_exports(jobs, args.workers), 1):
+        results.append(result)
+        print(_format_result(index, len(jobs), result), flush=True)
+    elapsed = time.perf_counter() - started
+
+    failed = [r for r in results if r['error']]
+    busy = sum(r['total_ms'] for r in results) / 1000
+    print(f"\n完成 {len(results) - len(failed)} 个，失败 {len(failed)} 个；"
+          f"耗时 {elapsed:.2f} 秒（各文件合计 {busy:.2f} 秒）")
+    slowest = sorted((r for r in results if not r['error']), key=lambda r: r['total_ms'], reverse=True)
+    for result in slowest[:SLOWEST_SHOWN]:
+        print(f"  {result['total_ms']:>8g} ms  {result['path']}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
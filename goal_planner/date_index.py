@@ -0,0 +1,93 @@
+"""
+计划日期索引
+
+把待办任务和周任务按计划日期排成有序列表，日期只在加入索引时解析一次；
+日期范围查询用二分查找定位，供七日日程、本周待办摘要和仪表板共用。
+"""
+
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import List, Dict, Hashable, Optional, Sequence, Tuple
+
+from goal_planner.stats import TASK_KINDS
+
+
+def parse_date(value: str) -> Optional[date]:
+    """解析 ISO 日期（可带时间部分），无效时返回 None"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def days_until(value: str, today: date) -> Optional[int]:
+    """距日期还有多少天（已过去为负数），无效日期返回 None"""
+    day = parse_date(value)
+    return None if day is None else (day - today).days
+
+
+class DateIndex:
+    """按计划日期排序的待办任务索引，已完成或没有有效日期的任务不在索引中"""
+
+    def __init__(self):
+        self.rebuild({})
+
+    def rebuild(self, data: Dict[str, List[Dict]]):
+        """按完整数据重建索引"""
+        self._keys: List[Tuple[int, int]] = []              # (日期序数, 加入序号)，有序
+        self._entries: List[Tuple[str, Dict]] = []          # 与 _keys 一一对应的 (类型, 任务)
+        self._positions: Dict[Tuple[str, Hashable], Tuple[int, int]] = {}
+        self._seq = 0
+        for kind in TASK_KINDS:
+            for task in data.get(kind, []):
+                self.add(kind, task)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, kind: str, task: Dict):
+        """加入一条任务（未完成且日期有效时）"""
+        if task.get('completed'):
+            return
+        day = parse_date(task.get('scheduledDate', ''))
+        if day is None:
+            return
+        key = (day.toordinal(), self._seq)
+        self._seq += 1
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._entries.insert(position, (kind, task))
+        self._positions[(kind, task['id'])] = key
+
+    def remove(self, kind: str, task: Dict):
+        """移出一条任务"""
+        key = self._positions.pop((kind, task['id']), None)
+        if key is None:
+            return
+        position = bisect_left(self._keys, key)
+        del self._keys[position]
+        del self._entries[position]
+
+    def between(self, start: date, end: date, kinds: Sequence[str] = TASK_KINDS) -> List[Dict]:
+        """计划日期在 [start, end] 内的任务，按日期排序，同一天内保持加入顺序"""
+        low = bisect_left(self._keys, (start.toordinal(), -1))
+        high = bisect_left(self._keys, (end.toordinal() + 1, -1))
+        return [task for kind, task in self._entries[low:high] if kind in kinds]
+
+    def by_day(self, start: date, days: int, kinds: Sequence[str] = TASK_KINDS) -> Dict[str, List[Dict]]:
+        """从 start 起连续 days 天每天的任务；同一天内按 kinds 的顺序排列"""
+        result = {(start + timedelta(days=i)).isoformat(): [] for i in range(days)}
+        low = bisect_left(self._keys, (start.toordinal(), -1))
+        high = bisect_left(self._keys, (start.toordinal() + days, -1))
+        for kind in kinds:
+            for (ordinal, _), (entry_kind, task) in zip(self._keys[low:high], self._entries[low:high]):
+                if entry_kind == kind:
+                    result[date.fromordinal(ordinal).isoformat()].append(task)
+        return result
+
+    def count_between(self, start: date, end: date) -> int:
+        """计划日期在 [start, end] 内的任务数"""
+        return (bisect_left(self._keys, (end.toordinal() + 1, -1))
+                - bisect_left(self._keys, (start.toordinal(), -1)))
@@ -0,0 +1,293 @@
+"""
+近似重复任务检测
+
+任务名先做归一化（全半角、大小写、空白与标点），再按字符二元组计算 MinHash 签名，
+通过 LSH 分桶找出候选对，最后用 Jaccard 相似度确认。字符二元组不依赖分词，适合中文。
+索引按 (键, 名称) 增量维护，相同的归一化名称共用一份签名。
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+DEDUP_BANDS = 16                # LSH 分桶数
+DEDUP_ROWS = 4                  # 每个桶的签名行数，16×4 约在 Jaccard 0.5 处开始成为候选
+DEDUP_THRESHOLD = 0.6           # Jaccard 相似度不低于该值视为重复
+DEDUP_ESTIMATE_MARGIN = 0.1     # 签名估计值低于阈值减该值的候选不再精确计算
+DEDUP_BUCKET_LIMIT = 16         # 同桶内每个名称最多与排序后相邻的多少个名称比较，避免退化为两两比较
+DEDUP_BULK_SIZE = 64            # 一次新增超过该数量时改用排序分组查找候选
+DEDUP_CHUNK = 4096              # 批量计算签名时每次处理的名称数，限制内存占用
+
+_NON_ALNUM = re.compile(r'[\W_]+')
+# MinHash 使用 multiply-shift 哈希族：(a·x + b) mod 2^64 取高 32 位，a 为奇数
+_rng = np.random.default_rng(20240601)
+_PERM_A = (_rng.integers(0, 1 << 63, DEDUP_BANDS * DEDUP_ROWS, dtype=np.uint64) | np.uint64(1))[:, None]
+_PERM_B = _rng.integers(0, 1 << 63, DEDUP_BANDS * DEDUP_ROWS, dtype=np.uint64)[:, None]
+
+
+@lru_cache(maxsize=1 << 17)
+def normalize_name(name: str) -> str:
+    """归一化任务名：全角转半角、转小写、去掉空白和标点"""
+    return _NON_ALNUM.sub('', unicodedata.normalize('NFKC', name).lower())
+
+
+@lru_cache(maxsize=1 << 16)
+def shingles(text: str) -> frozenset:
+    """字符二元组集合，单字文本取该字本身"""
+    if len(text) <= 1:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    """Jaccard 相似度"""
+    common = len(a & b)
+    return common / (len(a) + len(b) - common) if a or b else 0.0
+
+
+def minhash_signatures(norms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """批量计算归一化名称的 MinHash 签名，返回 (签名矩阵, LSH 各桶哈希矩阵)
+
+    字符二元组直接由相邻两个码位拼成 64 位整数，整个过程在 numpy 中完成。
+    """
+    signatures = np.empty((len(norms), DEDUP_BANDS * DEDUP_ROWS), dtype=np.uint32)
+    for start in range(0, len(norms), DEDUP_CHUNK):
+        chunk = norms[start:start + DEDUP_CHUNK]
+        codes = np.frombuffer("".join(chunk).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        lengths = np.array([len(norm) for norm in chunk])
+        firsts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        # 位置 p 的 n-gram 为 (codes[p], codes[p+1])，每个名称的最后一位不构成 n-gram；单字名称取该字本身
+        keys = np.append(codes[:-1] << np.uint64(21) | codes[1:], np.uint64(0))
+        valid = np.ones(len(codes), dtype=bool)
+        valid[firsts + lengths - 1] = False
+        single = firsts[lengths == 1]
+        keys[single] = codes[single]
+        valid[single] = True
+        offsets = np.concatenate([[0], np.cumsum(np.maximum(lengths - 1, 1))[:-1]])
+        permuted = (_PERM_A * keys[valid][None, :] + _PERM_B) >> np.uint64(32)
+        signatures[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    rows = signatures.astype(np.uint64).reshape(len(norms), DEDUP_BANDS, DEDUP_ROWS)
+    bands = rows[:, :, 0].copy()
+    for row in range(1, DEDUP_ROWS):
+        bands = bands * np.uint64(1000003) ^ rows[:, :, row]
+    return signatures, bands
+
+
+class DuplicateIndex:
+    """近似重复名称的增量索引，签名与分桶哈希按行存放在 numpy 数组中"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self._items: Dict[Hashable, Tuple[str, str]] = {}     # 键 → (原名称, 归一化名称)
+        self._members: Dict[str, Set[Hashable]] = {}          # 归一化名称 → 键
+        self._rows: Dict[str, int] = {}                       # 归一化名称 → 签名行（签名缓存）
+        self._norms: List[Optional[str]] = []                 # 签名行 → 归一化名称，空行为 None
+        self._free: List[int] = []
+        self._signatures = np.zeros((0, DEDUP_BANDS * DEDUP_ROWS), dtype=np.uint32)
+        self._bands = np.zeros((0, DEDUP_BANDS), dtype=np.uint64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._similar: Dict[str, Set[str]] = {}               # 已确认相似的归一化名称
+        self._clusters: Optional[List[Dict]] = None           # 重复簇缓存，索引变化时失效
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add_many(self, items: Iterable[Tuple[Hashable, str]]):
+        """添加或更新多条 (键, 名称)，新出现的归一化名称批量计算签名"""
+        new_norms = []
+        for key, name in items:
+            current = self._items.get(key)
+            if current is not None and current[0] == name:
+                continue
+            norm = normalize_name(name)
+            self._clusters = None
+            if current is not None:
+                if current[1] == norm:
+                    self._items[key] = (name, norm)
+                    continue
+                self.remove(key)
+            self._items[key] = (name, norm)
+            if not norm:
+                continue
+            if norm not in self._members:
+                self._members[norm] = set()
+                new_norms.append(norm)
+            self._members[norm].add(key)
+        if new_norms:
+            self._insert(new_norms)
+
+    def add(self, key: Hashable, name: str):
+        """添加或更新一条记录"""
+        self.add_many([(key, name)])
+
+    def remove(self, key: Hashable):
+        """删除一条记录，归一化名称不再被引用时释放其签名行"""
+        current = self._items.pop(key, None)
+        if current is None:
+            return
+        self._clusters = None
+        if not current[1]:
+            return
+        norm = current[1]
+        members = self._members[norm]
+        members.discard(key)
+        if members:
+            return
+        del self._members[norm]
+        row = self._rows.pop(norm)
+        self._norms[row] = None
+        self._alive[row] = False
+        self._free.append(row)
+        for other in self._similar.pop(norm, ()):
+            self._similar[other].discard(norm)
+            if not self._similar[other]:
+                del self._similar[other]
+
+    def sync(self, items: Iterable[Tuple[Hashable, str]]):
+        """与当前记录对齐：只处理新增、改名和删除的部分"""
+        items = list(items)
+        keys = {key for key, _ in items}
+        for key in [k for k in self._items if k not in keys]:
+            self.remove(key)
+        self.add_many(items)
+
+    def _allocate(self, count: int) -> np.ndarray:
+        """分配签名行，优先复用已释放的行，不够时成倍扩容"""
+        reused = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        start = len(self._norms)
+        fresh = list(range(start, start + count - len(reused)))
+        if fresh:
+            self._norms.extend([None] * len(fresh))
+            if len(self._norms) > len(self._alive):
+                capacity = max(len(self._norms), 2 * len(self._alive), 1024)
+                extra = capacity - len(self._alive)
+                self._signatures = np.vstack([self._signatures, np.zeros((extra, self._signatures.shape[1]), np.uint32)])
+                self._bands = np.vstack([self._bands, np.zeros((extra, DEDUP_BANDS), np.uint64)])
+                self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        return np.array(reused + fresh, dtype=np.int64)
+
+    def _insert(self, norms: List[str]):
+        """写入新名称的签名，并找出与其相似的已有名称"""
+        signatures, bands = minhash_signatures(norms)
+        rows = self._allocate(len(norms))
+        self._signatures[rows] = signatures
+        self._bands[rows] = bands
+        self._alive[rows] = True
+        for norm, row in zip(norms, rows.tolist()):
+            self._norms[row] = norm
+            self._rows[norm] = row
+
+        left, right = self._candidate_pairs(rows)
+        if not len(left):
+            return
+        # 先用签名估计相似度筛掉大部分候选，再精确计算 Jaccard
+        keep = []
+        for start in range(0, len(left), 1 << 16):
+            a, b = left[start:start + (1 << 16)], right[start:start + (1 << 16)]
+            estimate = (self._signatures[a] == self._signatures[b]).mean(axis=1)
+            keep.append(estimate >= self.threshold - DEDUP_ESTIMATE_MARGIN)
+        keep = np.concatenate(keep)
+        for a, b in zip(left[keep].tolist(), right[keep].tolist()):
+            norm_a, norm_b = self._norms[a], self._norms[b]
+            if jaccard(shingles(norm_a), shingles(norm_b)) >= self.threshold:
+                self._similar.setdefault(norm_a, set()).add(norm_b)
+                self._similar.setdefault(norm_b, set()).add(norm_a)
+
+    def _candidate_pairs(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """LSH 候选对：至少在一个桶内哈希相同，且至少一方是新行"""
+        size = len(self._norms)
+        if len(rows) <= DEDUP_BULK_SIZE:
+            # 少量新增：逐行与全部签名比较分桶哈希
+            pairs = []
+            for row in rows.tolist():
+                match = (self._bands[:size] == self._bands[row]).any(axis=1) & self._alive[:size]
+                match[row] = False
+                others = np.flatnonzero(match)
+                pairs.append(np.stack([np.full(len(others), row), others]))
+            pairs = np.concatenate(pairs, axis=1)
+        else:
+            # 大量新增：每个桶按哈希排序，只比较排序后相邻的若干行
+            alive = np.flatnonzero(self._alive[:size])
+            is_new = np.zeros(size, dtype=bool)
+            is_new[rows] = True
+            pairs = []
+            for band in range(DEDUP_BANDS):
+                order = alive[np.argsort(self._bands[alive, band], kind='stable')]
+                values = self._bands[order, band]
+                for offset in range(1, DEDUP_BUCKET_LIMIT + 1):
+                    same = values[:-offset] == values[offset:]
+                    if not same.any():
+                        break
+                    a, b = order[:-offset][same], order[offset:][same]
+                    touched = is_new[a] | is_new[b]
+                    pairs.append(np.stack([a[touched], b[touched]]))
+            if not pairs:
+                return np.zeros(0, np.int64), np.zeros(0, np.int64)
+            pairs = np.concatenate(pairs, axis=1)
+        if not pairs.shape[1]:
+            return pairs[0], pairs[1]
+        codes = np.sort(np.minimum(pairs[0], pairs[1]) * size + np.maximum(pairs[0], pairs[1]))
+        codes = codes[np.concatenate([[True], codes[1:] != codes[:-1]])]
+        return codes // size, codes % size
+
+    def clusters(self, min_size: int = 2) -> List[Dict]:
+        """返回重复簇（按记录数从多到少），每簇包含各名称和对应的键"""
+        if self._clusters is None:
+            self._clusters = self._build_clusters()
+        return [c for c in self._clusters if c['count'] >= min_size]
+
+    def _build_clusters(self) -> List[Dict]:
+        """用并查集合并相似名称，相同归一化名称的多条记录本身也构成一簇"""
+        parent: Dict[str, str] = {}
+
+        def find(norm: str) -> str:
+            while parent[norm] != norm:
+                parent[norm] = parent[parent[norm]]
+                norm = parent[norm]
+            return norm
+
+        for norm, others in self._similar.items():
+            parent.setdefault(norm, norm)
+            for other in others:
+                parent.setdefault(other, other)
+                root_a, root_b = find(norm), find(other)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+        for norm, members in self._members.items():
+            if len(members) > 1:
+                parent.setdefault(norm, norm)
+
+        groups: Dict[str, List[str]] = {}
+        for norm in parent:
+            groups.setdefault(find(norm), []).append(norm)
+
+        result = []
+        for norms in groups.values():
+            keys = [key for norm in norms for key in self._members[norm]]
+            norms.sort(key=lambda n: -len(self._members[n]))
+            result.append({
+                'names': [self._items[next(iter(self._members[norm]))][0] for norm in norms],
+                'keys': keys,
+                'count': len(keys)
+            })
+        result.sort(key=lambda c: -c['count'])
+        return result
+
+
+def duplicate_insights(index: DuplicateIndex, limit: int = 3) -> List[Dict]:
+    """把最大的几个重复簇转换为洞察"""
+    insights = []
+    for cluster in index.clusters()[:limit]:
+        names = "」「".join(cluster['names'][:3])
+        more = ' 等' if len(cluster['names']) > 3 else ''
+        insights.append({
+            'type': 'automation',
+            'title': f"发现重复任务：{cluster['names'][0]}",
+            'description': f"「{names}」{more}共 {cluster['count']} 个任务内容相近，建议创建模板或自动化流程",
+            'priority': 'high' if cluster['count'] >= 3 else 'medium',
+            'actionable': '合并为一个任务，或把它设为周期性任务 / 日常活动，避免每次手动创建'
+        })
+    return insights
@@ -0,0 +1,113 @@
+"""
+目标层级树
+
+按 parentGoalId 建立父目标 → 子目标的邻接表，并一次性算出每个节点的子树规模、子树平均进度和
+从顶层到该节点的路径。目标数据变化（增删、改父目标或进度、换成新的目标字典）后才需要重建，页面展开节点时只读取邻接表。
+"""
+
+from typing import Any, List, Dict, Hashable, Optional, Tuple
+
+
+def tree_signature(goals: List[Dict]) -> int:
+    """用于判断是否需要重建的哈希：树结构和进度汇总所用的字段，以及每个目标字典的身份
+
+    页面显示和编辑的是 by_id 中的字典，原地修改名称等字段时无需重建；
+    编辑或其他会话保存换成了新字典时身份变化，重建后页面读取的才是新数据。
+    """
+    return hash(tuple((id(g), g['id'], g.get('parentGoalId'), g.get('progress', 0)) for g in goals))
+
+
+class GoalTree:
+    """目标层级树；父目标不存在的目标（含父目标已删除的）视为顶层目标"""
+
+    def __init__(self, goals: Optional[List[Dict]] = None):
+        self.rebuild(goals or [])
+
+    def rebuild(self, goals: List[Dict]):
+        """按完整目标列表重建邻接表和子树汇总"""
+        self.signature = tree_signature(goals)
+        self.by_id: Dict[Hashable, Dict] = {g['id']: g for g in goals}
+        self._children: Dict[Optional[Hashable], List[Hashable]] = {None: []}
+        self._parent: Dict[Hashable, Optional[Hashable]] = {}
+        for goal in goals:
+            parent = goal.get('parentGoalId')
+            if parent not in self.by_id or parent == goal['id']:
+                parent = None
+            self._parent[goal['id']] = parent
+            self._children.setdefault(parent, []).append(goal['id'])
+
+        # 从顶层广度优先遍历得到深度和遍历顺序；成环的目标不可从顶层到达，把它们当作顶层重新挂上
+        order, depth = self._walk(self._children[None])
+        for goal_id in self.by_id:
+            if goal_id not in depth:
+                self._children[self._parent[goal_id]].remove(goal_id)
+                self._parent[goal_id] = None
+                self._children[None].append(goal_id)
+                more, more_depth = self._walk([goal_id], depth)
+                order.extend(more)
+                depth.update(more_depth)
+        self.depth = depth
+
+        # 逆序累加即为后序：子树规模（含自身）和子树进度之和
+        self.subtree_size: Dict[Hashable, int] = {}
+        self._progress_sum: Dict[Hashable, float] = {}
+        for goal_id in reversed(order):
+            size = 1
+            total = float(self.by_id[goal_id].get('progress', 0))
+            for child in self._children.get(goal_id, ()):
+                size += self.subtree_size[child]
+                total += self._progress_sum[child]
+            self.subtree_size[goal_id] = size
+            self._progress_sum[goal_id] = total
+
+    def _walk(self, roots: List[Hashable], seen: Optional[Dict[Hashable, int]] = None) -> Tuple[List[Hashable], Dict[Hashable, int]]:
+        seen = seen or {}
+        order: List[Hashable] = []
+        depth: Dict[Hashable, int] = {}
+        frontier = [(goal_id, 0) for goal_id in roots]
+        while frontier:
+            next_frontier = []
+            for goal_id, level in frontier:
+                if goal_id in depth or goal_id in seen:
+                    continue
+                depth[goal_id] = level
+                order.append(goal_id)
+                next_frontier.extend((child, level + 1) for child in self._children.get(goal_id, ()))
+            frontier = next_frontier
+        return order, depth
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def roots(self) -> List[Dict]:
+        """顶层目标"""
+        return [self.by_id[goal_id] for goal_id in self._children[None]]
+
+    def children(self, goal_id: Any) -> List[Dict]:
+        """直接子目标"""
+        return [self.by_id[child] for child in self._children.get(goal_id, ())]
+
+    def child_count(self, goal_id: Any) -> int:
+        return len(self._children.get(goal_id, ()))
+
+    def descendant_count(self, goal_id: Any) -> int:
+        """所有后代目标数（不含自身）"""
+        return self.subtree_size.get(goal_id, 1) - 1
+
+    def subtree_progress(self, goal_id: Any) -> float:
+        """子树（含自身）的平均进度"""
+        size = self.subtree_size.get(goal_id)
+        return self._progress_sum[goal_id] / size if size else 0.0
+
+    def path(self, goal_id: Any) -> List[Hashable]:
+        """从顶层目标到该目标的 ID 路径"""
+        path = []
+        while goal_id is not None and goal_id in self.by_id:
+            path.append(goal_id)
+            goal_id = self._parent[goal_id]
+        path.reverse()
+        return path
+
+    def position(self, goal_id: Any) -> int:
+        """在兄弟目标中的位置，用于跳转时定位分页"""
+        return self._children[self._parent[goal_id]].index(goal_id)
@@ -0,0 +1,235 @@
+"""
+基础洞察规则引擎
+
+每条规则声明自己需要的聚合量，引擎把所有规则用到的聚合量合并后对目标、任务、周任务和日常活动
+各遍历一次，再依次求值规则。新增规则只需注册聚合量和规则，不会增加额外的数据扫描。
+"""
+
+from datetime import date
+from typing import Any, Callable, List, Dict, Optional, Tuple
+
+from goal_planner.date_index import days_until
+from goal_planner.dedup import duplicate_insights
+
+DAY_MINUTES = 960                 # 每天可安排的分钟数（8:00-24:00）
+MEETING_LIMIT = 3                 # 会议数超过该值提示会议密集
+DEADLINE_RISK_DAYS = 7            # 截止日期在该天数内的目标参与风险检查
+DEADLINE_RISK_PROGRESS = 70       # 临近截止但进度低于该值视为有风险
+IDLE_GOAL_DAYS = 14               # 创建超过该天数仍无任务推进的目标视为停滞
+CATEGORY_MIN_MINUTES = 120        # 待办任务总时长达到该值才检查分类失衡
+CATEGORY_MAX_SHARE = 0.7          # 单一分类占待办时长超过该比例视为失衡
+
+
+class Aggregate:
+    """在一次遍历中累计的聚合量：step(当前值, 记录, 数据源) 返回新值"""
+
+    def __init__(self, sources: Tuple[str, ...], initial: Callable[[], Any],
+                 step: Callable[[Any, Dict, str], Any]):
+        self.sources = sources
+        self.initial = initial
+        self.step = step
+
+
+class InsightRule:
+    """洞察规则：needs 为所需聚合量名称，evaluate(聚合值, 上下文) 返回洞察列表"""
+
+    def __init__(self, name: str, needs: Tuple[str, ...],
+                 evaluate: Callable[[Dict[str, Any], Dict], List[Dict]]):
+        self.name = name
+        self.needs = needs
+        self.evaluate = evaluate
+
+
+def _is_open(item: Dict) -> bool:
+    return not item.get('completed')
+
+
+def _append(acc: List, value) -> List:
+    acc.append(value)
+    return acc
+
+
+def _add(acc: set, value) -> set:
+    acc.add(value)
+    return acc
+
+
+def _add_minutes(acc: Dict[str, int], item: Dict) -> Dict[str, int]:
+    category = item.get('category') or '未分类'
+    acc[category] = acc.get(category, 0) + item.get('estimatedTime', 0)
+    return acc
+
+
+AGGREGATES: Dict[str, Aggregate] = {
+    'task_names': Aggregate(('tasks', 'weekly_tasks'), list,
+                            lambda acc, t, source: _append(acc, ((source, t['id']), t['name']))),
+    'task_minutes': Aggregate(('tasks',), int, lambda acc, t, source: acc + t.get('estimatedTime', 0)),
+    'activity_minutes': Aggregate(('activities',), int, lambda acc, a, source: acc + a.get('duration', 0)),
+    'meeting_count': Aggregate(('tasks',), int, lambda acc, t, source: acc + (t.get('category') == '会议')),
+    'open_goals': Aggregate(('goals',), list,
+                            lambda acc, g, source: _append(acc, g) if g.get('progress', 0) < 100 else acc),
+    'parent_goal_ids': Aggregate(('goals',), set,
+                                 lambda acc, g, source: _add(acc, g['parentGoalId']) if g.get('parentGoalId') else acc),
+    'active_goal_ids': Aggregate(('tasks', 'weekly_tasks'), set,
+                                 lambda acc, t, source: _add(acc, t['goalId']) if t.get('goalId') and _is_open(t) else acc),
+    'open_task_dates': Aggregate(('tasks', 'weekly_tasks'), list,
+                                 lambda acc, t, source: _append(acc, t.get('scheduledDate', '')) if _is_open(t) else acc),
+    'open_category_minutes': Aggregate(('tasks', 'weekly_tasks'), dict,
+                                       lambda acc, t, source: _add_minutes(acc, t) if _is_open(t) else acc),
+}
+
+
+# 规则
+def _duplicate_rule(values: Dict[str, Any], context: Dict) -> List[Dict]:
+    """近似重复任务：只同步自上次以来新增、改名和删除的任务"""
+    index = context.get('duplicate_index')
+    if index is None:
+        return []
+    index.sync(values['task_names'])
+    return duplicate_insights(index)
+
+
+def _overload_rule(values: Dict[str, Any], context: Dict) -> List[Dict]:
+    total_task_time = values['task_minutes']
+    available_time = DAY_MINUTES - values['activity_minutes']
+    if total_task_time <= available_time:
+        return []
+    return [{
+        'type': 'warning',
+        'title': '任务时间超载',
+        'description': f'今日任务需要 {total_task_time//60} 小时，但只有 {available_time//60} 小时可用。建议重新评估优先级',
+        'priority': 'high'
+    }]
+
+
+def _meeting_rule(values: Dict[str, Any], context: Dict) -> List[Dict]:
+    if values['meeting_count'] <= MEETING_LIMIT:
+        return []
+    return [{
+        'type': 'efficiency',
+        'title': '会议密集',
+        'description': '今日会议较多，建议合并相关会议或改用异步沟通',
+        'priority': 'medium'
+    }]
+
+
+def _deadline_risk_rule(values: Dict[str, Any], context: Dict) -> List[Dict]:
+    today = context['today']
+    at_risk = []
+    for goal in values['open_goals']:
+        days = days_until(goal.get('deadline', ''), today)
+        if days is not None and days <= DEADLINE_RISK_DAYS and goal.get('progress', 0) < DEADLINE_RISK_PROGRESS:
+            at_risk.append((days, goal))
+    overdue = sum(1 for d in values['open_task_dates'] if (days_until(d, today) or 0) < 0)
+
+    insights = []
+    if at_risk:
+        at_risk.sort(key=lambda x: x[0])
+        names = "、".join(f"「{g['name']}」" for _, g in at_risk[:3])
+        insights.append({
+            'type': 'warning',
+            'title': '目标截止风险',
+            'description': f"{names}等 {len(at_risk)} 个目标将在 {DEADLINE_RISK_DAYS} 天内到期（或已过期），但进度不足 {DEADLINE_RISK_PROGRESS}%",
+            'priority': 'high',
+            'actionable': '优先为这些目标安排任务，或调整截止日期和范围'
+        })
+    if overdue:
+        insights.append({
+            'type': 'warning',
+            'title': '任务已逾期',
+            'description': f'有 {overdue} 个未完成任务已超过计划日期',
+            'priority': 'high' if overdue >= 3 else 'medium',
+            'actionable': '重新安排日期，或拆分、删除不再需要的任务'
+        })
+    return insights
+
+
+def _idle_goal_rule(values: Dict[str, Any], context: Dict) -> List[Dict]:
+    today = context['today']
+    busy = values['parent_goal_ids'] | values['active_goal_ids']
+    idle = [
+        g for g in values['open_goals']
+        if g['id'] not in busy and (days_until(g.get('createdAt', '')[:10], today) or 0) <= -IDLE_GOAL_DAYS
+    ]
+    if not idle:
+        return []
+    names = "、".join(f"「{g['name']}」" for g in idle[:3])
+    return [{
+        'type': 'warning',
+        'title': '目标停滞',
+        'description': f'{names}等 {len(idle)} 个目标创建已超过 {IDLE_GOAL_DAYS} 天，但没有子目标或待办任务',
+        'priority': 'medium',
+        'actionable': '使用 AI 分解这些目标，或为其添加下一步任务'
+    }]
+
+
+def _category_imbalance_rule(values: Dict[str, Any], context: Dict) -> List[Dict]:
+    minutes = values['open_category_minutes']
+    total = sum(minutes.values())
+    if total < CATEGORY_MIN_MINUTES:
+        return []
+    category, top = max(minutes.items(), key=lambda x: x[1])
+    if top / total <= CATEGORY_MAX_SHARE:
+        return []
+    neglected = sorted({g.get('category') for g in values['open_goals'] if g.get('category')} - set(minutes))
+    description = f'待办任务中「{category}」占 {top / total:.0%} 的时间'
+    if neglected:
+        description += f"，而「{'」「'.join(neglected[:3])}」类目标没有待办任务"
+    return [{
+        'type': 'efficiency',
+        'title': '任务分类失衡',
+        'description': description,
+        'priority': 'medium' if neglected else 'low',
+        'actionable': '为被忽略的目标安排少量固定时间，保持各方面均衡推进'
+    }]
+
+
+INSIGHT_RULES: List[InsightRule] = [
+    InsightRule('duplicates', ('task_names',), _duplicate_rule),
+    InsightRule('overload', ('task_minutes', 'activity_minutes'), _overload_rule),
+    InsightRule('meetings', ('meeting_count',), _meeting_rule),
+    InsightRule('deadline_risk', ('open_goals', 'open_task_dates'), _deadline_risk_rule),
+    InsightRule('idle_goals', ('open_goals', 'parent_goal_ids', 'active_goal_ids'), _idle_goal_rule),
+    InsightRule('category_imbalance', ('open_category_minutes', 'open_goals'), _category_imbalance_rule),
+]
+
+
+def register_aggregate(name: str, aggregate: Aggregate):
+    """注册聚合量，供自定义规则声明使用"""
+    AGGREGATES[name] = aggregate
+
+
+def register_rule(rule: InsightRule):
+    """注册规则，所需聚合量必须已注册"""
+    missing = [name for name in rule.needs if name not in AGGREGATES]
+    if missing:
+        raise ValueError(f"规则 {rule.name} 依赖未注册的聚合量: {', '.join(missing)}")
+    INSIGHT_RULES.append(rule)
+
+
+def compute_aggregates(data: Dict[str, List[Dict]], names: List[str]) -> Dict[str, Any]:
+    """对每个数据源只遍历一次，同时累计所有需要的聚合量"""
+    values = {name: AGGREGATES[name].initial() for name in names}
+    steps: Dict[str, List[Tuple[str, Callable]]] = {}
+    for name in values:
+        for source in AGGREGATES[name].sources:
+            steps.setdefault(source, []).append((name, AGGREGATES[name].step))
+    for source, source_steps in steps.items():
+        for item in data.get(source, []):
+            for name, step in source_steps:
+                values[name] = step(values[name], item, source)
+    return values
+
+
+def run_insight_rules(data: Dict[str, List[Dict]], rules: Optional[List[InsightRule]] = None,
+                      context: Optional[Dict] = None) -> List[Dict]:
+    """计算规则所需聚合量并依次求值，返回洞察列表"""
+    rules = INSIGHT_RULES if rules is None else rules
+    context = dict(context or {})
+    context.setdefault('today', date.today())
+    names = list(dict.fromkeys(name for rule in rules for name in rule.needs))
+    values = compute_aggregates(data, names)
+    insights = []
+    for rule in rules:
+        insights.extend(rule.evaluate(values, context))
+    return insights
@@ -0,0 +1,135 @@
+"""
+数据合并
+
+多个会话（浏览器标签页、本地接口、批量任务）共用一个数据文件。每个会话保留上次读写文件时的基线，
+保存时如果文件已被别人改过，就按记录 ID 对基线、本会话和文件三方合并：只有一方修改的记录取修改方，
+双方都修改的记录逐字段合并，同一字段双方改成不同的值时以本会话为准并报告冲突。
+
+每条记录带 version 版本号，本会话修改过的记录在保存时递增；判断文件中的记录是否被别人改过只需比较版本号。
+"""
+
+from typing import Any, List, Dict, Hashable, Optional, Tuple
+
+RECORD_KINDS = ('goals', 'tasks', 'weekly_tasks', 'activities')   # 按 ID 逐条合并的数据
+VERSION_FIELD = 'version'
+_MISSING = object()
+
+Snapshot = Dict[str, Any]   # 数据源 → {记录 ID: 记录副本}；其它数据为保存时的对象本身
+
+
+def snapshot(data: Dict[str, Any], keys) -> Snapshot:
+    """记录基线：记录逐条浅拷贝（字段都是标量，界面修改字段不会影响基线），其它数据保留引用"""
+    base = {}
+    for key in keys:
+        value = data.get(key)
+        if key in RECORD_KINDS:
+            base[key] = {record['id']: dict(record) for record in value or []}
+        else:
+            base[key] = value
+    return base
+
+
+def _version(record: Dict) -> int:
+    return record.get(VERSION_FIELD, 0)
+
+
+def _changed_since(record: Dict, base: Dict) -> bool:
+    """文件中的记录是否被别人改过：有版本号时只比较版本号"""
+    if VERSION_FIELD in record or VERSION_FIELD in base:
+        return _version(record) != _version(base)
+    return record != base
+
+
+def stamp_versions(records: List[Dict], base: Dict[Hashable, Dict]):
+    """本会话新增或修改过的记录版本号加一"""
+    for record in records:
+        previous = base.get(record['id'])
+        if previous is None:
+            record.setdefault(VERSION_FIELD, 1)
+        elif record != previous:
+            record[VERSION_FIELD] = _version(previous) + 1
+
+
+def merge_fields(base: Dict, ours: Dict, theirs: Dict) -> Tuple[Dict, List[str]]:
+    """逐字段三方合并，返回 (合并结果, 双方改成不同值的字段)"""
+    merged = dict(theirs)
+    conflicts = []
+    for field in set(ours) | set(base):
+        if field == VERSION_FIELD:
+            continue
+        mine = ours.get(field, _MISSING)
+        original = base.get(field, _MISSING)
+        if mine == original:
+            continue
+        other = theirs.get(field, _MISSING)
+        if other != original and other != mine:
+            conflicts.append(field)
+        if mine is _MISSING:
+            merged.pop(field, None)
+        else:
+            merged[field] = mine
+    merged[VERSION_FIELD] = max(_version(ours), _version(theirs)) + 1
+    return merged, conflicts
+
+
+def merge_records(kind: str, base: Dict[Hashable, Dict], ours: List[Dict],
+                  theirs: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """三方合并一类记录，返回 (合并后的记录, 冲突说明)；本会话的记录顺序在前，别人新增的记录排在后面"""
+    theirs_by_id = {record['id']: record for record in theirs}
+    merged, conflicts = [], []
+    for record in ours:
+        record_id = record['id']
+        original = base.get(record_id)
+        other = theirs_by_id.get(record_id)
+        if original is None:
+            # 本会话新增
+            merged.append(record)
+        elif other is None:
+            # 别人删除：本会话没改过就一起删除，改过则保留
+            if record != original:
+                merged.append(record)
+                conflicts.append(_conflict(kind, record, 'deleted'))
+        elif not _changed_since(other, original):
+            merged.append(record)
+        elif record == original:
+            merged.append(other)
+        else:
+            combined, fields = merge_fields(original, record, other)
+            merged.append(combined)
+            if fields:
+                conflicts.append(_conflict(kind, record, 'edited', fields))
+
+    ours_ids = {record['id'] for record in ours}
+    for record in theirs:
+        record_id = record['id']
+        if record_id in ours_ids:
+            continue
+        original = base.get(record_id)
+        if original is None:
+            # 别人新增
+            merged.append(record)
+        elif _changed_since(record, original):
+            # 本会话删除了别人刚修改的记录，保留别人的修改
+            merged.append(record)
+            conflicts.append(_conflict(kind, record, 'modified'))
+    return merged, conflicts
+
+
+def _conflict(kind: str, record: Dict, reason: str, fields: Optional[List[str]] = None) -> Dict:
+    return {'kind': kind, 'id': record['id'], 'name': record.get('name'), 'reason': reason, 'fields': sorted(fields or [])}
+
+
+def merge_data(base: Snapshot, ours: Dict[str, Any], theirs: Dict[str, Any], keys) -> Tuple[Dict[str, Any], List[Dict]]:
+    """三方合并整份数据；记录以外的数据（日程、洞察等）本会话改过就取本会话的，否则取文件中的"""
+    merged, conflicts = {}, []
+    for key in keys:
+        if key in RECORD_KINDS:
+            merged[key], kind_conflicts = merge_records(key, base.get(key) or {}, ours.get(key) or [],
+                                                        theirs.get(key) or [])
+            conflicts.extend(kind_conflicts)
+        else:
+            mine = ours.get(key)
+            original = base.get(key)
+            changed = mine is not original and mine != original
+            merged[key] = mine if changed or key not in theirs else theirs[key]
+    return merged, conflicts
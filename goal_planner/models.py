@@ -0,0 +1,86 @@
+"""
+领域模型
+
+目标、周任务等记录的构造规则，界面与批量任务共用，保证两边生成的数据结构一致。
+"""
+
+from datetime import date, datetime
+from typing import Any, List, Dict, Optional, Tuple
+
+TASK_PRIORITIES = (1, 2, 3)        # 低、中、高
+
+
+def breakdown_to_records(goal: Dict, sub_goals: List[Dict],
+                         now: Optional[datetime] = None) -> Tuple[List[Dict], List[Dict]]:
+    """把 AI 分解出的子目标转换为新目标和周任务记录，返回 (goals, weekly_tasks)"""
+    now = now or datetime.now()
+    new_goals = []
+    new_weekly_tasks = []
+    for i, sub_goal in enumerate(sub_goals):
+        # 如果是周类型，添加到weekly_tasks，否则添加到goals
+        if sub_goal['type'] == '周':
+            new_weekly_tasks.append({
+                'id': now.timestamp() + i,
+                'name': sub_goal['name'],
+                'goalId': goal['id'],
+                'category': sub_goal.get('category', ''),
+                'description': sub_goal.get('description', ''),
+                'priority': sub_goal.get('priority', 2),
+                'estimatedTime': sub_goal.get('estimatedTime', 60),
+                'scheduledDate': sub_goal.get('deadline', ''),
+                'completed': False,
+                'createdAt': now.isoformat()
+            })
+        else:
+            new_goals.append({
+                'id': now.timestamp() + i,
+                'name': sub_goal['name'],
+                'type': sub_goal['type'],
+                'category': sub_goal.get('category', ''),
+                'description': sub_goal.get('description', ''),
+                'deadline': sub_goal.get('deadline', ''),
+                'progress': 0,
+                'createdAt': now.isoformat(),
+                'parentGoalId': goal['id']
+            })
+    return new_goals, new_weekly_tasks
+
+
+def task_record(fields: Dict[str, Any], now: Optional[datetime] = None, offset: int = 0) -> Dict:
+    """按界面添加任务时的字段和默认值构造任务记录，字段无效时抛出 ValueError
+
+    未提供 id 时用当前时间戳加 offset，批量创建时各条记录依次递增。
+    """
+    now = now or datetime.now()
+    name = fields.get('name')
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("任务名称不能为空")
+    priority = fields.get('priority', 2)
+    if priority not in TASK_PRIORITIES:
+        raise ValueError(f"优先级应为 1、2 或 3: {priority!r}")
+    estimated_time = fields.get('estimatedTime', 60)
+    if not isinstance(estimated_time, int) or isinstance(estimated_time, bool) or estimated_time <= 0:
+        raise ValueError(f"预计用时应为正整数分钟: {estimated_time!r}")
+    scheduled_date = fields.get('scheduledDate') or ''
+    if scheduled_date:
+        try:
+            date.fromisoformat(scheduled_date[:10])
+        except (TypeError, ValueError):
+            raise ValueError(f"计划日期应为 YYYY-MM-DD: {scheduled_date!r}") from None
+    record = {
+        'id': fields.get('id', now.timestamp() + offset),
+        'name': name.strip(),
+        'goalId': fields.get('goalId'),
+        'category': fields.get('category', ''),
+        'description': fields.get('description', ''),
+        'priority': priority,
+        'estimatedTime': estimated_time,
+        'scheduledDate': scheduled_date,
+        'preparation': fields.get('preparation', ''),
+        'guidance': fields.get('guidance', ''),
+        'completed': bool(fields.get('completed', False)),
+        'createdAt': fields.get('createdAt', now.isoformat())
+    }
+    if record['completed']:
+        record['completedAt'] = fields.get('completedAt') or now.isoformat()
+    return record
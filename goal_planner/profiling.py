@@ -0,0 +1,295 @@
+"""
+启动性能记录
+
+- importtime：用 python -X importtime 在子进程中执行应用脚本，汇总导入耗时最多的顶层模块
+- startup：启动 Streamlit 服务器，记录从启动到健康检查通过（服务器就绪）、再到首次渲染完成的耗时
+- build-report：记录打包产物的体积和文件数，与上次构建比较
+
+结果追加到本地 JSON Lines 文件，便于比较每次改动或构建前后的启动开销。
+
+命令行用法：
+    python -m goal_planner.profiling importtime [--top 10] [--no-record]
+    python -m goal_planner.profiling startup [--browser]
+    python -m goal_planner.profiling build-report dist/智能目标管理 --target windows
+    python -m goal_planner.profiling history [--kind startup]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import webbrowser
+from typing import List, Dict, Optional, Tuple
+
+APP_SCRIPT = "goal-planner-python.py"
+STARTUP_METRICS_FILE = "goal_planner_startup.jsonl"   # 启动性能记录，每行一条
+BUILD_REPORTS_FILE = "goal_planner_builds.jsonl"      # 打包产物记录
+HEAVY_MODULES = ('anthropic', 'openai', 'requests')    # 应按需加载、不应出现在启动导入中的模块
+HEALTH_PATH = "/_stcore/health"                        # Streamlit 服务器健康检查地址
+PROFILE_ENV = "GOAL_PLANNER_PROFILE_FILE"              # 设置后应用在首次渲染完成时写入该文件
+LAUNCH_TIME_ENV = "GOAL_PLANNER_LAUNCH_TIME"           # 启动器启动时刻（time.time()）
+
+_first_render_recorded = False
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 输出，返回 (模块, 自身微秒, 累计微秒, 嵌套深度)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        rows.append((stripped, int(parts[0]), int(parts[1]), depth))
+    return rows
+
+
+def import_time_report(script: str = APP_SCRIPT, top: int = 10) -> Dict:
+    """在子进程中以 -X importtime 运行脚本（无 Streamlit 服务器的裸模式），汇总导入耗时"""
+    script = os.path.abspath(script)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(script), os.environ.get('PYTHONPATH')])))
+    code = f"import runpy; runpy.run_path({script!r}, run_name='__main__')"
+    # 在临时目录中运行，避免读写用户的数据文件
+    with tempfile.TemporaryDirectory() as cwd:
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                              cwd=cwd, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+    rows = parse_importtime(proc.stderr)
+    top_level = sorted((row for row in rows if row[3] == 0), key=lambda row: row[2], reverse=True)
+    loaded = {row[0].split('.')[0] for row in rows}
+    return {
+        't': int(time.time()),
+        'kind': 'importtime',
+        'python': sys.version.split()[0],
+        'total_ms': round(sum(row[1] for row in rows) / 1000, 1),
+        'wall_ms': round(wall * 1000, 1),
+        'modules': len(rows),
+        'top': [[name, round(cumulative / 1000, 1)] for name, _, cumulative, _ in top_level[:top]],
+        'heavy_loaded': [name for name in HEAVY_MODULES if name in loaded],
+        'returncode': proc.returncode
+    }
+
+
+def record_metric(record: Dict, path: str = STARTUP_METRICS_FILE):
+    """追加一条启动性能记录"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+def load_metrics(path: str = STARTUP_METRICS_FILE, kind: Optional[str] = None) -> List[Dict]:
+    """读取启动性能记录，kind 为空时返回全部"""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if kind is None or record.get('kind') == kind:
+                records.append(record)
+    return records
+
+
+def wait_for_health(port: int, timeout: float = 60, interval: float = 0.1) -> Optional[float]:
+    """轮询 Streamlit 健康检查，返回就绪所用秒数；超时返回 None"""
+    url = f"http://127.0.0.1:{port}{HEALTH_PATH}"
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            pass
+        time.sleep(interval)
+    return None
+
+
+def record_first_render():
+    """性能记录模式下，在本进程第一次渲染完成时记录自启动器启动以来的耗时"""
+    global _first_render_recorded
+    path = os.environ.get(PROFILE_ENV)
+    launched = os.environ.get(LAUNCH_TIME_ENV)
+    if _first_render_recorded or not path or not launched:
+        return
+    _first_render_recorded = True
+    record_metric({
+        't': int(time.time()),
+        'kind': 'first_render',
+        'launch': float(launched),
+        'render_ms': round((time.time() - float(launched)) * 1000, 1)
+    }, path)
+
+
+def profile_env(path: str, launched: Optional[float] = None) -> Dict[str, str]:
+    """启动应用进程时附加的环境变量，使应用记录首次渲染时间"""
+    return dict(os.environ, **{PROFILE_ENV: os.path.abspath(path), LAUNCH_TIME_ENV: repr(launched or time.time())})
+
+
+def startup_profile(script: str = APP_SCRIPT, port: int = 8599, timeout: float = 60,
+                    browser: bool = False) -> Dict:
+    """启动 Streamlit 服务器，记录就绪时间；browser 为真时打开浏览器并等待首次渲染"""
+    with tempfile.TemporaryDirectory() as tmp:
+        marks = os.path.join(tmp, 'marks.jsonl')
+        launched = time.time()
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', os.path.abspath(script),
+             '--server.headless', 'true', '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+            env=profile_env(marks, launched), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        render_ms = None
+        try:
+            ready = wait_for_health(port, timeout)
+            if ready is not None:
+                ready = time.time() - launched
+            if ready is not None and browser:
+                webbrowser.open(f"http://localhost:{port}")
+                deadline = time.time() + timeout
+                while render_ms is None and time.time() < deadline:
+                    render_ms = next((m['render_ms'] for m in load_metrics(marks, 'first_render')), None)
+                    time.sleep(0.1)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return {
+        't': int(time.time()),
+        'kind': 'startup',
+        'python': sys.version.split()[0],
+        'ready_ms': round(ready * 1000, 1) if ready is not None else None,
+        'render_ms': render_ms
+    }
+
+
+def bundle_size(path: str) -> Tuple[int, int]:
+    """目录（或单个文件）的总字节数和文件数"""
+    if os.path.isfile(path):
+        return os.path.getsize(path), 1
+    total = files = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            full = os.path.join(root, name)
+            if not os.path.islink(full):
+                total += os.path.getsize(full)
+                files += 1
+    return total, files
+
+
+def build_report(path: str, target: str, **extra) -> Dict:
+    """打包产物的体积记录，extra 为构建选项或启动耗时等附加字段"""
+    size, files = bundle_size(path)
+    record = {
+        't': int(time.time()),
+        'kind': 'build',
+        'target': target,
+        'bundle_mb': round(size / 1024 / 1024, 2),
+        'files': files
+    }
+    record.update(extra)
+    return record
+
+
+def print_build_report(report: Dict, previous: Optional[Dict]):
+    line = f"📦 {report['target']} 产物 {report['bundle_mb']} MB，{report['files']} 个文件"
+    if previous:
+        line += f"（上次 {previous['bundle_mb']} MB，变化 {report['bundle_mb'] - previous['bundle_mb']:+.2f} MB）"
+    print(line)
+    if report.get('ready_ms') is not None:
+        print(f"⏱️ 启动到服务器就绪 {report['ready_ms']} ms")
+
+
+def _print_importtime(report: Dict, previous: Optional[Dict]):
+    delta = ''
+    if previous:
+        delta = f"（上次 {previous['total_ms']} ms，变化 {report['total_ms'] - previous['total_ms']:+.1f} ms）"
+    print(f"导入 {report['modules']} 个模块，共 {report['total_ms']} ms{delta}")
+    for name, ms in report['top']:
+        print(f"  {ms:>9.1f} ms  {name}")
+    if report['heavy_loaded']:
+        print(f"⚠️ 启动时加载了应按需导入的模块: {', '.join(report['heavy_loaded'])}")
+    if report['returncode']:
+        print(f"⚠️ 脚本退出码 {report['returncode']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m goal_planner.profiling', description='启动性能记录')
+    parser.add_argument('--metrics', default=STARTUP_METRICS_FILE, help='启动性能记录文件')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importtime = commands.add_parser('importtime', help='统计应用脚本的导入耗时')
+    importtime.add_argument('--script', default=APP_SCRIPT)
+    importtime.add_argument('--top', type=int, default=10, help='列出耗时最多的顶层模块数')
+    importtime.add_argument('--no-record', action='store_true', help='只输出，不写入记录文件')
+
+    startup = commands.add_parser('startup', help='记录启动到服务器就绪和首次渲染的耗时')
+    startup.add_argument('--script', default=APP_SCRIPT)
+    startup.add_argument('--port', type=int, default=8599)
+    startup.add_argument('--timeout', type=float, default=60)
+    startup.add_argument('--browser', action='store_true', help='打开浏览器并等待首次渲染')
+    startup.add_argument('--no-record', action='store_true', help='只输出，不写入记录文件')
+
+    build = commands.add_parser('build-report', help='记录打包产物的体积')
+    build.add_argument('path', help='打包产物目录或文件')
+    build.add_argument('--target', required=True, help='构建目标，如 windows、macos')
+    build.add_argument('--reports', default=BUILD_REPORTS_FILE, help='构建记录文件')
+    build.add_argument('--ready-ms', type=float, help='已测得的启动到就绪耗时')
+
+    history = commands.add_parser('history', help='查看历史记录')
+    history.add_argument('--kind')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'startup':
+        report = startup_profile(args.script, args.port, args.timeout, args.browser)
+        if report['ready_ms'] is None:
+            print(f"❌ {args.timeout} 秒内服务器未就绪")
+            return 1
+        print(f"⏱️ 启动到服务器就绪 {report['ready_ms']} ms")
+        if report['render_ms'] is not None:
+            print(f"🖼️ 启动到首次渲染 {report['render_ms']} ms")
+        if not args.no_record:
+            record_metric(report, args.metrics)
+        return 0
+
+    if args.command == 'build-report':
+        if not os.path.exists(args.path):
+            print(f"❌ 找不到打包产物: {args.path}")
+            return 1
+        previous = next((r for r in reversed(load_metrics(args.reports, 'build')) if r['target'] == args.target), None)
+        extra = {'ready_ms': args.ready_ms} if args.ready_ms is not None else {}
+        report = build_report(args.path, args.target, **extra)
+        print_build_report(report, previous)
+        record_metric(report, args.reports)
+        return 0
+
+    if args.command == 'importtime':
+        previous = (load_metrics(args.metrics, 'importtime') or [None])[-1]
+        report = import_time_report(args.script, args.top)
+        _print_importtime(report, previous)
+        if not args.no_record:
+            record_metric(report, args.metrics)
+        return 1 if report['heavy_loaded'] else 0
+
+    records = load_metrics(args.metrics, args.kind) + load_metrics(BUILD_REPORTS_FILE, args.kind)
+    for record in sorted(records, key=lambda r: r['t']):
+        stamp = time.strftime('%Y-%m-%d %H:%M', time.localtime(record['t']))
+        values = {k: v for k, v in record.items() if k.endswith('_ms') or k.endswith('_mb')}
+        print(stamp, record.get('kind'), "  ".join(f"{k}={v}" for k, v in values.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+提示词构建
+
+目标分解与效率洞察的提示词：固定的指令前缀（可被提供商缓存）、按 Token 预算裁剪的数据部分，
+以及增量洞察所需的数据快照与变化对比。不依赖 Streamlit，供界面和批量任务共用。
+"""
+
+import hashlib
+import json
+import math
+from datetime import datetime
+from typing import List, Dict
+
+from goal_planner.date_index import days_until
+
+# 提示词 Token 估算：各提供商分词器每个中日韩字符约占的 Token 数，以及其它文本每 Token 的字符数
+TOKENS_PER_CJK_CHAR = {'claude': 1.2, 'openai': 0.8, 'qwen': 0.65, 'deepseek': 0.65}
+CHARS_PER_LATIN_TOKEN = {'claude': 3.5, 'openai': 4.0, 'qwen': 4.0, 'deepseek': 4.0}
+DEFAULT_INSIGHT_TOKEN_BUDGET = 4000
+# 洞察提示词中各数据段占可用预算的比例，未用完的份额顺延给后面的数据段
+INSIGHT_SECTION_SHARES = [('activities', 0.15), ('goals', 0.35), ('tasks', 0.5)]
+INSIGHTS_DELTA_MAX_RATIO = 0.5   # 变化条目超过该比例时改为完整分析
+INSIGHTS_PREVIOUS_SHARE = 0.4    # 增量提示词中上次洞察最多占可用预算的比例，其余留给变化条目
+
+# 洞察提示词的固定指令前缀（每次调用都相同，作为可缓存的 system 提示词）
+INSIGHTS_SYSTEM_PROMPT = """作为一个专业的效率顾问，请分析用户的目标、任务和日程安排，提供深度洞察和建议。
+
+请提供以下分析：
+1. 识别可以自动化或优化的重复性工作
+2. 时间管理建议
+3. 目标对齐度分析（任务是否支持目标）
+4. 效率提升的具体行动建议
+5. 潜在的时间陷阱或浪费
+
+请以JSON格式返回，格式如下：
+{
+  "insights": [
+    {
+      "type": "automation/efficiency/warning/success",
+      "title": "标题",
+      "description": "详细描述",
+      "priority": "high/medium/low",
+      "actionable": "具体可执行的建议"
+    }
+  ]
+}
+
+只返回JSON，不要其他内容。"""
+
+# 提示词 Token 预算
+def estimate_tokens(text: str, provider: str) -> int:
+    """按提供商分词器的经验比例估算文本的 Token 数"""
+    cjk = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uac00' <= ch <= '\ud7af' or '\uff00' <= ch <= '\uffef')
+    other = len(text) - cjk
+    return math.ceil(cjk * TOKENS_PER_CJK_CHAR.get(provider, 1.2) + other / CHARS_PER_LATIN_TOKEN.get(provider, 3.5))
+
+def score_item_relevance(item: Dict, today) -> float:
+    """按优先级、截止日期临近程度和最近变更给目标或任务打分，分数越高越值得放进提示词"""
+    score = item.get('priority', 2) * 10
+    
+    days = days_until(item.get('scheduledDate') or item.get('deadline', ''), today)
+    if days is not None:
+        score += 25 if days < 0 else max(0, 30 - days)
+    
+    changed_days = days_until((item.get('updatedAt') or item.get('createdAt') or '')[:10], today)
+    if changed_days is not None and changed_days > -7:
+        score += (7 + changed_days) * 2
+    
+    # 进行中的目标比未开始或已完成的目标更值得分析
+    if 'progress' in item:
+        if 0 < item['progress'] < 100:
+            score += 10
+        elif item['progress'] >= 100:
+            score -= 20
+    return score
+
+def summarize_items(items: List[Dict], noun: str, max_categories: int = 8) -> str:
+    """把未列出的条目折叠成一行按分类计数的汇总"""
+    counts = {}
+    for item in items:
+        category = item.get('category') or '未分类'
+        counts[category] = counts.get(category, 0) + 1
+    ranked = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    parts = [f"{category} {count}" for category, count in ranked[:max_categories]]
+    if len(ranked) > max_categories:
+        parts.append(f"其他 {len(ranked) - max_categories} 类共 {sum(c for _, c in ranked[max_categories:])}")
+    line = f"- …另有 {len(items)} 个{noun}未列出，按分类：{'、'.join(parts)}"
+    
+    minutes = sum(item.get('estimatedTime', 0) or 0 for item in items)
+    high = len([item for item in items if item.get('priority') == 3])
+    if minutes:
+        line += f"；合计预计 {minutes} 分钟"
+    if high:
+        line += f"；其中高优先级 {high} 个"
+    return line
+
+def _fit_section(lines: List[str], items: List[Dict], noun: str, budget: int, provider: str) -> List[str]:
+    """在预算内按顺序尽量保留条目，其余折叠为汇总行"""
+    kept = []
+    used = 0
+    # 汇总行长度只取决于分类数，用全部条目的汇总作为预留上限，避免逐条重算
+    reserve = estimate_tokens(summarize_items(items, noun), provider) + 1 if items else 0
+    for i, line in enumerate(lines):
+        cost = estimate_tokens(line, provider) + 1
+        if used + cost + (reserve if i < len(lines) - 1 else 0) > budget:
+            break
+        kept.append(line)
+        used += cost
+    
+    omitted = items[len(kept):]
+    if omitted:
+        summary = summarize_items(omitted, noun)
+        # 预算连一行汇总都放不下时只保留总数
+        if estimate_tokens(summary, provider) + 1 > budget - used:
+            summary = f"- …另有 {len(omitted)} 个{noun}未列出"
+        kept.append(summary)
+    return kept
+
+def build_insights_prompt(goals: List[Dict], activities: List[Dict], tasks: List[Dict],
+                          provider: str, budget: int) -> str:
+    """构建洞察提示词的数据部分，连同固定前缀不超过 Token 预算：按相关度排序条目，放不下的折叠为分类汇总"""
+    today = datetime.now().date()
+    template = """以下是用户的目标、任务和日程安排：
+
+目标列表：
+{goals}
+
+日常活动：
+{activities}
+
+待办任务：
+{tasks}"""
+    
+    ranked_goals = sorted(goals, key=lambda g: score_item_relevance(g, today), reverse=True)
+    ranked_tasks = sorted(tasks, key=lambda t: score_item_relevance(t, today), reverse=True)
+    sections = {
+        'activities': (
+            sorted(activities, key=lambda a: a['startTime']),
+            lambda a: f"- {a['name']} at {a['startTime']}, {a['duration']}分钟",
+            '日常活动'
+        ),
+        'goals': (
+            ranked_goals,
+            lambda g: f"- {g['name']} ({g['type']}, 进度: {g['progress']}%)",
+            '目标'
+        ),
+        'tasks': (
+            ranked_tasks,
+            lambda t: f"- {t['name']} (优先级: {t.get('priority', 2)}, 预计: {t.get('estimatedTime', 60)}分钟)",
+            '待办任务'
+        )
+    }
+    
+    fixed_cost = estimate_tokens(INSIGHTS_SYSTEM_PROMPT + template.format(goals='', activities='', tasks=''), provider)
+    available = max(0, budget - fixed_cost)
+    rendered = {}
+    carry = 0
+    for name, share in INSIGHT_SECTION_SHARES:
+        items, fmt, noun = sections[name]
+        section_budget = int(available * share) + carry
+        lines = _fit_section([fmt(item) for item in items], items, noun, section_budget, provider)
+        carry = max(0, section_budget - sum(estimate_tokens(line, provider) + 1 for line in lines))
+        rendered[name] = "\n".join(lines)
+    
+    return template.format(**rendered)
+
+# 增量洞察：数据快照与变化对比
+# 提示词用到的字段（描述、分类汇总、相关度排序和完成状态），只有这些字段变化才算修改；
+# version、updatedAt、completedAt 等簿记字段不参与指纹
+PROMPT_FIELDS = ('name', 'type', 'progress', 'category', 'priority', 'estimatedTime', 'scheduledDate', 'deadline',
+                 'completed', 'startTime', 'duration')
+
+def _fingerprint(item: Dict) -> str:
+    """计算条目中提示词所用字段的内容指纹"""
+    fields = {key: item[key] for key in PROMPT_FIELDS if key in item}
+    return hashlib.md5(json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:12]
+
+def _is_done(kind: str, item: Dict) -> bool:
+    """判断条目是否已完成：任务看 completed，目标看进度"""
+    if kind == 'goals':
+        return item.get('progress', 0) >= 100
+    return bool(item.get('completed'))
+
+def snapshot_items(data: Dict[str, List[Dict]]) -> Dict[str, Dict[str, Dict]]:
+    """为每类条目记录 id → 指纹、名称、分类和完成状态"""
+    return {
+        kind: {
+            str(item['id']): {
+                'h': _fingerprint(item),
+                'name': item['name'],
+                'category': item.get('category', ''),
+                'done': _is_done(kind, item)
+            }
+            for item in items
+        }
+        for kind, items in data.items()
+    }
+
+def diff_snapshot(previous: Dict[str, Dict[str, Dict]], data: Dict[str, List[Dict]]) -> List[Dict]:
+    """对比上次快照与当前数据，返回新增、完成、修改和删除的条目"""
+    changes = []
+    for kind, items in data.items():
+        before = previous.get(kind, {})
+        seen = set()
+        for item in items:
+            key = str(item['id'])
+            seen.add(key)
+            old = before.get(key)
+            if old is None:
+                changes.append({'kind': kind, 'change': 'new', 'item': item})
+            elif old['h'] != _fingerprint(item):
+                change = 'completed' if _is_done(kind, item) and not old['done'] else 'edited'
+                changes.append({'kind': kind, 'change': change, 'item': item})
+        for key, old in before.items():
+            if key not in seen:
+                changes.append({'kind': kind, 'change': 'removed', 'item': old})
+    return changes
+
+def _describe_change(change: Dict) -> str:
+    """把一条变化格式化为提示词中的一行"""
+    nouns = {'goals': '目标', 'tasks': '任务', 'weekly_tasks': '周任务', 'activities': '日常活动'}
+    verbs = {'new': '新增', 'completed': '完成', 'edited': '修改', 'removed': '删除'}
+    item = change['item']
+    line = f"- [{verbs[change['change']]}{nouns[change['kind']]}] {item['name']}"
+    if change['change'] in ('new', 'edited'):
+        if change['kind'] == 'goals':
+            line += f" ({item['type']}, 进度: {item.get('progress', 0)}%)"
+        elif change['kind'] == 'activities':
+            line += f" at {item['startTime']}, {item['duration']}分钟"
+        else:
+            line += f" (优先级: {item.get('priority', 2)}, 预计: {item.get('estimatedTime', 60)}分钟)"
+    return line
+
+def _fit_previous_insights(previous_insights: List[Dict], budget: int, provider: str) -> str:
+    """在预算内按优先级保留上次的洞察，放不下的只注明条数"""
+    rank = {'high': 0, 'medium': 1, 'low': 2}
+    ranked = sorted(previous_insights, key=lambda i: rank.get(i.get('priority'), 1))
+    kept = []
+    used = estimate_tokens('[]', provider)
+    for insight in ranked:
+        cost = estimate_tokens(json.dumps(insight, ensure_ascii=False), provider) + 1
+        if used + cost > budget:
+            break
+        kept.append(insight)
+        used += cost
+    text = json.dumps(kept, ensure_ascii=False)
+    if len(kept) < len(ranked):
+        text += f"\n（另有 {len(ranked) - len(kept)} 条优先级较低的洞察未列出，请保留它们，除非与变化矛盾）"
+    return text
+
+def build_insights_delta_prompt(changes: List[Dict], previous_insights: List[Dict], totals: Dict[str, int],
+                                provider: str, budget: int) -> str:
+    """构建增量洞察提示词的数据部分：只包含上次分析后的变化和上次的洞察
+
+    上次的洞察先按 INSIGHTS_PREVIOUS_SHARE 裁剪，变化条目使用扣除洞察实际占用后的剩余预算。
+    """
+    today = datetime.now().date()
+    template = """你上次已经分析过这位用户的目标、任务和日程安排。
+当前共有 {goals} 个目标、{open_tasks} 个待办任务、{activities} 个日常活动。
+
+上次给出的洞察：
+{insights}
+
+自上次分析以来的变化：
+"""
+    footer = """
+
+请结合这些变化更新洞察列表：保留仍然成立的洞察，修改或删除已经过时的洞察，并补充新的洞察。"""
+    
+    fixed_cost = estimate_tokens(INSIGHTS_SYSTEM_PROMPT + template.format(insights='', **totals) + footer, provider)
+    available = max(0, budget - fixed_cost)
+    insights = _fit_previous_insights(previous_insights, int(available * INSIGHTS_PREVIOUS_SHARE), provider)
+    header = template.format(insights=insights, **totals)
+    available = max(0, available - estimate_tokens(insights, provider))
+    
+    # 完成和删除只需一行，优先列出；新增和修改按相关度排序
+    order = {'completed': 0, 'removed': 1, 'new': 2, 'edited': 2}
+    ranked = sorted(
+        changes,
+        key=lambda c: (order[c['change']], -score_item_relevance(c['item'], today) if order[c['change']] == 2 else 0)
+    )
+    lines = _fit_section([_describe_change(c) for c in ranked], [c['item'] for c in ranked], '变化', available, provider)
+    return header + "\n".join(lines) + footer
+
+def parse_ai_json(response: str) -> Dict:
+    """解析 AI 返回的 JSON，去除可能的 markdown 代码块标记"""
+    return json.loads(response.replace('```json', '').replace('```', '').strip())
+
+# 目标分解提示词的固定指令前缀（每次调用都相同，作为可缓存的 system 提示词）
+BREAKDOWN_SYSTEM_PROMPT = """作为一个目标管理专家，你负责把用户给出的大目标分解为更小、更可执行的子目标。
+
+请将目标分解为适当粒度的子目标，遵循以下原则：
+1. 如果是长期目标，分解为3-5个年度目标
+2. 如果是年度目标，分解为4-6个季度目标
+3. 如果是季度目标，分解为3-4个月度目标
+4. 如果是月度目标，分解为4-5个周任务
+5. 如果是周任务，分解为每天的具体行动（包括建议的执行日期和时间）
+6. 每个子目标应该是SMART原则的（具体、可衡量、可实现、相关、有时限）
+7. 子目标之间应有逻辑关系，形成实现主目标的路径
+8. 为每个子目标设定合理的截止日期和预计完成时间
+
+请以JSON格式返回，格式如下：
+{
+  "analysis": "对主目标的分析和分解思路",
+  "subGoals": [
+    {
+      "name": "子目标名称",
+      "type": "年度/季度/月度/周",
+      "category": "分类",
+      "description": "详细描述",
+      "deadline": "YYYY-MM-DD",
+      "estimatedTime": 60,
+      "priority": 2,
+      "keyActions": ["关键行动1", "关键行动2"]
+    }
+  ]
+}
+
+只返回JSON，不要其他内容。"""
+
+def build_breakdown_prompt(goal: Dict) -> str:
+    """构建目标分解提示词中随目标变化的部分"""
+    return f"""请帮我将以下大目标分解为更小、更可执行的子目标。
+
+目标信息：
+- 名称: {goal['name']}
+- 类型: {goal['type']}
+- 分类: {goal.get('category', '未分类')}
+- 描述: {goal.get('description', '无')}
+- 截止日期: {goal.get('deadline', '无')}
+
+请将这个{goal['type']}分解为适当粒度的子目标。"""
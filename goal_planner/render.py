@@ -0,0 +1,100 @@
+"""
+紧凑渲染
+
+把一天的日程或整个洞察列表拼成一段已转义的 HTML，页面上只需一次 st.markdown。
+结果按内容哈希缓存，内容不变时重复渲染不再拼接字符串。
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from html import escape
+from typing import List, Dict
+
+HTML_CACHE_SIZE = 64              # 缓存的 HTML 片段数（七日日程 + 今日日程 + 洞察绰绰有余）
+PRIORITY_EMOJI = {1: "🟢", 2: "🟡", 3: "🔴"}
+
+_html_cache: "OrderedDict[str, str]" = OrderedDict()
+_html_cache_lock = threading.Lock()   # 各会话的脚本线程共用缓存
+
+
+def format_time(minutes: int) -> str:
+    """将分钟转换为时间格式"""
+    hours = minutes // 60
+    mins = minutes % 60
+    return f"{hours:02d}:{mins:02d}"
+
+
+def content_hash(*parts) -> str:
+    """内容哈希，用作 HTML 缓存的键"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _cached(key: str, build) -> str:
+    with _html_cache_lock:
+        html = _html_cache.get(key)
+        if html is not None:
+            _html_cache.move_to_end(key)
+            return html
+    # 在锁外拼接，同一内容偶尔重复构建也只是结果相同
+    html = build()
+    with _html_cache_lock:
+        _html_cache[key] = html
+        _html_cache.move_to_end(key)
+        if len(_html_cache) > HTML_CACHE_SIZE:
+            _html_cache.popitem(last=False)
+    return html
+
+
+def _schedule_row(item: Dict) -> str:
+    start_time = format_time(item['startTime'])
+    end_time = format_time(item['startTime'] + item['duration'])
+    name = escape(str(item['item'].get('name', '')))
+    if item['type'] == 'task':
+        emoji = PRIORITY_EMOJI.get(item['item'].get('priority', 2), '⚪')
+        return (
+            "<div style='background:#f0f9ff;padding:0.5rem 0.75rem;border-radius:0.375rem;"
+            "border-left:3px solid #0ea5e9;margin-bottom:0.25rem'>"
+            f"{emoji} <strong>{name}</strong> "
+            f"<span style='color:#6b7280;font-size:0.875rem'>⏰ {start_time} - {end_time} ({item['duration']}分钟)</span>"
+            "</div>"
+        )
+    return (
+        "<div style='padding:0.25rem 0.75rem;margin-bottom:0.25rem;color:#374151'>"
+        f"⏰ <strong>{name}</strong> | {start_time} - {end_time}</div>"
+    )
+
+
+def schedule_html(items: List[Dict], title: str = '') -> str:
+    """一天的日程时间线（含可选标题），整段 HTML 只需一个元素"""
+    def build() -> str:
+        parts = [f"<div><h5>{escape(title)}</h5>"] if title else ["<div>"]
+        parts.extend(_schedule_row(item) for item in items)
+        if not items:
+            parts.append("<div style='color:#6b7280'>该日暂无安排</div>")
+        parts.append("</div>")
+        return "".join(parts)
+    return _cached(content_hash('schedule', title, items), build)
+
+
+def insights_html(insights: List[Dict], detailed: bool = False) -> str:
+    """洞察列表，沿用页面 CSS 中的 insight-card 样式"""
+    def build() -> str:
+        parts = []
+        for insight in insights:
+            type_class = f"insight-{escape(str(insight.get('type', '')))}"
+            parts.append(
+                f"<div class='insight-card {type_class}'>"
+                f"<h4>💡 {escape(str(insight.get('title', '')))}</h4>"
+                f"<p>{escape(str(insight.get('description', '')))}</p>"
+            )
+            if detailed and insight.get('actionable'):
+                parts.append(
+                    "<div style='background:rgba(255,255,255,0.5);padding:0.75rem;border-radius:0.375rem;margin-top:0.75rem'>"
+                    f"<strong>🎯 可执行建议：</strong><br>{escape(str(insight['actionable']))}</div>"
+                )
+            parts.append("</div>")
+        return "".join(parts)
+    return _cached(content_hash('insights', detailed, insights), build)
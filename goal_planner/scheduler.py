@@ -0,0 +1,211 @@
+"""
+日程安排
+
+在固定的日常活动之间按优先级插入待办任务，生成今日日程和未来 N 日日程，并导出为 iCalendar。
+函数读写显式传入的状态对象（st.session_state 或 PlannerState），不依赖 Streamlit。
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+
+
+# 生成智能日程
+def generate_schedule(state) -> List[Dict]:
+    """生成今日智能日程：在日常活动的间隙按优先级插入待办任务"""
+    schedule = []
+    activities = sorted(state.activities, key=lambda x: x['startTime'])
+    tasks = sorted(
+        state.task_stats.open_tasks('tasks'), 
+        key=lambda x: x['priority'], 
+        reverse=True
+    )
+    
+    current_time = 480  # 8:00 AM in minutes
+    
+    for activity in activities:
+        hours, minutes = map(int, activity['startTime'].split(':'))
+        activity_start = hours * 60 + minutes
+        
+        # 在活动之前安排任务
+        if activity_start > current_time and tasks:
+            available_time = activity_start - current_time
+            if available_time >= 30:
+                task = tasks.pop(0)
+                schedule.append({
+                    'type': 'task',
+                    'item': task,
+                    'startTime': current_time,
+                    'duration': min(available_time, task['estimatedTime'])
+                })
+        
+        # 添加活动
+        schedule.append({
+            'type': 'activity',
+            'item': activity,
+            'startTime': activity_start,
+            'duration': activity['duration']
+        })
+        
+        current_time = activity_start + activity['duration']
+    
+    state.schedule = schedule
+    return schedule
+
+
+# 获取近七日的周任务
+def get_weekly_tasks_for_next_7_days(state, today: Optional[date] = None) -> List[Dict]:
+    """获取未来7天内需要完成的周任务（按计划日期排序）"""
+    today = today or datetime.now().date()
+    return state.date_index.between(today, today + timedelta(days=7), ('weekly_tasks',))
+
+
+# 生成七日智能日程
+def schedule_days(state, base_date: Optional[date] = None, days: int = 7) -> Iterator[Tuple[str, List[Dict]]]:
+    """从 base_date 起逐日生成 days 天的日程 (日期, 时间表)，不写回状态"""
+    return layout_days(*day_inputs(state, base_date, days))
+
+
+def day_inputs(state, base_date: Optional[date] = None, days: int = 7) -> Tuple[Dict[str, List[Dict]], List[Dict]]:
+    """排日程所需的数据：每天的周任务和普通任务（周任务在前，一次范围查询取出）与按开始时间排序的日常活动
+
+    返回的都是新列表，调用方可以在锁内取出后在锁外排日程。
+    """
+    base_date = base_date or datetime.now().date()
+    tasks_by_day = state.date_index.by_day(base_date, days, ('weekly_tasks', 'tasks'))
+    activities = sorted(state.activities, key=lambda x: x['startTime'])
+    return tasks_by_day, activities
+
+
+def layout_days(tasks_by_day: Dict[str, List[Dict]], activities: List[Dict]) -> Iterator[Tuple[str, List[Dict]]]:
+    """逐日排出时间表：在日常活动之间按优先级插入当天的任务"""
+    for date_str, day_tasks in tasks_by_day.items():
+        # 按优先级排序
+        all_tasks = sorted(day_tasks, key=lambda x: x.get('priority', 1), reverse=True)
+        
+        # 生成这一天的时间表
+        schedule = []
+        
+        current_time = 480  # 8:00 AM in minutes
+        
+        for activity in activities:
+            hours, minutes = map(int, activity['startTime'].split(':'))
+            activity_start = hours * 60 + minutes
+            
+            # 在活动之前安排任务
+            if activity_start > current_time and all_tasks:
+                available_time = activity_start - current_time
+                while available_time >= 30 and all_tasks:
+                    task = all_tasks.pop(0)
+                    task_duration = task.get('estimatedTime', 60)
+                    actual_duration = min(available_time, task_duration)
+                    
+                    schedule.append({
+                        'type': 'task',
+                        'item': task,
+                        'startTime': current_time,
+                        'duration': actual_duration
+                    })
+                    
+                    current_time += actual_duration
+                    available_time -= actual_duration
+            
+            # 添加活动
+            schedule.append({
+                'type': 'activity',
+                'item': activity,
+                'startTime': activity_start,
+                'duration': activity['duration']
+            })
+            
+            current_time = activity_start + activity['duration']
+        
+        # 安排剩余任务
+        while all_tasks and current_time < 1320:  # 22:00
+            task = all_tasks.pop(0)
+            task_duration = task.get('estimatedTime', 60)
+            
+            schedule.append({
+                'type': 'task',
+                'item': task,
+                'startTime': current_time,
+                'duration': task_duration
+            })
+            
+            current_time += task_duration
+        
+        yield date_str, schedule
+
+
+def generate_weekly_schedule(state, base_date: Optional[date] = None, days: int = 7) -> Dict[str, List[Dict]]:
+    """生成未来7天（或 days 天）的智能日程安排"""
+    weekly_schedule = dict(schedule_days(state, base_date, days))
+    state.weekly_schedule = weekly_schedule
+    return weekly_schedule
+
+
+# 导出日程到iCalendar格式
+def export_to_icalendar(schedule_dict: Dict) -> str:
+    """将日程导出为iCalendar格式的字符串"""
+    return "\n".join(iter_icalendar(schedule_dict.items()))
+
+
+def iter_icalendar(day_schedules: Iterable[Tuple[str, List[Dict]]]) -> Iterator[str]:
+    """逐行生成 iCalendar 内容，day_schedules 为 (日期, 时间表)，可以边生成日程边导出"""
+    
+    # iCalendar头部
+    yield from [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//智能目标管理系统//Goal Planner v1.0//CN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:智能目标管理日程",
+        "X-WR-TIMEZONE:Asia/Shanghai",
+    ]
+    
+    # 为每个日期的每个事项创建事件
+    for date_str, schedule in day_schedules:
+        midnight = datetime.fromisoformat(date_str)
+        for item in schedule:
+            # 创建datetime对象；晚间任务可能排到 24:00 之后，按分钟偏移计算才能跨过午夜
+            start_datetime = midnight + timedelta(minutes=item['startTime'])
+            end_datetime = start_datetime + timedelta(minutes=item['duration'])
+            
+            # 转换为UTC时间字符串格式
+            dtstart = start_datetime.strftime('%Y%m%dT%H%M%S')
+            dtend = end_datetime.strftime('%Y%m%dT%H%M%S')
+            
+            # 创建唯一ID
+            uid = f"{dtstart}-{item['type']}-{hash(item['item']['name'])}@goalplanner"
+            
+            # 事件名称和描述
+            if item['type'] == 'task':
+                task_item = item['item']
+                summary = f"🎯 {task_item['name']}"
+                description = f"类型: 任务\\n"
+                description += f"优先级: {task_item.get('priority', 2)}\\n"
+                if task_item.get('preparation'):
+                    description += f"准备: {task_item['preparation']}\\n"
+                if task_item.get('guidance'):
+                    description += f"指导: {task_item['guidance']}\\n"
+            else:
+                activity_item = item['item']
+                summary = f"⏰ {activity_item['name']}"
+                description = "类型: 日常活动"
+            
+            # 添加事件
+            yield from [
+                "BEGIN:VEVENT",
+                f"UID:{uid}",
+                f"DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%SZ')}",
+                f"DTSTART:{dtstart}",
+                f"DTEND:{dtend}",
+                f"SUMMARY:{summary}",
+                f"DESCRIPTION:{description}",
+                "STATUS:CONFIRMED",
+                "TRANSP:OPAQUE",
+                "END:VEVENT",
+            ]
+    
+    # iCalendar结尾
+    yield "END:VCALENDAR"
@@ -0,0 +1,230 @@
+"""
+全文搜索
+
+对目标、任务和周任务的名称、描述、准备和指导字段建立倒排索引：中文等表意文字按字符二元组切分，
+不依赖分词；拉丁字母和数字按单词切分，查询时最后一个单词按前缀匹配。
+任务和周任务随变更入口增删（与 TaskStats 相同的 add / remove 接口），目标数量少，按记录指纹同步。
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from datetime import date
+from typing import List, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+from goal_planner.date_index import parse_date
+
+SEARCH_SOURCES = {
+    # 数据源 → (可搜索字段及权重, 日期字段)
+    'goals': ((('name', 3), ('description', 1)), 'deadline'),
+    'tasks': ((('name', 3), ('description', 1), ('preparation', 1), ('guidance', 1)), 'scheduledDate'),
+    'weekly_tasks': ((('name', 3), ('description', 1), ('preparation', 1), ('guidance', 1)), 'scheduledDate'),
+}
+SEARCH_PREFIX_LIMIT = 50          # 前缀最多展开的单词数
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+
+
+def _runs(text: str) -> Iterable[str]:
+    return _TOKEN_RE.findall(unicodedata.normalize('NFKC', text).lower())
+
+
+def _is_word(run: str) -> bool:
+    return run[0] < '\u0080'
+
+
+def tokenize(text: str) -> List[str]:
+    """索引用词项：拉丁单词，以及表意文字的字符二元组（单字成段时取该字）"""
+    terms = []
+    for run in _runs(text):
+        if _is_word(run) or len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def _is_completed(kind: str, record: Dict) -> bool:
+    if kind == 'goals':
+        return record.get('progress', 0) >= 100
+    return bool(record.get('completed'))
+
+
+class SearchIndex:
+    """目标、任务与周任务的倒排索引"""
+
+    def __init__(self, data: Optional[Dict[str, List[Dict]]] = None):
+        self.rebuild(data or {})
+
+    def rebuild(self, data: Dict[str, List[Dict]]):
+        """按完整数据重建索引"""
+        self._postings: Dict[str, Dict[int, int]] = {}    # 词项 → {文档号: 加权词频}
+        self._docs: Dict[int, Tuple[str, Dict, Tuple[str, ...]]] = {}  # 文档号 → (数据源, 记录, 词项)
+        self._keys: Dict[Tuple[str, Hashable], Tuple[int, int]] = {}  # (数据源, 记录 ID) → (文档号, 指纹)
+        self._counts: Dict[str, int] = {kind: 0 for kind in SEARCH_SOURCES}
+        self._next_doc = 0
+        self._words: Optional[List[str]] = None           # 拉丁单词有序表，前缀查询时按需重建
+        for kind in SEARCH_SOURCES:
+            for record in data.get(kind, []):
+                self.add(kind, record)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def fingerprint(kind: str, record: Dict) -> int:
+        fields, date_field = SEARCH_SOURCES[kind]
+        return hash(tuple(record.get(name) or '' for name, _ in fields)
+                    + (record.get('category'), record.get(date_field), _is_completed(kind, record)))
+
+    def sync(self, data: Dict[str, List[Dict]]) -> int:
+        """让 data 中出现的数据源与索引对齐，只处理新增、改动和删除的记录，返回变动的记录数"""
+        changed = 0
+        for kind in SEARCH_SOURCES:
+            if kind not in data:
+                continue
+            seen = set()
+            for record in data[kind]:
+                key = (kind, record['id'])
+                seen.add(key)
+                current = self._keys.get(key)
+                if current is not None and current[1] == self.fingerprint(kind, record):
+                    doc = current[0]
+                    if self._docs[doc][1] is not record:
+                        # 重新加载后内容相同的新对象，只替换引用
+                        self._docs[doc] = (kind, record, self._docs[doc][2])
+                    continue
+                self.add(kind, record)
+                changed += 1
+            if self._counts[kind] > len(seen):
+                for key in [k for k in self._keys if k[0] == kind and k not in seen]:
+                    self._remove(key)
+                    changed += 1
+        return changed
+
+    def add(self, kind: str, record: Dict):
+        """加入一条记录（已存在时替换）"""
+        self._remove((kind, record['id']))
+        self._add(kind, record)
+
+    def remove(self, kind: str, record: Dict):
+        """移出一条记录"""
+        self._remove((kind, record['id']))
+
+    def _add(self, kind: str, record: Dict):
+        doc = self._next_doc
+        self._next_doc += 1
+        weights: Dict[str, int] = {}
+        for name, weight in SEARCH_SOURCES[kind][0]:
+            for term in tokenize(record.get(name) or ''):
+                weights[term] = weights.get(term, 0) + weight
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if self._words is not None and _is_word(term):
+                    self._words = None
+            postings[doc] = weight
+        self._docs[doc] = (kind, record, tuple(weights))
+        self._keys[(kind, record['id'])] = (doc, self.fingerprint(kind, record))
+        self._counts[kind] += 1
+
+    def _remove(self, key: Tuple[str, Hashable]):
+        if key not in self._keys:
+            return
+        doc, _ = self._keys.pop(key)
+        self._counts[key[0]] -= 1
+        _, _, terms = self._docs.pop(doc)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        if self._words is None:
+            self._words = sorted(t for t in self._postings if _is_word(t))
+        start = bisect_left(self._words, prefix)
+        terms = []
+        for term in self._words[start:start + SEARCH_PREFIX_LIMIT]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _query_groups(self, query: str) -> List[List[str]]:
+        """查询拆成若干组，组内任一词项命中即可，各组之间取交集"""
+        runs = _runs(query)
+        groups = []
+        for i, run in enumerate(runs):
+            if _is_word(run):
+                # 最后一个单词可能还没输完，按前缀匹配
+                groups.append(self._prefix_terms(run) if i == len(runs) - 1 else [run])
+            elif len(run) == 1:
+                groups.append([run] + self._postings_for_char(run))
+            else:
+                groups.extend([run[j:j + 2]] for j in range(len(run) - 1))
+        return groups
+
+    def _postings_for_char(self, char: str) -> List[str]:
+        # 单个汉字查询：索引里只有二元组，需要匹配所有含该字的二元组
+        return [t for t in self._postings if len(t) == 2 and char in t and not _is_word(t)]
+
+    def search(self, query: str = '', kinds: Sequence[str] = tuple(SEARCH_SOURCES),
+               category: Optional[str] = None, start: Optional[date] = None, end: Optional[date] = None,
+               completed: Optional[bool] = None, limit: int = 50) -> List[Tuple[float, str, Dict]]:
+        """按相关度返回 (得分, 数据源, 记录)；查询为空时按日期列出满足筛选条件的记录"""
+        def accept(kind: str, record: Dict) -> bool:
+            if kind not in kinds:
+                return False
+            if category and (record.get('category') or '未分类') != category:
+                return False
+            if completed is not None and _is_completed(kind, record) != completed:
+                return False
+            if start or end:
+                day = parse_date(record.get(SEARCH_SOURCES[kind][1]) or '')
+                if day is None or (start and day < start) or (end and day > end):
+                    return False
+            return True
+
+        groups = self._query_groups(query)
+        if not groups:
+            hits = [(0.0, kind, record) for kind, record, _ in self._docs.values() if accept(kind, record)]
+            hits.sort(key=lambda hit: hit[2].get(SEARCH_SOURCES[hit[1]][1]) or '9999')
+            return hits[:limit]
+
+        total = len(self._docs) or 1
+        scored: List[Dict[int, float]] = []
+        for terms in groups:
+            merged: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term, {})
+                idf = math.log(1 + total / (1 + len(postings)))
+                for doc, weight in postings.items():
+                    score = weight * idf
+                    if score > merged.get(doc, 0):
+                        merged[doc] = score
+            if not merged:
+                return []
+            scored.append(merged)
+
+        # 从最短的组开始求交集
+        scored.sort(key=len)
+        candidates = scored[0]
+        for merged in scored[1:]:
+            candidates = {doc: score + merged[doc] for doc, score in candidates.items() if doc in merged}
+            if not candidates:
+                return []
+
+        hits = []
+        for doc, score in candidates.items():
+            kind, record, _ = self._docs[doc]
+            if accept(kind, record):
+                hits.append((score, kind, record))
+        return heapq.nlargest(limit, hits, key=lambda hit: hit[0])
+
+    def categories(self) -> List[str]:
+        """已索引记录中出现的分类"""
+        return sorted({record.get('category') or '未分类' for _, record, _ in self._docs.values()})
@@ -0,0 +1,163 @@
+"""
+会话状态
+
+核心逻辑读写的状态对象：界面直接传入 st.session_state，脚本、测试和工作进程使用 PlannerState。
+两者都支持属性访问、下标访问、in 和 get()，存储、日程和 AI 客户端模块因此都不依赖 Streamlit。
+任务的增改经过 add_task / update_task，以便同步维护统计、日期索引和搜索索引。
+
+界面的各个会话引用进程内共享的同一份数据（见 storage.SharedStore），shared_keys 列出仍在引用共享数据的键。
+共享的列表和记录只读：原地修改前经 writable() 复制出本会话的副本（写时复制），只浏览的会话不占额外内存。
+"""
+
+from datetime import datetime
+from typing import Any, Callable, List, Dict
+
+from goal_planner.date_index import DateIndex
+from goal_planner.stats import TASK_KINDS, TaskStats
+
+DEFAULT_PROFILE = 'default'
+
+DATA_KEYS = (
+    # 保存到数据文件的状态键
+    'goals', 'tasks', 'weekly_tasks', 'activities', 'insights', 'schedule', 'weekly_schedule', 'insights_snapshot'
+)
+
+
+def default_api_configs() -> Dict[str, Dict[str, str]]:
+    """各提供商的默认模型与接口地址，API Key 为空"""
+    return {
+        'claude': {'api_key': '', 'model': 'claude-3-5-sonnet-20241022'},
+        'openai': {'api_key': '', 'model': 'gpt-4o'},
+        'qwen': {'api_key': '', 'model': 'qwen-max', 'base_url': 'https://dashscope.aliyuncs.com/compatible-mode/v1'},
+        'deepseek': {'api_key': '', 'model': 'deepseek-chat', 'base_url': 'https://api.deepseek.com/v1'}
+    }
+
+
+STATE_DEFAULTS: Dict[str, Callable[[], Any]] = {
+    'goals': list,
+    'tasks': list,
+    'weekly_tasks': list,
+    'activities': list,
+    'insights': list,
+    'schedule': list,
+    'weekly_schedule': dict,               # 日期 → 当天日程
+    'insights_snapshot': lambda: None,     # 上次 AI 洞察时的数据快照与结果
+    'api_enabled': lambda: False,
+    'ai_provider': lambda: 'claude',
+    'api_configs': default_api_configs,
+    'routing_mode': lambda: 'fixed',
+    'provider_stats': dict,                # 各提供商的滚动延迟与错误记录
+    'task_stats': TaskStats,               # 任务计数，随每次变更增量维护
+    'date_index': DateIndex,               # 待办任务按计划日期排序的索引
+    'search_index': lambda: None,          # 全文搜索索引，第一次搜索时建立
+    'data_file_signature': lambda: None,   # 上次读写数据文件时的修改时间、大小和 inode
+    'data_file_base': lambda: None,        # 上次读写数据文件时的数据，保存时作为三方合并的基线
+    'shared_keys': set,                    # 仍引用进程共享快照的数据键，修改前需要复制
+    'profile': lambda: DEFAULT_PROFILE,    # 当前档案，决定读写哪个数据分片
+}
+
+
+class PlannerState(dict):
+    """不依赖 Streamlit 的状态对象，接口与 st.session_state 一致"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        init_state(self)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name: str, value: Any):
+        self[name] = value
+
+    def __delattr__(self, name: str):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def init_state(state) -> Any:
+    """补齐核心逻辑用到的状态键，已有的值保持不变"""
+    for key, factory in STATE_DEFAULTS.items():
+        if key not in state:
+            state[key] = factory()
+    return state
+
+
+def task_data(state) -> Dict[str, List[Dict]]:
+    """任务与周任务"""
+    return {
+        'tasks': state.tasks,
+        'weekly_tasks': state.get('weekly_tasks', [])
+    }
+
+
+def insights_data(state) -> Dict[str, List[Dict]]:
+    """洞察分析所关注的数据"""
+    return {
+        'goals': state.goals,
+        'tasks': state.tasks,
+        'weekly_tasks': state.get('weekly_tasks', []),
+        'activities': state.activities
+    }
+
+
+# 数据变更：任务的增改都经过这里，以便同步维护统计和日期索引
+def task_indexes(state) -> List:
+    indexes = [state.task_stats, state.date_index]
+    if state.get('search_index') is not None:
+        indexes.append(state.search_index)
+    return indexes
+
+
+def refresh_task_indexes(state):
+    """整表替换任务数据后重建统计和日期索引（日期只在这里和新增任务时解析）
+
+    总是新建索引对象，原来的索引可能与其他会话共享。
+    """
+    data = task_data(state)
+    state.search_index = None  # 搜索索引同时包含目标，下次搜索时整体重建
+    state.task_stats = TaskStats()
+    state.date_index = DateIndex()
+    for index in task_indexes(state):
+        index.rebuild(data)
+
+
+def writable(state, kind: str) -> List[Dict]:
+    """返回可以原地修改的记录列表；仍引用共享快照时先复制列表和记录，任务还要重建本会话的索引"""
+    shared = state.get('shared_keys')
+    if shared and kind in shared:
+        state[kind] = [dict(record) for record in state[kind]]
+        shared.discard(kind)
+        if kind in TASK_KINDS:
+            refresh_task_indexes(state)
+    return state[kind]
+
+
+def add_task(state, task: Dict, kind: str = 'tasks'):
+    """新增任务或周任务"""
+    writable(state, kind).append(task)
+    for index in task_indexes(state):
+        index.add(kind, task)
+
+
+def update_task(state, task: Dict, kind: str = 'tasks', **changes) -> Dict:
+    """修改任务字段，统计和索引按修改前后的差异更新；返回实际修改的记录（共享记录会先被复制）
+
+    完成状态变化时同时记录或清除 completedAt，归档按它判断完成了多久。
+    """
+    if 'completed' in changes and bool(changes['completed']) != bool(task.get('completed')):
+        changes['completedAt'] = datetime.now().isoformat() if changes['completed'] else None
+    if kind in state.get('shared_keys', ()):
+        task_id = task['id']
+        task = next(t for t in writable(state, kind) if t['id'] == task_id)
+    for index in task_indexes(state):
+        index.remove(kind, task)
+    task.update(changes)
+    for index in task_indexes(state):
+        index.add(kind, task)
+    return task
@@ -0,0 +1,87 @@
+"""
+任务统计
+
+按分类、目标和日期维护待办 / 已完成计数，以及按加入顺序排列的待办任务。
+每次变更只按变更前后的记录增减计数，读取统计与任务总数无关；整表替换时调用 rebuild()。
+"""
+
+from typing import Any, List, Dict, Hashable, Optional
+
+TASK_KINDS = ('tasks', 'weekly_tasks')
+
+
+class TaskStats:
+    """任务与周任务的增量统计"""
+
+    def __init__(self):
+        self.rebuild({})
+
+    def rebuild(self, data: Dict[str, List[Dict]]):
+        """按完整数据重新计算，用于加载或导入数据之后"""
+        self.total = {kind: 0 for kind in TASK_KINDS}
+        self.completed = {kind: 0 for kind in TASK_KINDS}
+        self.by_category: Dict[str, List[int]] = {}   # 分类 → [待办数, 已完成数]
+        self.by_goal: Dict[Hashable, List[int]] = {}  # 目标 ID → [待办数, 已完成数]
+        self.by_date: Dict[str, List[int]] = {}       # 计划日期 → [待办数, 已完成数]
+        self._open: Dict[str, Dict[Hashable, Dict]] = {kind: {} for kind in TASK_KINDS}
+        for kind in TASK_KINDS:
+            for task in data.get(kind, []):
+                self.add(kind, task)
+
+    def add(self, kind: str, task: Dict):
+        """计入一条任务"""
+        self._apply(kind, task, 1)
+
+    def remove(self, kind: str, task: Dict):
+        """移除一条任务（按其当前字段）"""
+        self._apply(kind, task, -1)
+
+    def _apply(self, kind: str, task: Dict, sign: int):
+        done = 1 if task.get('completed') else 0
+        self.total[kind] += sign
+        self.completed[kind] += sign * done
+        for counts, key in ((self.by_category, task.get('category') or '未分类'),
+                            (self.by_goal, task.get('goalId')),
+                            (self.by_date, task.get('scheduledDate') or '')):
+            if key is None:
+                continue
+            entry = counts.setdefault(key, [0, 0])
+            entry[done] += sign
+            if entry == [0, 0]:
+                del counts[key]
+        if done:
+            return
+        if sign > 0:
+            self._open[kind][task['id']] = task
+        else:
+            self._open[kind].pop(task['id'], None)
+
+    def open_count(self, kind: Optional[str] = None) -> int:
+        """待办数量，kind 为空时合计任务和周任务"""
+        kinds = TASK_KINDS if kind is None else (kind,)
+        return sum(self.total[k] - self.completed[k] for k in kinds)
+
+    def completion_rate(self, kind: str = 'tasks') -> float:
+        """完成率（0-100）"""
+        return self.completed[kind] / self.total[kind] * 100 if self.total[kind] else 0
+
+    def first_open(self, kind: str = 'tasks', limit: int = 5) -> List[Dict]:
+        """按加入顺序取前几条待办任务"""
+        result = []
+        for task in self._open[kind].values():
+            if len(result) >= limit:
+                break
+            result.append(task)
+        return result
+
+    def open_task(self, kind: str, task_id: Hashable) -> Optional[Dict]:
+        """按 ID 取待办任务，已完成或不存在时返回 None"""
+        return self._open[kind].get(task_id)
+
+    def open_tasks(self, kind: str = 'tasks') -> List[Dict]:
+        """全部待办任务"""
+        return list(self._open[kind].values())
+
+    def goal_counts(self, goal_id: Any) -> List[int]:
+        """某个目标关联的 [待办数, 已完成数]"""
+        return self.by_goal.get(goal_id, [0, 0])
@@ -0,0 +1,268 @@
+"""
+数据存储
+
+把状态对象中的目标、任务、活动、日程和洞察保存为 JSON 数据文件。读取时比较文件的修改时间和大小，
+文件自上次读写以来没有变化就沿用状态中的数据，整表替换后重建任务统计和索引。
+
+多个会话共用一个数据文件：保存时持有文件锁，文件自上次读写后被别人改过就先按记录版本号三方合并
+（见 merge 模块），再写入临时文件并原子替换，读者不会看到写了一半的文件。
+
+SharedStore 在进程内按文件版本缓存解析后的数据和任务索引，各会话加载时直接引用同一份快照，
+修改时才复制出自己的副本（见 state.writable），保存后把本会话数据的副本发布为新快照。
+
+每个用户或工作区是一个档案（profile），数据分片保存在 goal_planner_profiles/<档案>/ 下，
+默认档案沿用根目录的 goal_planner_data.json。文件锁和快照都按分片区分，不同档案互不等待。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from goal_planner.merge import RECORD_KINDS, merge_data, snapshot, stamp_versions
+from goal_planner.state import DATA_KEYS, DEFAULT_PROFILE, STATE_DEFAULTS, PlannerState, refresh_task_indexes
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_FILE = "goal_planner_data.json"
+PROFILES_DIR = "goal_planner_profiles"
+PROFILE_NAME_PATTERN = re.compile(r'[\w-]{1,64}')   # 字母、数字、汉字、下划线和连字符
+LOCK_TIMEOUT = 10                 # 等待文件锁的最长秒数
+LOCK_POLL_INTERVAL = 0.01
+SHARED_SNAPSHOTS_MAX = 32         # 进程内最多缓存的分片快照数，超出时淘汰最久未访问的
+
+
+def check_profile(profile: str) -> str:
+    """校验档案名，不合法时抛出 ValueError"""
+    if not PROFILE_NAME_PATTERN.fullmatch(profile or ''):
+        raise ValueError(f"档案名只能包含字母、数字、汉字、下划线和连字符（最多 64 个字符）: {profile!r}")
+    return profile
+
+
+def profile_path(profile: str = DEFAULT_PROFILE, filename: str = DATA_FILE, root: str = PROFILES_DIR) -> str:
+    """档案的数据文件（或同目录下的其它文件，如批量队列）路径"""
+    if check_profile(profile) == DEFAULT_PROFILE:
+        return filename
+    return os.path.join(root, profile, filename)
+
+
+def list_profiles(root: str = PROFILES_DIR) -> List[str]:
+    """已有的档案，默认档案排在最前"""
+    try:
+        names = sorted(entry.name for entry in os.scandir(root)
+                       if entry.is_dir() and PROFILE_NAME_PATTERN.fullmatch(entry.name))
+    except OSError:
+        names = []
+    return [DEFAULT_PROFILE] + [name for name in names if name != DEFAULT_PROFILE]
+
+
+def data_file_signature(path: str = DATA_FILE) -> Optional[Tuple[int, int, int]]:
+    """数据文件的修改时间、大小和 inode，用于判断文件是否被其他会话或批量任务改过"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+@contextmanager
+def file_lock(path: str = DATA_FILE, timeout: float = LOCK_TIMEOUT):
+    """数据文件的跨进程互斥锁（锁文件为 path.lock），只在读-合并-写期间持有；超时抛出 TimeoutError"""
+    with open(f"{path}.lock", 'a+b') as lock:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待数据文件锁超时: {path}") from None
+                time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_json_atomic(path: str, data, **kwargs):
+    """先写临时文件再替换，写入中途失败不会损坏原文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def state_data(state) -> Dict:
+    """状态中需要保存的数据"""
+    return {
+        'goals': state.goals,
+        'tasks': state.tasks,
+        'weekly_tasks': state.get('weekly_tasks', []),
+        'activities': state.activities,
+        'insights': state.insights,
+        'schedule': state.schedule,
+        'weekly_schedule': state.get('weekly_schedule', {}),
+        'insights_snapshot': state.get('insights_snapshot'),
+        'saved_at': datetime.now().isoformat()
+    }
+
+
+def save_state(state, path: str = DATA_FILE, store: Optional['SharedStore'] = None) -> List[Dict]:
+    """保存数据到文件，返回与其他会话修改冲突的记录（以本会话为准）
+
+    文件自上次读写后被别人改过时，先把别人的修改合并进状态再写入；指定 store 时把保存后的数据发布为共享快照。
+    """
+    base = state.get('data_file_base') or snapshot({key: STATE_DEFAULTS[key]() for key in DATA_KEYS}, DATA_KEYS)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with file_lock(path):
+        for kind in RECORD_KINDS:
+            stamp_versions(state[kind], base.get(kind) or {})
+        conflicts = []
+        signature = data_file_signature(path)
+        if signature is not None and signature != state.get('data_file_signature'):
+            with open(path, 'r', encoding='utf-8') as f:
+                theirs = json.load(f)
+            merged, conflicts = merge_data(base, state, theirs, DATA_KEYS)
+            for key in DATA_KEYS:
+                state[key] = merged[key]
+            refresh_task_indexes(state)
+        write_json_atomic(path, state_data(state), indent=2)
+        state.data_file_signature = data_file_signature(path)
+    state.data_file_base = snapshot(state, DATA_KEYS)
+    if store is not None:
+        store.publish(path, state)
+    return conflicts
+
+
+def apply_data(state, data: Dict):
+    """用数据文件的内容整体替换状态中的数据"""
+    for key in DATA_KEYS:
+        state[key] = data.get(key, STATE_DEFAULTS[key]())
+    refresh_task_indexes(state)
+    state.data_file_base = snapshot(state, DATA_KEYS)
+    state.shared_keys = set()
+
+
+def load_state(state, path: str = DATA_FILE, store: Optional['SharedStore'] = None) -> bool:
+    """从文件加载数据，返回是否重新读取；文件不存在或没有变化时沿用状态中的数据，文件损坏时抛出异常
+
+    指定 store 时引用进程共享的快照，不为本会话单独解析文件。
+    """
+    if store is not None:
+        shared = store.get(path)
+        if shared is None or shared['signature'] == state.get('data_file_signature'):
+            return False
+        store.attach(state, shared)
+        return True
+
+    signature = data_file_signature(path)
+    if signature is None or signature == state.get('data_file_signature'):
+        return False
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    apply_data(state, data)
+    state.data_file_signature = signature
+    return True
+
+
+class SharedStore:
+    """进程内共享的只读数据快照，每个数据文件保留最新版本；界面用 st.cache_resource 持有一个实例
+
+    只在会话访问某个分片时才解析它；每个分片一把锁，解析一个档案时不阻塞其它档案的会话。
+    """
+
+    def __init__(self, max_snapshots: int = SHARED_SNAPSHOTS_MAX):
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()                     # 只保护下面两个字典
+        self._path_locks: Dict[str, threading.Lock] = {}
+        self._snapshots: 'OrderedDict[str, Dict]' = OrderedDict()
+
+    def _path_lock(self, path: str) -> threading.Lock:
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def get(self, path: str = DATA_FILE) -> Optional[Dict]:
+        """数据文件当前版本的快照，文件变化后第一次访问时重新解析；文件不存在时返回 None"""
+        with self._path_lock(path):
+            signature = data_file_signature(path)
+            if signature is None:
+                return None
+            with self._lock:
+                shared = self._snapshots.get(path)
+            if shared is None or shared['signature'] != signature:
+                state = PlannerState()
+                with open(path, 'r', encoding='utf-8') as f:
+                    apply_data(state, json.load(f))
+                state.data_file_signature = signature
+                shared = self._store(path, state)
+            else:
+                with self._lock:
+                    self._snapshots.move_to_end(path)
+            return shared
+
+    def publish(self, path: str, state):
+        """保存后把会话数据的副本发布为共享快照
+
+        保存的会话继续使用并原地修改自己的列表和索引，只有之后引用快照的会话才写时复制。
+        日程、洞察等其它数据总是整体替换、不会原地修改，直接引用。
+        """
+        frozen = PlannerState()
+        for key in DATA_KEYS:
+            frozen[key] = [dict(record) for record in state[key]] if key in RECORD_KINDS else state[key]
+        refresh_task_indexes(frozen)
+        frozen.data_file_base = state.data_file_base
+        frozen.data_file_signature = state.data_file_signature
+        with self._path_lock(path):
+            self._store(path, frozen)
+
+    def _store(self, path: str, state) -> Dict:
+        shared = {
+            'signature': state.data_file_signature,
+            'data': {key: state[key] for key in DATA_KEYS},
+            'base': state.data_file_base,
+            'task_stats': state.task_stats,
+            'date_index': state.date_index,
+        }
+        with self._lock:
+            self._snapshots[path] = shared
+            self._snapshots.move_to_end(path)
+            while len(self._snapshots) > self.max_snapshots:
+                # 被淘汰的快照仍由正在使用它的会话引用，下次访问该分片时重新解析
+                self._snapshots.popitem(last=False)
+        return shared
+
+    @staticmethod
+    def attach(state, shared: Dict):
+        """让会话引用快照：数据、索引和合并基线都不复制"""
+        for key in DATA_KEYS:
+            state[key] = shared['data'][key]
+        state.task_stats = shared['task_stats']
+        state.date_index = shared['date_index']
+        state.search_index = None
+        state.data_file_base = shared['base']
+        state.data_file_signature = shared['signature']
+        state.shared_keys = set(DATA_KEYS)
+
+
+def switch_profile(state, profile: str):
+    """切换会话的档案：清空当前数据，下次 load_state 时只加载新档案的分片"""
+    state.profile = check_profile(profile)
+    apply_data(state, {})
+    state.data_file_signature = None
@@ -12,11 +12,13 @@ setup(
     author="Your Name",
     author_email="your.email@example.com",
     py_modules=['goal_planner_python'],
+    packages=find_packages(include=['goal_planner']),
     install_requires=[
         'streamlit>=1.50.0',
         'anthropic>=0.69.0',
         'openai>=1.0.0',
         'requests>=2.31.0',
+        'numpy>=1.23.0',
     ],
     python_requires='>=3.8',
     entry_points={
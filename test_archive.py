@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 完成任务归档测试脚本
+
+测试：
+1. 完成状态变化时记录 completedAt
+2. 完成较久的任务按月份追加到压缩归档，并移出数据文件
+3. 按日期范围查询和按月汇总归档，重复归档的记录去重
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import date, datetime
+
+from goal_planner.archive import (
+    archive_completed, archive_dir, list_partitions, main, partitions_signature, query_archive, summarize_archive,
+)
+from goal_planner.models import task_record
+from goal_planner.state import PlannerState, add_task, update_task
+from goal_planner.storage import load_state, save_state
+
+
+def _state_with_history() -> PlannerState:
+    state = PlannerState()
+    now = datetime(2026, 10, 1)
+    done = [('一月任务', '2026-01-05T10:00:00'), ('一月任务2', '2026-01-20T10:00:00'), ('三月任务', '2026-03-02T09:00:00'),
+            ('上周任务', '2026-10-12T09:00:00')]
+    for i, (name, completed_at) in enumerate(done):
+        add_task(state, task_record({'name': name, 'estimatedTime': 30, 'completed': True, 'completedAt': completed_at},
+                                    now, offset=i), 'tasks')
+    add_task(state, task_record({'name': '待办', 'scheduledDate': '2026-01-01'}, now, offset=10), 'tasks')
+    # 早期数据没有 completedAt，按计划日期判断
+    add_task(state, {'id': 'w1', 'name': '旧周任务', 'completed': True, 'scheduledDate': '2026-03-15', 'estimatedTime': 90},
+             'weekly_tasks')
+    return state
+
+
+def test_completed_at():
+    """测试完成时间戳"""
+    print("✅ 测试: 完成时间戳")
+
+    state = PlannerState()
+    task = task_record({'name': '任务'})
+    add_task(state, task)
+    assert 'completedAt' not in task
+    update_task(state, task, completed=True)
+    assert task['completedAt'].startswith(date.today().isoformat()), task
+    update_task(state, task, priority=1)
+    assert task['completedAt'], "修改其它字段不应改变完成时间"
+    update_task(state, task, completed=False)
+    assert task['completedAt'] is None
+
+    print("  ✅ 完成时记录时间，取消完成时清除\n")
+
+
+def test_archive_completed():
+    """测试归档"""
+    print("✅ 测试: 归档完成较久的任务")
+
+    data_file = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    state = _state_with_history()
+    archived = archive_completed(state, data_file, 30, today=date(2026, 10, 19))
+    save_state(state, data_file)
+
+    assert archived == 4, archived
+    assert [t['name'] for t in state.tasks] == ['上周任务', '待办'] and state.weekly_tasks == []
+    assert state.task_stats.total['tasks'] == 2, "归档后应重建统计"
+    assert [month for month, _ in list_partitions(data_file)] == ['2026-01', '2026-03']
+    assert os.path.dirname(list_partitions(data_file)[0][1]) == archive_dir(data_file)
+
+    reloaded = PlannerState()
+    load_state(reloaded, data_file)
+    assert len(reloaded.tasks) == 2, "数据文件中不再包含已归档的任务"
+    assert archive_completed(reloaded, data_file, 30, today=date(2026, 10, 19)) == 0
+
+    print("  ✅ 4 条任务写入 2 个月份分区，数据文件只保留近期任务\n")
+
+
+def test_query_archive():
+    """测试查询与汇总"""
+    print("✅ 测试: 查询与汇总")
+
+    data_file = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    assert partitions_signature(data_file) == ()
+    archive_completed(_state_with_history(), data_file, 30, today=date(2026, 10, 19))
+    signature = partitions_signature(data_file)
+    assert [month for month, _, _ in signature] == ['2026-01', '2026-03']
+    # 模拟保存数据文件前中断：同样的记录再归档一次，追加为新的 gzip 成员
+    archive_completed(_state_with_history(), data_file, 30, today=date(2026, 10, 19))
+    with gzip.open(list_partitions(data_file)[0][1], 'rt', encoding='utf-8') as f:
+        assert len(f.readlines()) == 4, "归档只追加"
+    assert partitions_signature(data_file) != signature, "追加后汇总缓存应失效"
+
+    names = [e['record']['name'] for e in query_archive(data_file)]
+    assert sorted(names) == ['一月任务', '一月任务2', '三月任务', '旧周任务'], names
+    january = [e['record']['name'] for e in query_archive(data_file, date(2026, 1, 10), date(2026, 1, 31))]
+    assert january == ['一月任务2'], january
+    assert [e['kind'] for e in query_archive(data_file, kinds=['weekly_tasks'])] == ['weekly_tasks']
+
+    summary = summarize_archive(data_file)
+    assert summary == [
+        {'month': '2026-01', 'tasks': 2, 'weekly_tasks': 0, 'minutes': 60},
+        {'month': '2026-03', 'tasks': 1, 'weekly_tasks': 1, 'minutes': 120},
+    ], summary
+
+    assert main(['--data', data_file, 'summary', '--start', '2026-03-01']) == 0
+
+    print("  ✅ 只读取范围内的分区，重复记录去重\n")
+
+
+def test_archive_cli():
+    """测试命令行归档"""
+    print("✅ 测试: 命令行归档")
+
+    data_file = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    save_state(_state_with_history(), data_file)
+    assert main(['--data', data_file, 'run', '--days', '30']) == 0
+    with open(data_file, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    names = [t['name'] for t in saved['tasks']]
+    assert '待办' in names and '一月任务' not in names and not saved['weekly_tasks'], names
+
+    print("  ✅ run 归档后写回数据文件\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 完成任务归档测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_completed_at()
+        test_archive_completed()
+        test_query_archive()
+        test_archive_cli()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 批量处理测试脚本
+
+使用本地模拟服务测试离线批量流程：
+1. 排队（目标分解、洞察分析）
+2. 通过 Anthropic 与 OpenAI 批量接口提交
+3. 轮询收取结果并合并到数据文件
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from goal_planner import batch
+from goal_planner.batch_stub import start_server
+
+
+def _sample_data():
+    return {
+        'goals': [
+            {'id': 1, 'name': '学会游泳', 'type': '年度目标', 'category': '健康', 'deadline': '2030-12-31', 'progress': 0},
+            {'id': 2, 'name': '读完十本书', 'type': '季度目标', 'category': '学习', 'deadline': '2030-03-31', 'progress': 0}
+        ],
+        'tasks': [],
+        'weekly_tasks': [],
+        'activities': [],
+        'insights': [],
+        'settings': {'keep': True}
+    }
+
+
+def _run_provider(provider: str, base_url: str):
+    tmp_dir = tempfile.mkdtemp()
+    data_file = os.path.join(tmp_dir, 'data.json')
+    try:
+        with open(data_file, 'w', encoding='utf-8') as f:
+            json.dump(_sample_data(), f, ensure_ascii=False)
+
+        queue_file = os.path.join(tmp_dir, batch.BATCH_FILE)
+        data = batch.load_json_file(data_file, {})
+        with batch.locked_queue(queue_file) as queue:
+            assert len(batch.enqueue_breakdowns(queue, data)) == 2
+        with batch.locked_queue(queue_file) as queue:
+            assert batch.enqueue_breakdowns(queue, data) == [], "同一目标不应重复排队"
+            batch.enqueue_insights(queue, data, provider)
+
+        config = batch.provider_config(provider, 'test-key', base_url=base_url)
+        submitted = batch.submit_pending(queue, provider, config)
+        assert len(submitted['requests']) == 3
+        assert queue['pending'] == []
+        assert 'test-key' not in json.dumps(queue), "API Key 不应写入队列文件"
+
+        # 模拟服务在延迟后才完成批次
+        assert batch.poll_batches(queue, data_file, {provider: 'test-key'}) == [f"{submitted['id']}: {submitted['status']}"]
+        time.sleep(0.3)
+        log = batch.poll_batches(queue, data_file, {provider: 'test-key'})
+        assert len(log) == 3, log
+        assert queue['batches'][0]['mergedAt']
+
+        merged = batch.load_json_file(data_file, {})
+        assert len(merged['goals']) == 4
+        assert {g.get('parentGoalId') for g in merged['goals'][2:]} == {1, 2}
+        assert all(g['type'] in ('长期', '年度', '季度', '月度', '周') for g in merged['goals'][2:]), "子目标类型应为界面可编辑的类型"
+        assert {t['goalId'] for t in merged['weekly_tasks']} == {1, 2}
+        assert len(merged['insights']) == 1
+        assert merged['insights_snapshot']['insights'] == merged['insights']
+        assert merged['settings'] == {'keep': True}, "合并时应保留其它数据"
+
+        assert batch.poll_batches(queue, data_file) == [], "已合并的批次不应重复处理"
+        print(f"  {provider}: {len(log)} 个结果已合并")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_batch_round_trip():
+    """测试通过模拟服务提交并合并批次"""
+    print("✅ 测试: 批量提交与合并")
+
+    server = start_server(delay=0.2)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        _run_provider('claude', base_url)
+        _run_provider('openai', f"{base_url}/v1")
+    finally:
+        server.shutdown()
+
+    print("  ✅ 批量流程正常\n")
+
+
+def test_unsupported_provider():
+    """测试不支持批量接口的提供商"""
+    print("✅ 测试: 不支持的提供商")
+
+    try:
+        batch.provider_config('deepseek', 'test-key')
+        assert False, "DeepSeek 应被拒绝"
+    except ValueError:
+        pass
+
+    print("  ✅ 已拒绝不支持的提供商\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 批量处理测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_batch_round_trip()
+        test_unsupported_provider()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
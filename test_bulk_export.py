@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 批量日程导出测试脚本
+
+测试：
+1. 目录展开与输出路径
+2. 进程池批量生成日程和 .ics，损坏的文件单独报告
+"""
+
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+
+from goal_planner.bulk_export import find_data_files, ics_path, main
+
+
+def _write_data(path: str, tasks: int):
+    today = date.today()
+    data = {
+        'goals': [],
+        'tasks': [
+            {'id': i, 'name': f"任务{i}", 'priority': 2, 'estimatedTime': 60,
+             'scheduledDate': (today + timedelta(days=i % 3)).isoformat(), 'completed': False}
+            for i in range(tasks)
+        ],
+        'activities': [{'id': 1, 'name': '午餐', 'startTime': '12:00', 'duration': 60}]
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def test_find_data_files():
+    """测试目录展开"""
+    print("✅ 测试: 目录展开与输出路径")
+
+    root = tempfile.mkdtemp()
+    _write_data(os.path.join(root, 'alice', 'goal_planner_data.json'), 1)
+    _write_data(os.path.join(root, 'bob', 'goal_planner_data.json'), 1)
+    single = os.path.join(root, 'alice', 'goal_planner_data.json')
+    # 同目录的批量任务队列等 JSON 文件不是数据文件
+    for name in ['goal_planner_batches.json', 'export.json']:
+        with open(os.path.join(root, 'alice', name), 'w', encoding='utf-8') as f:
+            f.write('{}')
+
+    jobs = list(find_data_files([root, single]))
+    assert [job['relative'] for job in jobs] == [
+        os.path.join('alice', 'goal_planner_data.json'), os.path.join('bob', 'goal_planner_data.json')
+    ], jobs
+    assert ics_path(jobs[1], 'out') == os.path.join('out', 'bob', 'goal_planner_data.ics')
+    assert ics_path(jobs[1], None) == os.path.join(root, 'bob', 'goal_planner_data.ics')
+
+    print("  ✅ 默认只查找数据文件，重复的文件只处理一次，输出保留目录结构\n")
+
+
+def test_bulk_export():
+    """测试批量导出"""
+    print("✅ 测试: 批量生成日程与导出")
+
+    root = tempfile.mkdtemp()
+    for i in range(4):
+        _write_data(os.path.join(root, 'team', f"p{i}.json"), 5)
+    with open(os.path.join(root, 'team', 'broken.json'), 'w', encoding='utf-8') as f:
+        f.write('{broken')
+    out = os.path.join(root, 'out')
+
+    code = main([os.path.join(root, 'team'), '--days', '3', '--out', out, '--workers', '2', '--save',
+                 '--pattern', '*.json'])
+    assert code == 1, "有文件失败时应返回非零退出码"
+
+    for i in range(4):
+        with open(os.path.join(out, f"p{i}.ics"), 'r', encoding='utf-8') as f:
+            content = f.read()
+        # 每天一个午餐活动，5 个任务分布在 3 天内
+        assert content.count("BEGIN:VEVENT") == 3 + 5, content.count("BEGIN:VEVENT")
+        with open(os.path.join(root, 'team', f"p{i}.json"), 'r', encoding='utf-8') as f:
+            assert len(json.load(f)['weekly_schedule']) == 3, "--save 应写回日程"
+    assert not os.path.exists(os.path.join(out, 'broken.ics')), "损坏的文件不应生成 .ics"
+
+    print("  ✅ 每个文件生成 N 日日程和 .ics，损坏文件不影响其它文件\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 批量日程导出测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_find_data_files()
+        test_bulk_export()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 紧凑渲染测试脚本
+
+测试日程与洞察的整段 HTML 渲染：
+1. 用户输入被转义
+2. 相同内容命中缓存，内容变化后重新生成
+"""
+
+from goal_planner import render
+
+
+def test_schedule_html():
+    """测试日程时间线 HTML"""
+    print("✅ 测试: 日程时间线")
+
+    items = [
+        {'type': 'task', 'startTime': 480, 'duration': 30, 'item': {'name': '<b>写周报</b>', 'priority': 3}},
+        {'type': 'activity', 'startTime': 720, 'duration': 60, 'item': {'name': '午饭'}}
+    ]
+    html = render.schedule_html(items, '周一')
+    assert '&lt;b&gt;写周报&lt;/b&gt;' in html, "任务名应被转义"
+    assert '08:00 - 08:30' in html and '12:00 - 13:00' in html
+    assert '\n' not in html, "整段 HTML 不应包含换行，避免被 Markdown 解析为代码块"
+    assert '该日暂无安排' in render.schedule_html([], '周二')
+
+    print("  ✅ 时间线内容正确\n")
+
+
+def test_html_cache():
+    """测试按内容哈希缓存"""
+    print("✅ 测试: 内容缓存")
+
+    insights = [{'type': 'warning', 'title': '任务已逾期', 'description': 'a & b', 'actionable': '重新安排'}]
+    first = render.insights_html(insights, detailed=True)
+    assert render.insights_html(insights, detailed=True) is first, "相同内容应直接返回缓存"
+    assert 'a &amp; b' in first and '重新安排' in first
+    assert '重新安排' not in render.insights_html(insights), "非详细模式不显示建议"
+
+    insights[0]['title'] = '已更新'
+    assert '已更新' in render.insights_html(insights, detailed=True), "内容变化后应重新生成"
+
+    print("  ✅ 缓存命中与失效正确\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 紧凑渲染测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_schedule_html()
+        test_html_cache()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 多会话并发保存测试脚本
+
+测试：
+1. 两个会话修改不同记录或同一记录的不同字段，保存后互不覆盖
+2. 同一字段的冲突以后保存的会话为准并报告，删除与修改同时发生时保留修改
+3. 多个进程同时保存，文件锁保证没有修改丢失
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from goal_planner.models import task_record
+from goal_planner.state import PlannerState, add_task, update_task
+from goal_planner.storage import load_state, save_state
+
+
+def _session(path: str) -> PlannerState:
+    state = PlannerState()
+    load_state(state, path)
+    return state
+
+
+def _seed(path: str, count: int = 3):
+    state = PlannerState()
+    for i in range(count):
+        add_task(state, task_record({'name': f"任务{i}"}, offset=i), 'tasks')
+    save_state(state, path)
+
+
+def _saved_tasks(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {t['name']: t for t in json.load(f)['tasks']}
+
+
+def test_non_conflicting_edits():
+    """测试不冲突的修改合并"""
+    print("✅ 测试: 不冲突的修改合并")
+
+    path = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    _seed(path)
+    alice, bob = _session(path), _session(path)
+
+    update_task(alice, alice.tasks[0], 'tasks', completed=True)
+    add_task(alice, task_record({'name': 'Alice 新任务'}), 'tasks')
+    assert save_state(alice, path) == []
+
+    update_task(bob, bob.tasks[0], 'tasks', priority=1)
+    update_task(bob, bob.tasks[1], 'tasks', estimatedTime=90)
+    assert save_state(bob, path) == [], "不同字段的修改不应报告冲突"
+
+    saved = _saved_tasks(path)
+    assert saved['任务0']['completed'] is True and saved['任务0']['priority'] == 1, saved['任务0']
+    assert saved['任务1']['estimatedTime'] == 90
+    assert 'Alice 新任务' in saved, "另一会话新增的任务应保留"
+    assert saved['任务2']['version'] == 1 and saved['任务0']['version'] == 3, saved['任务0']
+    assert bob.task_stats.completed['tasks'] == 1, "合并后应重建统计"
+
+    print("  ✅ 两个会话的修改都保存下来，版本号递增\n")
+
+
+def test_conflicts_and_deletes():
+    """测试冲突与删除"""
+    print("✅ 测试: 冲突与删除")
+
+    path = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    _seed(path)
+    alice, bob = _session(path), _session(path)
+
+    update_task(alice, alice.tasks[0], 'tasks', name='Alice 改名')
+    update_task(alice, alice.tasks[1], 'tasks', completed=True)
+    alice.tasks = [t for t in alice.tasks if t['name'] != '任务2']
+    save_state(alice, path)
+
+    update_task(bob, bob.tasks[0], 'tasks', name='Bob 改名')
+    bob.tasks = [t for t in bob.tasks if t['name'] != '任务1']
+    conflicts = save_state(bob, path)
+
+    assert [(c['reason'], c['fields']) for c in conflicts] == [('edited', ['name']), ('modified', [])], conflicts
+    saved = _saved_tasks(path)
+    assert set(saved) == {'Bob 改名', '任务1'}, "后保存的会话优先；被删除但已被修改的记录应保留"
+    assert saved['任务1']['completed'] is True
+
+    # 合并后的状态已是最新，再次保存不再有冲突
+    assert save_state(bob, path) == []
+    assert load_state(alice, path) and {t['name'] for t in alice.tasks} == set(saved)
+
+    print("  ✅ 同一字段以后保存的会话为准，删除不会吞掉别人的修改\n")
+
+
+def _worker(args):
+    path, worker, count = args
+    state = _session(path)
+    for i in range(count):
+        add_task(state, task_record({'id': f"{worker}-{i}", 'name': f"进程{worker}-{i}"}), 'tasks')
+        save_state(state, path)
+    return worker
+
+
+def test_concurrent_processes():
+    """测试多进程同时保存"""
+    print("✅ 测试: 多进程同时保存")
+
+    path = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    _seed(path, 1)
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_worker, [(path, worker, 10) for worker in range(4)]))
+
+    saved = _saved_tasks(path)
+    assert len(saved) == 1 + 4 * 10, len(saved)
+    assert not os.path.exists(f"{path}.tmp"), "临时文件应已替换"
+
+    print("  ✅ 40 次并发保存没有丢失修改\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 多会话并发保存测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_non_conflicting_edits()
+        test_conflicts_and_deletes()
+        test_concurrent_processes()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 重复任务检测测试脚本
+
+测试近似重复任务索引：
+1. 名称归一化（空白、全半角、大小写、标点）
+2. 近似重复聚类与增量增删
+3. 重复簇生成的洞察
+"""
+
+from goal_planner.dedup import DuplicateIndex, duplicate_insights, normalize_name
+
+
+def test_normalization():
+    """测试名称归一化"""
+    print("✅ 测试 1: 名称归一化")
+
+    assert normalize_name('跑步 5 公里') == normalize_name('跑步5公里')
+    assert normalize_name('跑步５公里！') == normalize_name('跑步5公里')
+    assert normalize_name('Write  Weekly-Report') == normalize_name('write weekly report')
+
+    print("  ✅ 归一化正确\n")
+
+
+def test_clusters():
+    """测试近似重复聚类与增量更新"""
+    print("✅ 测试 2: 近似重复聚类")
+
+    index = DuplicateIndex()
+    index.sync([(1, '跑步5公里'), (2, '跑步 5 公里'), (3, '每天跑步5公里'), (4, '写周报'), (5, '读书笔记')])
+    clusters = index.clusters()
+    assert len(clusters) == 1, clusters
+    assert sorted(clusters[0]['keys']) == [1, 2, 3]
+
+    # 增量更新：删除、改名、新增
+    index.sync([(1, '跑步5公里'), (2, '整理房间'), (4, '写周报'), (5, '读书笔记'), (6, '写 周报')])
+    keys = sorted(sorted(c['keys']) for c in index.clusters())
+    assert keys == [[4, 6]], keys
+    assert len(index) == 5
+
+    print("  ✅ 聚类与增量更新正确\n")
+
+
+def test_bulk_index():
+    """测试大量任务时的批量建索引"""
+    print("✅ 测试 3: 批量建索引")
+
+    items = [(i, f"任务{i}号的准备工作") for i in range(2000)]
+    items += [(10000, '阅读机器学习论文'), (10001, '阅读机器学习论文 ')]
+    index = DuplicateIndex()
+    index.sync(items)
+    assert any(sorted(c['keys']) == [10000, 10001] for c in index.clusters())
+
+    insights = duplicate_insights(index, limit=2)
+    assert len(insights) == 2
+    assert all(i['type'] == 'automation' and i['actionable'] for i in insights)
+
+    print(f"  {len(index.clusters())} 个重复簇")
+    print("  ✅ 批量建索引正确\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 重复任务检测测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_normalization()
+        test_clusters()
+        test_bulk_index()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
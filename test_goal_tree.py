@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 目标层级树测试脚本
+
+测试父子目标邻接表：
+1. 子树规模、整体进度和路径
+2. 父目标缺失或成环时的处理
+"""
+
+from goal_planner.goal_tree import GoalTree, tree_signature
+
+
+def _chain_goals():
+    """长期 → 年度 → 季度 → 月度 → 周 的分解链，外加一个无关目标"""
+    goals = []
+    parent = None
+    for i, goal_type in enumerate(['长期', '年度', '季度', '月度', '周']):
+        goals.append({'id': i, 'name': f'g{i}', 'type': goal_type, 'progress': i * 20, 'parentGoalId': parent})
+        parent = i
+    goals.append({'id': 10, 'name': '月度2', 'type': '月度', 'progress': 100, 'parentGoalId': 2})
+    goals.append({'id': 20, 'name': '独立', 'type': '年度', 'progress': 50})
+    return goals
+
+
+def test_subtree_summary():
+    """测试子树汇总与路径"""
+    print("✅ 测试: 子树汇总")
+
+    tree = GoalTree(_chain_goals())
+    assert [g['id'] for g in tree.roots()] == [0, 20]
+    assert [g['id'] for g in tree.children(2)] == [3, 10]
+    assert tree.descendant_count(0) == 5
+    assert tree.subtree_size[2] == 4
+    assert tree.subtree_progress(2) == (40 + 60 + 80 + 100) / 4
+    assert tree.path(4) == [0, 1, 2, 3, 4]
+    assert tree.depth[4] == 4
+    assert tree.position(10) == 1
+
+    print("  ✅ 子树规模、进度和路径正确\n")
+
+
+def test_orphans_and_cycles():
+    """测试父目标缺失与成环"""
+    print("✅ 测试: 异常层级")
+
+    goals = [
+        {'id': 1, 'name': 'a', 'type': '年度', 'progress': 0, 'parentGoalId': 99},
+        {'id': 2, 'name': 'b', 'type': '季度', 'progress': 0, 'parentGoalId': 3},
+        {'id': 3, 'name': 'c', 'type': '月度', 'progress': 0, 'parentGoalId': 2}
+    ]
+    tree = GoalTree(goals)
+    assert {g['id'] for g in tree.roots()} == {1, 2}, tree.roots()
+    assert tree.path(3) == [2, 3]
+    assert sum(tree.subtree_size[g['id']] for g in tree.roots()) == 3, "每个目标都应出现在树中"
+
+    signature = tree.signature
+    goals[0]['progress'] = 50
+    assert tree_signature(goals) != signature, "进度变化应触发重建"
+
+    # 编辑或其他会话保存后目标换成新字典，即使层级和进度不变也要重建，否则页面显示旧数据
+    tree.rebuild(goals)
+    goals[0] = dict(goals[0], name='新名称', category='工作')
+    assert tree_signature(goals) != tree.signature, "目标字典替换后应触发重建"
+    tree.rebuild(goals)
+    assert tree.by_id[1]['name'] == '新名称'
+
+    print("  ✅ 缺失父目标与成环均已挂到顶层\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 目标层级树测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_subtree_summary()
+        test_orphans_and_cycles()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
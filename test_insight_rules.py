@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 基础洞察规则测试脚本
+
+测试规则引擎：
+1. 内置规则（时间超载、会议密集、截止风险、目标停滞、分类失衡）
+2. 每个数据源只遍历一次
+3. 注册自定义规则
+"""
+
+from datetime import date, timedelta
+
+from goal_planner import insight_rules
+from goal_planner.insight_rules import Aggregate, InsightRule, run_insight_rules
+
+TODAY = date(2030, 6, 1)
+
+
+def _task(i, category='工作', minutes=60, **extra):
+    task = {'id': i, 'name': f'任务{i}', 'category': category, 'estimatedTime': minutes, 'completed': False}
+    task.update(extra)
+    return task
+
+
+def test_builtin_rules():
+    """测试内置规则"""
+    print("✅ 测试 1: 内置规则")
+
+    data = {
+        'goals': [
+            {'id': 1, 'name': '发布新版本', 'category': '工作', 'deadline': (TODAY + timedelta(days=3)).isoformat(),
+             'progress': 20, 'createdAt': '2030-05-01T10:00:00'},
+            {'id': 2, 'name': '学习日语', 'category': '学习', 'deadline': '', 'progress': 0,
+             'createdAt': '2030-04-01T10:00:00'},
+        ],
+        'tasks': [_task(i, '会议' if i < 4 else '工作', 240, goalId=1) for i in range(5)],
+        'weekly_tasks': [_task(10, scheduledDate=(TODAY - timedelta(days=2)).isoformat())],
+        'activities': [{'id': 1, 'name': '跑步', 'duration': 60}]
+    }
+    titles = {i['title'] for i in run_insight_rules(data, context={'today': TODAY})}
+    print(f"  {sorted(titles)}")
+    assert titles == {'任务时间超载', '会议密集', '目标截止风险', '任务已逾期', '目标停滞', '任务分类失衡'}, titles
+
+    print("  ✅ 内置规则正确\n")
+
+
+def test_single_pass():
+    """测试每个数据源只遍历一次"""
+    print("✅ 测试 2: 单次遍历")
+
+    class CountingList(list):
+        iterations = 0
+
+        def __iter__(self):
+            CountingList.iterations += 1
+            return super().__iter__()
+
+    data = {source: CountingList() for source in ('goals', 'tasks', 'weekly_tasks', 'activities')}
+    data['tasks'].extend(_task(i) for i in range(10))
+    run_insight_rules(data, context={'today': TODAY})
+    assert CountingList.iterations == 4, CountingList.iterations
+
+    print("  ✅ 每个数据源只遍历一次\n")
+
+
+def test_custom_rule():
+    """测试注册自定义规则"""
+    print("✅ 测试 3: 自定义规则")
+
+    insight_rules.register_aggregate('high_priority_count', Aggregate(
+        ('tasks',), int, lambda acc, t, source: acc + (t.get('priority') == 1)))
+    rule = InsightRule('too_many_high', ('high_priority_count',), lambda values, context: [
+        {'type': 'warning', 'title': '高优先级过多', 'description': '', 'priority': 'medium'}
+    ] if values['high_priority_count'] > 2 else [])
+    data = {'tasks': [_task(i, priority=1) for i in range(3)]}
+    insights = run_insight_rules(data, rules=[rule], context={'today': TODAY})
+    assert [i['title'] for i in insights] == ['高优先级过多']
+
+    try:
+        insight_rules.register_rule(InsightRule('broken', ('missing',), lambda values, context: []))
+        assert False, "依赖未注册聚合量的规则应被拒绝"
+    except ValueError:
+        pass
+    del insight_rules.AGGREGATES['high_priority_count']
+
+    print("  ✅ 自定义规则正确\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 基础洞察规则测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_builtin_rules()
+        test_single_pass()
+        test_custom_rule()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 本地接口测试脚本
+
+测试：
+1. 批量新增任务（JSON 与 NDJSON），无效记录单独报告，无效的 Content-Length 返回 400
+2. 按日期范围查询日程（JSON 与流式 NDJSON），排日程时不持有数据锁
+3. 生成并保存日程、导出 iCalendar
+"""
+
+import http.client
+import json
+import os
+import tempfile
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+from goal_planner.api import PlannerService, start_server
+
+
+def _start():
+    data_file = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    server = start_server(data_file)
+    return server, f"http://127.0.0.1:{server.server_port}", data_file
+
+
+def _request(url: str, body=None, content_type: str = 'application/json', method: str = None):
+    data = body if isinstance(body, bytes) or body is None else json.dumps(body).encode('utf-8')
+    request = urllib.request.Request(url, data=data, method=method, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers.get('Content-Type', ''), response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, '', e.read().decode('utf-8')
+
+
+def test_bulk_create_tasks():
+    """测试批量新增任务"""
+    print("✅ 测试: 批量新增任务")
+
+    server, base, data_file = _start()
+    try:
+        today = date.today().isoformat()
+        tasks = [{'name': f"任务{i}", 'priority': 3, 'estimatedTime': 30, 'scheduledDate': today} for i in range(100)]
+        tasks += [{'name': ''}, {'name': '错误优先级', 'priority': 5}, "不是对象"]
+        status, _, body = _request(f"{base}/tasks", {'tasks': tasks})
+        result = json.loads(body)
+        assert status == 200, body
+        assert result['created'] == 100, result['created']
+        assert [e['index'] for e in result['errors']] == [100, 101, 102], result['errors']
+        assert len(set(result['ids'])) == 100, "任务 ID 不应重复"
+
+        lines = "\n".join(json.dumps({'name': f"周任务{i}", 'scheduledDate': today}) for i in range(3))
+        status, _, body = _request(f"{base}/tasks?kind=weekly_tasks", lines.encode('utf-8'), 'application/x-ndjson')
+        assert json.loads(body)['created'] == 3, body
+
+        status, _, body = _request(f"{base}/tasks", b'{bad json')
+        assert status == 400, status
+
+        for length in ['abc', '-5']:
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_port)
+            connection.putrequest('POST', '/tasks')
+            connection.putheader('Content-Length', length)
+            connection.endheaders()
+            response = connection.getresponse()
+            assert response.status == 400, (length, response.status)
+            connection.close()
+
+        with open(data_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        assert len(saved['tasks']) == 100 and len(saved['weekly_tasks']) == 3, "应整批写入数据文件"
+        assert saved['tasks'][0]['completed'] is False and saved['tasks'][0]['createdAt'], "应补齐默认字段"
+    finally:
+        server.shutdown()
+
+    print("  ✅ 有效记录整批保存，无效记录按位置报告\n")
+
+
+def test_schedule_range_and_export():
+    """测试日程查询、生成与导出"""
+    print("✅ 测试: 日程查询、生成与导出")
+
+    server, base, data_file = _start()
+    try:
+        start = date.today() + timedelta(days=1)
+        tasks = [{'name': f"任务{i}", 'estimatedTime': 60, 'scheduledDate': (start + timedelta(days=i)).isoformat()}
+                 for i in range(3)]
+        _request(f"{base}/tasks", tasks)
+
+        status, _, body = _request(f"{base}/schedule?start={start.isoformat()}&days=3")
+        result = json.loads(body)
+        assert status == 200, body
+        assert list(result['schedule']) == [(start + timedelta(days=i)).isoformat() for i in range(3)]
+        assert all(len(items) == 1 for items in result['schedule'].values()), result['schedule']
+
+        status, content_type, body = _request(f"{base}/schedule?start={start.isoformat()}&days=10&stream=1")
+        lines = [json.loads(line) for line in body.splitlines()]
+        assert content_type.startswith('application/x-ndjson'), content_type
+        assert len(lines) == 10 and lines[0]['date'] == start.isoformat(), "应逐日返回"
+
+        status, _, body = _request(f"{base}/schedule?days=1000")
+        assert status == 400, status
+
+        status, _, body = _request(f"{base}/schedule/generate", {'start': start.isoformat(), 'days': 14})
+        assert status == 200 and len(json.loads(body)['weekly_schedule']) == 14, body
+        with open(data_file, 'r', encoding='utf-8') as f:
+            assert len(json.load(f)['weekly_schedule']) == 14, "生成的日程应保存"
+
+        status, content_type, body = _request(f"{base}/schedule.ics?start={start.isoformat()}&end={(start + timedelta(days=2)).isoformat()}")
+        assert content_type.startswith('text/calendar'), content_type
+        assert body.startswith("BEGIN:VCALENDAR") and body.rstrip().endswith("END:VCALENDAR")
+        assert body.count("BEGIN:VEVENT") == 3, body.count("BEGIN:VEVENT")
+    finally:
+        server.shutdown()
+
+    # 排日程在锁外进行：取得迭代器后锁已释放，其他请求不必等待整个日期范围算完
+    service = PlannerService(data_file)
+    day_schedules = service.plan(start, 366)
+    assert not service.lock.locked(), "不应持锁排日程"
+    assert next(day_schedules)[0] == start.isoformat()
+
+    print("  ✅ 日程按日期范围计算，流式返回与导出正确\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 本地接口测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_bulk_create_tasks()
+        test_schedule_range_and_export()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -7,11 +7,21 @@
 2. generate_weekly_schedule() 函数
 3. export_to_icalendar() 函数
 4. get_weekly_tasks_for_next_7_days() 函数
+
+被测函数直接从 goal_planner 核心模块导入，不需要 Streamlit。
 """
 
 import json
+import subprocess
+import sys
 from datetime import datetime, timedelta
 
+from goal_planner.render import format_time
+from goal_planner.scheduler import (
+    export_to_icalendar, generate_schedule, generate_weekly_schedule, get_weekly_tasks_for_next_7_days,
+)
+from goal_planner.state import PlannerState, add_task, refresh_task_indexes
+
 def test_data_structure():
     """测试数据结构"""
     print("✅ 测试 1: 数据结构验证")
@@ -43,11 +53,6 @@ def test_time_formatting():
     """测试时间格式化函数"""
     print("✅ 测试 2: 时间格式化")
     
-    def format_time(minutes: int) -> str:
-        hours = minutes // 60
-        mins = minutes % 60
-        return f"{hours:02d}:{mins:02d}"
-    
     test_cases = [
         (480, "08:00"),   # 8:00 AM
         (540, "09:00"),   # 9:00 AM
@@ -71,27 +76,18 @@ def test_date_filtering():
     
     # 创建测试任务
     test_tasks = [
-        {'name': '昨天的任务', 'scheduledDate': (today - timedelta(days=1)).isoformat(), 'completed': False},
-        {'name': '今天的任务', 'scheduledDate': today.isoformat(), 'completed': False},
-        {'name': '3天后的任务', 'scheduledDate': (today + timedelta(days=3)).isoformat(), 'completed': False},
-        {'name': '7天后的任务', 'scheduledDate': (today + timedelta(days=7)).isoformat(), 'completed': False},
-        {'name': '8天后的任务', 'scheduledDate': (today + timedelta(days=8)).isoformat(), 'completed': False},
-        {'name': '已完成的任务', 'scheduledDate': (today + timedelta(days=2)).isoformat(), 'completed': True},
+        {'id': 1, 'name': '昨天的任务', 'scheduledDate': (today - timedelta(days=1)).isoformat(), 'completed': False},
+        {'id': 2, 'name': '今天的任务', 'scheduledDate': today.isoformat(), 'completed': False},
+        {'id': 3, 'name': '3天后的任务', 'scheduledDate': (today + timedelta(days=3)).isoformat(), 'completed': False},
+        {'id': 4, 'name': '7天后的任务', 'scheduledDate': seven_days_later.isoformat(), 'completed': False},
+        {'id': 5, 'name': '8天后的任务', 'scheduledDate': (today + timedelta(days=8)).isoformat(), 'completed': False},
+        {'id': 6, 'name': '已完成的任务', 'scheduledDate': (today + timedelta(days=2)).isoformat(), 'completed': True},
     ]
     
     # 筛选逻辑
-    filtered_tasks = []
-    for task in test_tasks:
-        if task.get('completed'):
-            continue
-        task_date = task.get('scheduledDate')
-        if task_date:
-            try:
-                task_datetime = datetime.fromisoformat(task_date).date()
-                if today <= task_datetime <= seven_days_later:
-                    filtered_tasks.append(task)
-            except:
-                pass
+    state = PlannerState(weekly_tasks=test_tasks)
+    refresh_task_indexes(state)
+    filtered_tasks = get_weekly_tasks_for_next_7_days(state, today)
     
     print(f"  总任务数: {len(test_tasks)}")
     print(f"  筛选后任务数: {len(filtered_tasks)}")
@@ -111,31 +107,34 @@ def test_icalendar_format():
     """测试 iCalendar 格式生成"""
     print("✅ 测试 4: iCalendar 格式")
     
-    # 简单的 iCalendar 头部验证
-    ical_lines = [
+    day = datetime.now().date().isoformat()
+    schedule = {day: [
+        {'type': 'task', 'item': {'name': '测试任务', 'priority': 3, 'preparation': '笔记本'}, 'startTime': 540, 'duration': 90},
+        {'type': 'activity', 'item': {'name': '午餐'}, 'startTime': 720, 'duration': 60},
+    ]}
+    ical_lines = export_to_icalendar(schedule).split("\n")
+    
+    # iCalendar 头部验证
+    header = [
         "BEGIN:VCALENDAR",
         "VERSION:2.0",
         "PRODID:-//智能目标管理系统//Goal Planner v1.0//CN",
         "CALSCALE:GREGORIAN",
         "METHOD:PUBLISH",
     ]
+    assert ical_lines[:len(header)] == header, "iCalendar 头部不正确"
+    assert ical_lines[-1] == "END:VCALENDAR", "缺少 END:VCALENDAR"
     
     for line in ical_lines:
         print(f"  {line}")
     
-    # 简单的事件格式
-    event_lines = [
-        "BEGIN:VEVENT",
-        "UID:test-event@goalplanner",
-        f"DTSTART:{datetime.now().strftime('%Y%m%dT%H%M%S')}",
-        "SUMMARY:测试任务",
-        "DESCRIPTION:这是一个测试任务",
-        "END:VEVENT",
-    ]
-    
-    print("\n  事件格式示例:")
-    for line in event_lines:
-        print(f"  {line}")
+    # 事件格式
+    compact_day = day.replace('-', '')
+    assert ical_lines.count("BEGIN:VEVENT") == 2, "每个日程事项应生成一个事件"
+    assert f"DTSTART:{compact_day}T090000" in ical_lines, "任务开始时间不正确"
+    assert f"DTEND:{compact_day}T103000" in ical_lines, "任务结束时间不正确"
+    assert "SUMMARY:🎯 测试任务" in ical_lines, "任务标题不正确"
+    assert "SUMMARY:⏰ 午餐" in ical_lines, "活动标题不正确"
     
     print("\n  ✅ iCalendar 格式验证通过\n")
 
@@ -150,9 +149,9 @@ def test_schedule_generation_logic():
     ]
     
     tasks = [
-        {'name': '任务1', 'priority': 3, 'estimatedTime': 90},
-        {'name': '任务2', 'priority': 2, 'estimatedTime': 60},
-        {'name': '任务3', 'priority': 1, 'estimatedTime': 45},
+        {'id': 1, 'name': '任务1', 'priority': 3, 'estimatedTime': 90},
+        {'id': 2, 'name': '任务2', 'priority': 2, 'estimatedTime': 60},
+        {'id': 3, 'name': '任务3', 'priority': 1, 'estimatedTime': 45},
     ]
     
     print("  固定活动:")
@@ -171,8 +170,44 @@ def test_schedule_generation_logic():
     print("    3. 优先安排高优先级任务")
     print("    4. 确保任务有足够执行时间")
     
+    # 今日日程：8:00 早餐前没有空档，早餐后到午餐前安排优先级最高的任务
+    state = PlannerState(activities=activities)
+    for task in tasks:
+        add_task(state, task)
+    schedule = generate_schedule(state)
+    assert [entry['item']['name'] for entry in schedule] == ['早餐', '任务1', '午餐'], "今日日程顺序不正确"
+    assert schedule[1]['startTime'] == 510 and schedule[1]['duration'] == 90, "任务应安排在早餐之后"
+    assert state.schedule is schedule, "日程应写回状态对象"
+    
+    # 七日日程：当天的任务按优先级连续排进活动间隙，放不下的排在最后一个活动之后
+    today = datetime.now().date()
+    state = PlannerState(activities=activities)
+    for task in tasks + [{'id': 4, 'name': '任务4', 'priority': 1, 'estimatedTime': 30}]:
+        add_task(state, dict(task, scheduledDate=today.isoformat()), 'weekly_tasks')
+    weekly = generate_weekly_schedule(state, today)
+    assert len(weekly) == 7, "应生成 7 天的日程"
+    day_names = [entry['item']['name'] for entry in weekly[today.isoformat()]]
+    assert day_names == ['早餐', '任务1', '任务2', '任务3', '午餐', '任务4'], f"七日日程顺序不正确: {day_names}"
+    other_days = [entry for day, items in weekly.items() if day != today.isoformat() for entry in items]
+    assert all(entry['type'] == 'activity' for entry in other_days), "其它日期只应有日常活动"
+    
     print("  ✅ 日程生成逻辑验证通过\n")
 
+def test_headless_import():
+    """测试核心模块不依赖 Streamlit"""
+    print("✅ 测试 6: 核心模块独立导入")
+    
+    code = (
+        "import sys\n"
+        "import goal_planner.state, goal_planner.storage, goal_planner.scheduler, goal_planner.ai_client\n"
+        "print(','.join(m for m in ('streamlit', 'anthropic', 'openai') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    loaded = result.stdout.strip()
+    assert not loaded, f"核心模块不应导入: {loaded}"
+    
+    print("  ✅ 核心模块无需 Streamlit 和 AI SDK 即可导入\n")
+
 def run_all_tests():
     """运行所有测试"""
     print("=" * 60)
@@ -186,6 +221,7 @@ def run_all_tests():
         test_date_filtering()
         test_icalendar_format()
         test_schedule_generation_logic()
+        test_headless_import()
         
         print("=" * 60)
         print("✅ 所有测试通过！")
@@ -197,6 +233,7 @@ def run_all_tests():
         print("  ✓ 日期筛选逻辑正确")
         print("  ✓ iCalendar 格式有效")
         print("  ✓ 日程生成逻辑合理")
+        print("  ✓ 核心模块可独立导入")
         print()
         print("🚀 新功能已准备就绪，可以使用！")
         
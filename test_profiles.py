@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 档案分片测试脚本
+
+测试：
+1. 档案路径、档案名校验与档案列表
+2. 切换档案只加载新档案的分片，进程内快照按分片缓存并淘汰
+3. 不同档案的文件锁互不等待
+"""
+
+import os
+import tempfile
+import threading
+
+from goal_planner.models import task_record
+from goal_planner.state import PlannerState, add_task
+from goal_planner.storage import (
+    DATA_FILE, SharedStore, file_lock, list_profiles, load_state, profile_path, save_state, switch_profile,
+)
+
+
+def test_profile_paths():
+    """测试档案路径与校验"""
+    print("✅ 测试: 档案路径与校验")
+
+    root = tempfile.mkdtemp()
+    assert profile_path('default', root=root) == DATA_FILE, "默认档案沿用原数据文件"
+    assert profile_path('alice', root=root) == os.path.join(root, 'alice', DATA_FILE)
+    assert profile_path('团队-1', 'goal_planner_batches.json', root) == os.path.join(root, '团队-1', 'goal_planner_batches.json')
+    for bad in ['', '../x', 'a/b', 'a b', 'x' * 65]:
+        try:
+            profile_path(bad, root=root)
+            assert False, f"应拒绝档案名 {bad!r}"
+        except ValueError:
+            pass
+
+    state = PlannerState()
+    for name in ['bob', 'alice']:
+        save_state(state, profile_path(name, root=root))
+    os.makedirs(os.path.join(root, '.hidden'))
+    assert list_profiles(root) == ['default', 'alice', 'bob'], list_profiles(root)
+    assert list_profiles(os.path.join(root, 'missing')) == ['default']
+
+    print("  ✅ 每个档案一个目录，非法名称被拒绝\n")
+
+
+def test_switch_and_store():
+    """测试切换档案与快照缓存"""
+    print("✅ 测试: 切换档案与快照缓存")
+
+    root = tempfile.mkdtemp()
+    paths = {name: profile_path(name, root=root) for name in ['alice', 'bob', 'carol']}
+    for i, (name, path) in enumerate(paths.items()):
+        state = PlannerState()
+        for j in range(i + 1):
+            add_task(state, task_record({'name': f"{name}{j}"}, offset=j), 'tasks')
+        save_state(state, path)
+
+    store = SharedStore(max_snapshots=2)
+    session = PlannerState()
+    load_state(session, paths['alice'], store)
+    assert [t['name'] for t in session.tasks] == ['alice0']
+
+    switch_profile(session, 'bob')
+    assert session.profile == 'bob' and session.tasks == [] and session.task_stats.open_count() == 0
+    assert load_state(session, paths['bob'], store) and len(session.tasks) == 2
+
+    # 新档案还没有分片时保持为空，而不是沿用上一个档案的数据
+    switch_profile(session, 'dave')
+    assert not load_state(session, profile_path('dave', root=root), store) and session.tasks == []
+
+    load_state(PlannerState(), paths['carol'], store)
+    assert sorted(store._snapshots) == sorted([paths['bob'], paths['carol']]), "超出上限时淘汰最久未访问的分片"
+
+    print("  ✅ 只加载当前档案，快照数量有上限\n")
+
+
+def test_per_profile_locks():
+    """测试按档案加锁"""
+    print("✅ 测试: 按档案加锁")
+
+    root = tempfile.mkdtemp()
+    alice, bob = profile_path('alice', root=root), profile_path('bob', root=root)
+    save_state(PlannerState(), alice)
+
+    saved = threading.Event()
+    with file_lock(alice):
+        worker = threading.Thread(target=lambda: (save_state(PlannerState(), bob), saved.set()))
+        worker.start()
+        assert saved.wait(5), "其他档案的保存不应等待这把锁"
+        try:
+            with file_lock(alice, timeout=0.05):
+                assert False, "同一档案的锁应互斥"
+        except TimeoutError:
+            pass
+    worker.join()
+
+    print("  ✅ 不同档案并行保存，同一档案互斥\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 档案分片测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_profile_paths()
+        test_switch_and_store()
+        test_per_profile_locks()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 全文搜索测试脚本
+
+测试倒排索引：
+1. 中文二元组与英文单词（含前缀）检索
+2. 筛选条件
+3. 增量更新
+"""
+
+import time
+from datetime import date
+
+from goal_planner.search import SearchIndex, tokenize
+
+
+def _sample_data():
+    return {
+        'goals': [
+            {'id': 1, 'name': '通过英语六级', 'description': '每天背单词', 'category': '学习', 'deadline': '2026-12-20', 'progress': 30},
+            {'id': 2, 'name': '马拉松 Marathon', 'category': '健康', 'deadline': '2027-04-01', 'progress': 100}
+        ],
+        'tasks': [
+            {'id': 10, 'name': '背英语单词', 'preparation': '下载词汇表', 'category': '学习', 'scheduledDate': '2026-10-20', 'completed': False},
+            {'id': 11, 'name': '周会 Weekly meeting', 'description': '同步季度预算', 'guidance': '准备项目进度', 'category': '工作', 'scheduledDate': '2026-10-21', 'completed': True}
+        ],
+        'weekly_tasks': [
+            {'id': 20, 'name': '长跑训练', 'description': '为马拉松做准备', 'category': '健康', 'scheduledDate': '2026-10-25', 'completed': False}
+        ]
+    }
+
+
+def test_tokenize():
+    """测试切分"""
+    print("✅ 测试: 词项切分")
+
+    assert tokenize('英语单词') == ['英语', '语单', '单词']
+    assert tokenize('Ｗｅｅｋｌｙ Meeting，周会') == ['weekly', 'meeting', '周会']
+    assert tokenize('学') == ['学']
+
+    print("  ✅ 中文二元组、英文单词和全角字符切分正确\n")
+
+
+def test_search_and_filters():
+    """测试检索与筛选"""
+    print("✅ 测试: 检索与筛选")
+
+    index = SearchIndex(_sample_data())
+    names = lambda hits: [record['name'] for _, _, record in hits]
+
+    hits = index.search('英语')
+    assert set(names(hits)) == {'通过英语六级', '背英语单词'}
+    assert names(index.search('单词'))[0] == '背英语单词', "名称命中应排在描述命中之前"
+    assert names(index.search('马拉松')) == ['马拉松 Marathon', '长跑训练']
+    assert names(index.search('meet')) == ['周会 Weekly meeting'], "最后一个英文单词按前缀匹配"
+    assert set(names(index.search('词'))) == {'背英语单词', '通过英语六级'}, "单字查询应匹配含该字的词项"
+    assert index.search('英语 马拉松') == []
+    assert names(index.search('季度预算')) == ['周会 Weekly meeting'], "任务描述也应可搜索"
+
+    assert names(index.search('英语', kinds=('tasks',))) == ['背英语单词']
+    assert names(index.search('', category='健康', completed=False)) == ['长跑训练']
+    assert names(index.search('', start=date(2026, 10, 20), end=date(2026, 10, 21))) == ['背英语单词', '周会 Weekly meeting']
+
+    print("  ✅ 检索结果与筛选正确\n")
+
+
+def test_incremental_updates():
+    """测试增量更新"""
+    print("✅ 测试: 增量更新")
+
+    data = _sample_data()
+    index = SearchIndex(data)
+
+    task = data['tasks'][0]
+    index.remove('tasks', task)
+    task['name'] = '整理错题本'
+    index.add('tasks', task)
+    assert index.search('整理')[0][2] is task
+    assert [r['name'] for _, _, r in index.search('英语')] == ['通过英语六级']
+
+    data['goals'][0]['name'] = '雅思七分'
+    data['goals'].pop()
+    assert index.sync({'goals': data['goals']}) == 2, "只应处理改名和删除的目标"
+    assert index.sync({'goals': data['goals']}) == 0
+    assert index.search('马拉松')[0][2]['name'] == '长跑训练'
+    assert len(index) == 4
+
+    print("  ✅ 只重新切分变动的记录\n")
+
+
+def test_search_speed():
+    """测试大数据量下的检索耗时"""
+    print("✅ 测试: 检索耗时")
+
+    subjects = ['英语', '数学', '跑步', '会议', '报告', '阅读', '编程', '健身', '写作', '复习']
+    data = {'tasks': [
+        {'id': i, 'name': f"{subjects[i % 10]}{subjects[i // 10 % 10]}任务{i}", 'category': '学习',
+         'scheduledDate': '2026-10-20', 'completed': i % 2 == 0}
+        for i in range(20000)
+    ]}
+    index = SearchIndex(data)
+    started = time.perf_counter()
+    hits = index.search('英语数学', completed=True, limit=20)
+    elapsed = (time.perf_counter() - started) * 1000
+    assert hits and all('英语数学' in r['name'] for _, _, r in hits)
+    print(f"  ✅ 20000 条记录检索耗时 {elapsed:.1f} 毫秒\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 全文搜索测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_tokenize()
+        test_search_and_filters()
+        test_incremental_updates()
+        test_search_speed()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 进程内共享数据测试脚本
+
+测试：
+1. 多个会话引用同一份快照，只浏览的会话几乎不占额外内存
+2. 修改前复制（写时复制），其他会话和快照不受影响
+3. 保存后发布副本作为新快照，保存的会话继续原地修改自己的数据
+"""
+
+import os
+import tempfile
+import tracemalloc
+
+from goal_planner.models import task_record
+from goal_planner.state import PlannerState, add_task, update_task, writable
+from goal_planner.storage import SharedStore, load_state, save_state
+
+
+def _seed(path: str, count: int):
+    state = PlannerState()
+    for i in range(count):
+        add_task(state, task_record({'name': f"任务{i}", 'description': '描述' * 20}, offset=i), 'tasks')
+    state.goals = [{'id': i, 'name': f"目标{i}"} for i in range(count // 10)]
+    save_state(state, path)
+
+
+def test_sessions_share_snapshot():
+    """测试会话共享快照"""
+    print("✅ 测试: 会话共享快照")
+
+    path = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    _seed(path, 5000)
+    store = SharedStore()
+    first = PlannerState()
+    assert load_state(first, path, store)
+    assert not load_state(first, path, store), "文件没有变化时不应重新加载"
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    viewers = [PlannerState() for _ in range(20)]
+    for viewer in viewers:
+        load_state(viewer, path, store)
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / len(viewers)
+    tracemalloc.stop()
+
+    assert all(viewer.tasks is first.tasks and viewer.date_index is first.date_index for viewer in viewers)
+    assert per_session < 20 * 1024, f"每个只浏览的会话占用 {per_session:.0f} 字节"
+
+    print(f"  ✅ 5000 条任务，每个只浏览的会话约占 {per_session / 1024:.1f} KB\n")
+
+
+def test_copy_on_write():
+    """测试写时复制与发布"""
+    print("✅ 测试: 写时复制与发布")
+
+    path = os.path.join(tempfile.mkdtemp(), 'goal_planner_data.json')
+    _seed(path, 50)
+    store = SharedStore()
+    alice, bob = PlannerState(), PlannerState()
+    load_state(alice, path, store)
+    load_state(bob, path, store)
+    shared = store.get(path)
+
+    task = update_task(alice, alice.tasks[0], 'tasks', completed=True)
+    writable(alice, 'goals').append({'id': 'new', 'name': '新目标'})
+    assert task is not bob.tasks[0] and bob.tasks[0]['completed'] is False, "修改不应影响其他会话"
+    assert alice.task_stats.completed['tasks'] == 1 and bob.task_stats.completed['tasks'] == 0
+    assert len(bob.goals) == 5 and len(shared['data']['goals']) == 5
+    assert alice.weekly_tasks is bob.weekly_tasks, "没有修改的数据继续共享"
+
+    save_state(alice, path, store)
+    published = store.get(path)
+    assert published is not shared and published['data']['tasks'] is not alice.tasks, "保存后应发布副本"
+    assert load_state(bob, path, store) and bob.tasks is published['data']['tasks']
+    assert bob.tasks[0]['completed'] is True and len(bob.goals) == 6
+
+    # 保存的会话继续拥有自己的列表和索引，之后的修改不再复制
+    tasks, stats = alice.tasks, alice.task_stats
+    update_task(alice, alice.tasks[1], 'tasks', priority=1)
+    assert alice.tasks is tasks and alice.task_stats is stats
+    assert published['data']['tasks'][1]['priority'] != 1, "快照不受保存会话之后修改的影响"
+
+    # 引用快照的会话在保存后勾选任务：之前拿到的记录已过时，按 ID 取到的才是会话中的记录
+    stale = bob.tasks[2]
+    save_state(bob, path, store)
+    current = update_task(bob, stale, 'tasks', completed=True)
+    assert current is not stale and stale['completed'] is False
+    assert next(t for t in bob.tasks if t['id'] == stale['id']) is current and current['completed'] is True
+    assert bob.task_stats.open_task('tasks', stale['id']) is None
+    save_state(bob, path, store)
+    update_task(bob, current, 'tasks', completed=False)
+    assert bob.task_stats.open_task('tasks', stale['id']) is current, "取消勾选应作用于同一条记录"
+
+    add_task(bob, task_record({'name': 'Bob 新任务'}), 'tasks')
+    assert len(alice.tasks) == 50 and len(bob.tasks) == 51
+
+    print("  ✅ 修改只影响本会话，保存后其他会话直接引用新快照\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 进程内共享数据测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_sessions_share_snapshot()
+        test_copy_on_write()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"\n❌ 测试出错: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+智能目标管理系统 - 任务统计测试脚本
+
+测试增量维护的任务统计和计划日期索引与全量重算结果一致。
+"""
+
+import random
+from datetime import date, timedelta
+
+from goal_planner.date_index import DateIndex
+from goal_planner.stats import TaskStats
+
+
+def _recount(tasks):
+    open_tasks = [t for t in tasks if not t['completed']]
+    by_goal = {}
+    for t in tasks:
+        if t.get('goalId') is not None:
+            by_goal.setdefault(t['goalId'], [0, 0])[1 if t['completed'] else 0] += 1
+    return len(open_tasks), open_tasks[:5], by_goal
+
+
+def test_incremental_matches_rebuild():
+    """测试增量更新与全量重算一致"""
+    print("✅ 测试: 增量统计")
+
+    random.seed(7)
+    tasks = []
+    stats = TaskStats()
+    for i in range(300):
+        task = {'id': i, 'name': f'任务{i}', 'goalId': random.choice([None, 1, 2]),
+                'category': random.choice(['工作', '学习']), 'completed': False}
+        tasks.append(task)
+        stats.add('tasks', task)
+        if random.random() < 0.4:
+            target = random.choice(tasks)
+            stats.remove('tasks', target)
+            target['completed'] = not target['completed']
+            stats.add('tasks', target)
+
+    open_count, first_open, by_goal = _recount(tasks)
+    assert stats.open_count('tasks') == open_count
+    assert stats.completion_rate('tasks') == (len(tasks) - open_count) / len(tasks) * 100
+    assert {t['id'] for t in stats.first_open('tasks', 5)} <= {t['id'] for t in tasks if not t['completed']}
+    assert by_goal == {k: v for k, v in stats.by_goal.items()}
+
+    rebuilt = TaskStats()
+    rebuilt.rebuild({'tasks': tasks})
+    assert rebuilt.by_category == stats.by_category
+    assert rebuilt.by_goal == stats.by_goal
+    assert [t['id'] for t in rebuilt.first_open('tasks', 5)] == [t['id'] for t in first_open]
+
+    print(f"  待办 {open_count} / 共 {len(tasks)}")
+    print("  ✅ 增量统计正确\n")
+
+
+def test_date_index():
+    """测试计划日期索引的范围查询"""
+    print("✅ 测试: 计划日期索引")
+
+    random.seed(3)
+    start = date(2030, 1, 1)
+    tasks = [{'id': i, 'name': f'任务{i}', 'completed': False,
+              'scheduledDate': random.choice(['', '无效日期', (start + timedelta(days=random.randint(0, 30))).isoformat()])}
+             for i in range(200)]
+    weekly_tasks = [{'id': 1000 + i, 'name': f'周任务{i}', 'completed': False,
+                     'scheduledDate': (start + timedelta(days=i % 10)).isoformat() + 'T09:00:00'} for i in range(20)]
+    index = DateIndex()
+    index.rebuild({'tasks': tasks, 'weekly_tasks': weekly_tasks})
+
+    def expected(first, last, items):
+        return [t for t in items if t['scheduledDate'][:10] and t['scheduledDate'][0].isdigit()
+                and first.isoformat() <= t['scheduledDate'][:10] <= last.isoformat()]
+
+    first, last = start + timedelta(days=3), start + timedelta(days=9)
+    got = index.between(first, last, ('tasks',))
+    assert sorted(t['id'] for t in got) == sorted(t['id'] for t in expected(first, last, tasks))
+    assert [t['scheduledDate'] for t in got] == sorted(t['scheduledDate'] for t in got)
+
+    # 完成任务后移出索引
+    index.remove('tasks', got[0])
+    got[0]['completed'] = True
+    index.add('tasks', got[0])
+    assert got[0] not in index.between(first, last)
+
+    days = index.by_day(start, 7, ('weekly_tasks', 'tasks'))
+    assert len(days) == 7
+    day = days[start.isoformat()]
+    assert day[:2] == [weekly_tasks[0], weekly_tasks[10]], "同一天内周任务应排在前面"
+    assert index.count_between(first, last) == len(index.between(first, last))
+
+    print("  ✅ 日期索引正确\n")
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("🧪 智能目标管理系统 - 任务统计测试")
+    print("=" * 60)
+    print()
+
+    try:
+        test_incremental_matches_rebuild()
+        test_date_index()
+        print("✅ 所有测试通过！")
+    except AssertionError as e:
+        print(f"\n❌ 测试失败: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    exit(0 if success else 1)